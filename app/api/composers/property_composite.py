@@ -1,11 +1,17 @@
 from fastapi import Depends
 from app.core.services import PropertyServices
-from app.core.db.pg_connection2 import PGConnection
+from redis.asyncio import Redis
+from app.core.db import get_connection, get_redis, get_property_snapshot, get_similarity_index, PropertySnapshot, SimilarityIndex
+from app.core.db.base_connection import DBConnection
 from app.core.db.repositories import PropertyRepository
 
 
-async def property_composer() -> PropertyServices:
-    conn = PGConnection()
+async def property_composer(
+    conn: DBConnection = Depends(get_connection),
+    redis: Redis = Depends(get_redis),
+    snapshot: PropertySnapshot = Depends(get_property_snapshot),
+    similarity_index: SimilarityIndex = Depends(get_similarity_index)
+) -> PropertyServices:
     property_repository = PropertyRepository(connection=conn)
-    service = PropertyServices(property_repository=property_repository)
+    service = PropertyServices(property_repository=property_repository, redis=redis, snapshot=snapshot, similarity_index=similarity_index)
     return service
@@ -1,2 +1,5 @@
-from .bucket import Bucket
-
+from .admin import require_admin_token
+from .bucket import Bucket, lifespan as bucket_lifespan
+from .conditional_requests import check_property_version, is_not_modified, representation_variant, version_headers
+from .json_response import FastJSONResponse
+from .profiling import ProfiledRoute
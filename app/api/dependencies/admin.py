@@ -0,0 +1,18 @@
+import secrets
+from fastapi import Header
+from fastapi.exceptions import HTTPException
+from app.core.configs import get_environment, get_logger
+
+_env = get_environment()
+_logger = get_logger(__name__)
+
+
+async def require_admin_token(x_admin_token: str = Header(default="")):
+    """
+    Admin routes act on every process, an invalidation forces them all to reload
+    their snapshots, so only whoever holds ADMIN_TOKEN may call them. Without
+    ADMIN_TOKEN they are closed to everyone.
+    """
+    if not _env.ADMIN_TOKEN or not secrets.compare_digest(x_admin_token.encode(), _env.ADMIN_TOKEN.encode()):
+        _logger.warning("Admin route called without a valid token")
+        raise HTTPException(status_code=403, detail="Forbidden")
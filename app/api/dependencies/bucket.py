@@ -1,44 +1,63 @@
+import asyncio
+import threading
+import time
 import boto3
-from boto3.s3.transfer import S3Transfer
+from botocore.config import Config
 from botocore.exceptions import ClientError
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
 from app.core.configs import get_environment, get_logger
+from app.core.metrics import observed, timed
+from typing import AsyncGenerator, Dict, Tuple
 
 _env = get_environment()
 _logger = get_logger(__name__)
 
 
 class Bucket:
-    @staticmethod
-    def __connect_on_client():
-        bucket = boto3.client(
-            "s3",
-            endpoint_url=_env.BUCKET_BASE_URL,
-            aws_access_key_id=_env.BUCKET_ACCESS_KEY_ID,
-            aws_secret_access_key=_env.BUCKET_SECRET_KEY,
-        )
-        return bucket
-    
-    @staticmethod
-    def __connect_on_resource():
-        bucket = boto3.resource(
-            "s3",
-            endpoint_url=_env.BUCKET_BASE_URL,
-            aws_access_key_id=_env.BUCKET_ACCESS_KEY_ID,
-            aws_secret_access_key=_env.BUCKET_SECRET_KEY,
-        )
-        return bucket
-    
+    # boto3 clients are thread safe once built, so one client serves every
+    # export and its parts sent from other threads; only building it is guarded
+    __client = None
+    __lock = threading.Lock()
+    # path -> (presigned url, monotonic time it stops being handed out)
+    __presigned_urls: Dict[str, Tuple[str, float]] = {}
+
+    @classmethod
+    def __connect_on_client(cls):
+        if cls.__client is None:
+            with cls.__lock:
+                if cls.__client is None:
+                    cls.__client = boto3.session.Session().client(
+                        "s3",
+                        endpoint_url=_env.BUCKET_BASE_URL,
+                        aws_access_key_id=_env.BUCKET_ACCESS_KEY_ID,
+                        aws_secret_access_key=_env.BUCKET_SECRET_KEY,
+                        config=Config(
+                            max_pool_connections=_env.BUCKET_MAX_POOL_CONNECTIONS,
+                            connect_timeout=_env.BUCKET_CONNECT_TIMEOUT_SECONDS,
+                            read_timeout=_env.BUCKET_READ_TIMEOUT_SECONDS,
+                            retries={"max_attempts": _env.BUCKET_MAX_ATTEMPTS, "mode": "standard"},
+                        ),
+                    )
+
+        return cls.__client
+
+    @classmethod
+    def close(cls):
+        with cls.__lock:
+            if cls.__client is not None:
+                cls.__client.close()
+                cls.__client = None
+
+            cls.__presigned_urls.clear()
+
     @classmethod
+    @observed("bucket")
     def verify_bucket(cls):
         _logger.info(f"Checking Bucket")
         try:
-            bucket = cls.__connect_on_resource()
-            buckets = bucket.buckets.all()
-            if buckets:
-                buckets = [created_bucket.name for created_bucket in buckets]
-
-            else:
-                buckets = []
+            bucket = cls.__connect_on_client()
+            buckets = [created_bucket["Name"] for created_bucket in bucket.list_buckets().get("Buckets", [])]
 
             if _env.BUCKET_NAME not in buckets:
                 bucket.create_bucket(Bucket=_env.BUCKET_NAME)
@@ -51,25 +70,136 @@ class Bucket:
             raise Exception("Bucket not created")
 
     @classmethod
-    def save_file(cls, bucket_path: str, file_path: str) -> str:
+    async def upload_stream(cls, bucket_path: str, chunks: AsyncGenerator[bytes, None]) -> str:
+        """
+        Upload a stream with S3 multipart upload, sending up to
+        BUCKET_TRANSFER_CONCURRENCY parts at once while the next one is read,
+        so memory stays bounded by that many parts plus the one being filled
+        """
+        bucket = cls.__connect_on_client()
+        cls.__presigned_urls.pop(bucket_path, None)
+
+        # Only the calls to S3 are timed, the chunks come from a stream still being produced
+        with timed(stage="bucket", operation="create_multipart_upload"):
+            upload = await asyncio.to_thread(
+                bucket.create_multipart_upload, Bucket=_env.BUCKET_NAME, Key=bucket_path
+            )
+        upload_id = upload["UploadId"]
+        parts = []
+        part_number = 0
+        in_flight = set()
+        buffer = bytearray()
+
+        async def upload_part(part_number: int, body: bytes) -> dict:
+            with timed(stage="bucket", operation="upload_part"):
+                response = await asyncio.to_thread(
+                    bucket.upload_part,
+                    Bucket=_env.BUCKET_NAME,
+                    Key=bucket_path,
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                    Body=body,
+                )
+            return {"ETag": response["ETag"], "PartNumber": part_number}
+
+        async def collect(return_when: str):
+            if not in_flight:
+                return
+
+            done, _ = await asyncio.wait(in_flight, return_when=return_when)
+
+            for task in done:
+                # A failed part stays in flight, so the error path still awaits it
+                parts.append(task.result())
+                in_flight.discard(task)
+
         try:
+            async for chunk in chunks:
+                buffer += chunk
 
-            bucket = cls.__connect_on_client()
-            transfer = S3Transfer(bucket)
-            transfer.upload_file(file_path, _env.BUCKET_NAME, bucket_path)
+                if len(buffer) >= _env.BUCKET_MULTIPART_PART_SIZE:
+                    if len(in_flight) >= _env.BUCKET_TRANSFER_CONCURRENCY:
+                        await collect(return_when=asyncio.FIRST_COMPLETED)
+
+                    part_number += 1
+                    in_flight.add(asyncio.create_task(upload_part(part_number, bytes(buffer))))
+                    buffer.clear()
+
+            if buffer or not part_number:
+                part_number += 1
+                in_flight.add(asyncio.create_task(upload_part(part_number, bytes(buffer))))
+
+            await collect(return_when=asyncio.ALL_COMPLETED)
+            # Parts finish in any order, S3 wants them by number
+            parts.sort(key=lambda part: part["PartNumber"])
+
+            with timed(stage="bucket", operation="complete_multipart_upload"):
+                await asyncio.to_thread(
+                    bucket.complete_multipart_upload,
+                    Bucket=_env.BUCKET_NAME,
+                    Key=bucket_path,
+                    UploadId=upload_id,
+                    MultipartUpload={"Parts": parts},
+                )
 
             return f"{_env.BUCKET_BASE_URL}{_env.BUCKET_NAME}/{bucket_path}"
 
         except Exception as error:
-            _logger.error(f"Error on save file in bucket: {str(error)}")
+            _logger.error(f"Error on stream file to bucket: {str(error)}")
+
+            # Their threads cannot be interrupted, the abort has to come after the last part
+            await asyncio.gather(*in_flight, return_exceptions=True)
+
+            # Stop the producer now, so it releases what it holds before the upload is aborted
+            await chunks.aclose()
+
+            await asyncio.to_thread(
+                bucket.abort_multipart_upload,
+                Bucket=_env.BUCKET_NAME,
+                Key=bucket_path,
+                UploadId=upload_id,
+            )
             raise Exception("Error on save file")
 
     @classmethod
+    @observed("bucket")
     def get_presigned_url(cls, path: str) -> str:
+        """
+        Presigned GET of path, the same url is handed out until it has less
+        than BUCKET_URL_REUSE_MARGIN_SECONDS of validity left
+        """
+        now = time.monotonic()
+        cached = cls.__presigned_urls.get(path)
+
+        if cached and cached[1] > now:
+            return cached[0]
+
         bucket = cls.__connect_on_client()
         url = bucket.generate_presigned_url(
             ClientMethod="get_object",
             Params={"Bucket": _env.BUCKET_NAME, "Key": path},
             ExpiresIn=_env.BUCKET_URL_EXPIRES_IN_SECONDS,
         )
+        reusable_for = _env.BUCKET_URL_EXPIRES_IN_SECONDS - _env.BUCKET_URL_REUSE_MARGIN_SECONDS
+
+        if reusable_for > 0:
+            cls.__presigned_urls = {
+                cached_path: entry for cached_path, entry in cls.__presigned_urls.items() if entry[1] > now
+            }
+            cls.__presigned_urls[path] = (url, now + reusable_for)
+
         return url
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await asyncio.to_thread(Bucket.verify_bucket)
+
+    except Exception as error:
+        # Exports fail until the bucket is reachable, the rest of the API does not need it
+        _logger.error(f"Error on verify bucket at startup: {str(error)}")
+
+    yield
+
+    await asyncio.to_thread(Bucket.close)
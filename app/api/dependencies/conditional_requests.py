@@ -0,0 +1,73 @@
+from email.utils import parsedate_to_datetime
+from fastapi import Depends, Query, Request
+from fastapi.exceptions import HTTPException
+from redis.asyncio import Redis
+from app.core.cache import PropertyVersions
+from app.core.db import get_redis
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    # Weak comparison, as required for If-None-Match
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    return etag.removeprefix("W/") in candidates
+
+
+def not_modified_since(if_modified_since: str, last_modified: str) -> bool:
+    if not if_modified_since:
+        return False
+
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+
+    except (TypeError, ValueError):
+        return False
+
+
+def is_not_modified(request: Request, version: dict) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+
+    # If-Modified-Since is ignored when If-None-Match is present (RFC 9110)
+    if if_none_match:
+        return etag_matches(if_none_match=if_none_match, etag=version["etag"])
+
+    return not_modified_since(
+        if_modified_since=request.headers.get("if-modified-since"),
+        last_modified=version["last_modified"]
+    )
+
+
+def representation_variant(fields: str) -> str:
+    """
+    Name the projection asked through fields=, the full representation has none
+    """
+    if not fields:
+        return ""
+
+    return ",".join(sorted({field.strip() for field in fields.split(",") if field.strip()} | {"id"}))
+
+
+def version_headers(version: dict) -> dict:
+    return {
+        "ETag": version["etag"],
+        "Last-Modified": version["last_modified"],
+        "Cache-Control": "no-cache",
+    }
+
+
+async def check_property_version(property_id: int, request: Request, fields: str = Query(default=None), redis: Redis = Depends(get_redis)):
+    """
+    Answer 304 from the cached version before any database connection is taken
+    """
+    if "if-none-match" not in request.headers and "if-modified-since" not in request.headers:
+        return
+
+    version = await PropertyVersions.get(property_id=property_id, redis=redis, variant=representation_variant(fields=fields))
+
+    if version and is_not_modified(request=request, version=version):
+        raise HTTPException(status_code=304, headers=version_headers(version=version))
@@ -0,0 +1,117 @@
+import asyncio
+import random
+import time
+from pathlib import Path
+from typing import Callable, Coroutine, Optional
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from app.core.configs import get_environment, get_logger
+
+_env = get_environment()
+_logger = get_logger(__name__)
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import ConsoleRenderer, HTMLRenderer, SpeedscopeRenderer
+
+except ImportError:
+    Profiler = None
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_TOKEN_HEADER = "X-Profile-Token"
+
+FORMATS = {
+    "speedscope": ("json", "application/json"),
+    "html": ("html", "text/html"),
+    "text": ("txt", "text/plain"),
+}
+
+
+class ProfiledRoute(APIRoute):
+    """
+    Route that can run its handler under pyinstrument, the statistical profiler
+    from requirements/profiling.txt. With PROFILING on, a PROFILING_SAMPLE_RATE
+    share of requests is profiled to PROFILING_DIRECTORY, and a request with
+    X-Profile: save or X-Profile: return, plus X-Profile-Token matching
+    PROFILING_TOKEN, is profiled on demand. Return answers with the profile
+    itself instead of the response. With PROFILING off the handler is left as it is.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[None, None, Response]]:
+        handler = super().get_route_handler()
+
+        if not _env.PROFILING:
+            return handler
+
+        if Profiler is None:
+            _logger.warning("PROFILING is on but pyinstrument is not installed, see requirements/profiling.txt")
+            return handler
+
+        async def profiled_handler(request: Request) -> Response:
+            mode = self.__profile_mode(request=request)
+
+            if not mode:
+                return await handler(request)
+
+            profiler = Profiler(interval=_env.PROFILING_INTERVAL_SECONDS, async_mode="enabled")
+            started = time.perf_counter()
+            profiler.start()
+
+            try:
+                response = await handler(request)
+
+            finally:
+                profiler.stop()
+
+            extension, media_type = FORMATS[_env.PROFILING_FORMAT]
+            output = profiler.output(renderer=self.__renderer())
+
+            if mode == "return":
+                return Response(
+                    content=output,
+                    media_type=media_type,
+                    headers={"X-Profile-Status": str(response.status_code)}
+                )
+
+            name = f"{time.strftime('%Y%m%dT%H%M%S')}-{request.method}-{self.name}-{(time.perf_counter() - started) * 1000:.0f}ms.{extension}"
+
+            try:
+                await asyncio.to_thread(self.__save, name=name, output=output)
+                response.headers["X-Profile-File"] = name
+
+            except Exception as error:
+                _logger.error(f"Error on save profile {name}: {str(error)}")
+
+            return response
+
+        return profiled_handler
+
+    @staticmethod
+    def __profile_mode(request: Request) -> Optional[str]:
+        requested = request.headers.get(PROFILE_HEADER)
+
+        if requested:
+            if not _env.PROFILING_TOKEN or request.headers.get(PROFILE_TOKEN_HEADER) != _env.PROFILING_TOKEN:
+                # Profiles expose the internals, only whoever holds the token may ask for one
+                return
+
+            return "return" if requested.lower() == "return" else "save"
+
+        if _env.PROFILING_SAMPLE_RATE and random.random() < _env.PROFILING_SAMPLE_RATE:
+            return "save"
+
+    @staticmethod
+    def __renderer():
+        if _env.PROFILING_FORMAT == "html":
+            return HTMLRenderer()
+
+        if _env.PROFILING_FORMAT == "text":
+            return ConsoleRenderer(unicode=True)
+
+        return SpeedscopeRenderer()
+
+    @staticmethod
+    def __save(name: str, output: str):
+        directory = Path(_env.PROFILING_DIRECTORY)
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / name).write_text(output, encoding="UTF-8")
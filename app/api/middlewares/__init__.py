@@ -0,0 +1 @@
+from .metrics_middleware import MetricsMiddleware
@@ -0,0 +1,58 @@
+import time
+from typing import Dict
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.configs import get_environment
+from app.core.metrics import current_timings, record_request, reset_timings, start_timings
+
+_env = get_environment()
+
+
+def server_timing(timings: Dict[str, float], total: float) -> str:
+    metrics = [f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in sorted(timings.items())]
+    metrics.append(f"total;dur={total * 1000:.3f}")
+
+    return ", ".join(metrics)
+
+
+class MetricsMiddleware:
+    """
+    Times every request by route template, and collects the stages timed while
+    serving it into a Server-Timing header. Plain ASGI, so the stages recorded
+    down the stack share the context started here.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        token = start_timings()
+
+        async def send_with_timing(message: Message):
+            if message["type"] == "http.response.start":
+                elapsed = time.perf_counter() - started
+                route = scope.get("route")
+
+                record_request(
+                    method=scope["method"],
+                    # Templates rather than raw paths, so every property id is the same series
+                    route=route.path if route else "unmatched",
+                    status=message["status"],
+                    seconds=elapsed
+                )
+
+                if _env.SERVER_TIMING:
+                    MutableHeaders(scope=message).append("Server-Timing", server_timing(timings=current_timings(), total=elapsed))
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+
+        finally:
+            reset_timings(token)
@@ -1 +1,3 @@
 from .property_routes import router as property_router
+from .admin_routes import router as admin_router
+from .metrics_routes import router as metrics_router
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Depends
+from app.api.composers import property_composer
+from app.api.dependencies import require_admin_token
+from app.core.services import PropertyServices
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin_token)])
+
+
+@router.get("/cache/stats")
+async def search_cache_stats():
+    return PropertyServices.cache_stats()
+
+@router.post("/cache/invalidate")
+async def invalidate_cache(services: PropertyServices = Depends(property_composer)):
+    version = await services.invalidate_caches()
+    return {"data_version": version}
@@ -1,22 +1,75 @@
-from fastapi import APIRouter, Depends, Query
-from fastapi.responses import JSONResponse
-from fastapi.encoders import jsonable_encoder
+import hashlib
+from typing import List, Literal
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import Response
 from fastapi.exceptions import HTTPException
 from app.api.composers import property_composer
-from app.core.services import PropertyServices
-from app.api.shared_schemas import PredictProperty, PredictedProperty
+from app.api.dependencies import FastJSONResponse, ProfiledRoute, check_property_version, is_not_modified, representation_variant, version_headers
+from app.core.services import PropertyServices, ExportJobs, get_export_jobs, encode_cursor, decode_cursor, parse_fields
+from app.core.entities import ExportJob, ExportJobStatus, GeoArea
+from app.core.configs import get_environment
+from app.api.shared_schemas import PredictProperty, PredictedProperty, BatchPrediction
 
-router = APIRouter(prefix="/properties", tags=["Property"])
+_env = get_environment()
 
+router = APIRouter(prefix="/properties", tags=["Property"], default_response_class=FastJSONResponse, route_class=ProfiledRoute)
 
-@router.get("/{property_id}")
-async def search_property_by_id(property_id: int, services: PropertyServices = Depends(property_composer)):
-    property_in_db = await services.search_by_id(property_id=property_id)
+
+@router.get("/{property_id}", dependencies=[Depends(check_property_version)])
+async def search_property_by_id(
+    property_id: int,
+    request: Request,
+    fields: str = Query(default=None, description="Comma separated fields to return, id is always included"),
+    services: PropertyServices = Depends(property_composer)
+):
+    try:
+        projection = parse_fields(fields)
+
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+    property_in_db = await services.search_by_id(property_id=property_id, fields=projection)
 
     if not property_in_db:
         raise HTTPException(status_code=404, detail="Not found")
 
-    return property_in_db
+    response = FastJSONResponse(property_in_db)
+    etag = f'"{hashlib.sha1(response.body).hexdigest()}"'
+    version = await services.save_property_version(
+        property_id=property_id,
+        etag=etag,
+        variant=representation_variant(fields=fields)
+    )
+
+    if is_not_modified(request=request, version=version):
+        raise HTTPException(status_code=304, headers=version_headers(version=version))
+
+    response.headers.update(version_headers(version=version))
+
+    return response
+
+@router.get("/{property_id}/similar")
+async def search_similar_properties(
+    property_id: int,
+    k: int = Query(default=10, ge=1, le=_env.SIMILAR_PROPERTIES_MAX_K),
+    fields: str = Query(default=None, description="Comma separated fields to return, id is always included"),
+    services: PropertyServices = Depends(property_composer)
+):
+    try:
+        projection = parse_fields(fields)
+
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+    if not services.has_similarity_index:
+        raise HTTPException(status_code=503, detail="Similarity index is not loaded")
+
+    properties = await services.search_similar(property_id=property_id, k=k, fields=projection)
+
+    if properties is None:
+        raise HTTPException(status_code=404, detail="Not found")
+
+    return FastJSONResponse({"data": properties})
 
 @router.get("")
 async def search_all_properties(
@@ -27,8 +80,56 @@ async def search_all_properties(
     parking_space: int = Query(default=None),
     size: int = Query(default=None),
     zip_code: str = Query(default=None),
+    cursor: str = Query(default=None),
+    after_id: int = Query(default=None),
+    count_mode: Literal["exact", "estimated"] = Query(default="exact"),
+    fields: str = Query(default=None, description="Comma separated fields to return, id is always included"),
+    is_active: bool = Query(default=None),
+    bbox: str = Query(default=None, description="min_lng,min_lat,max_lng,max_lat"),
+    lat: float = Query(default=None),
+    lng: float = Query(default=None),
+    radius: float = Query(default=None, description="Meters around lat/lng"),
     services: PropertyServices = Depends(property_composer)
 ):
+    if cursor:
+        try:
+            after_id = decode_cursor(cursor)
+
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    try:
+        projection = parse_fields(fields)
+        area = GeoArea.from_query(bbox=bbox, lat=lat, lng=lng, radius=radius)
+
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+    if area and after_id is not None:
+        raise HTTPException(status_code=400, detail="Geo searches are ordered by distance and page by offset only")
+
+    cache_params = {
+        "page_size": page_size,
+        "offset": None if after_id else offset,
+        "after_id": after_id,
+        "rooms": rooms,
+        "bathrooms": bathrooms,
+        "parking_space": parking_space,
+        "size": size,
+        "zip_code": zip_code,
+        "is_active": is_active,
+        "bbox": bbox,
+        "lat": lat,
+        "lng": lng,
+        "radius": radius,
+        "count_mode": count_mode,
+        "fields": ",".join(projection) if projection else None,
+    }
+    cached_body = await services.search_cached_response(params=cache_params)
+
+    if cached_body:
+        return Response(content=cached_body, media_type="application/json")
+
     properties = await services.search_all(
         page_size=page_size,
         offset=offset,
@@ -36,24 +137,65 @@ async def search_all_properties(
         bathrooms=bathrooms,
         parking_space=parking_space,
         size=size,
-        zip_code=zip_code
+        zip_code=zip_code,
+        after_id=after_id,
+        fields=projection,
+        is_active=is_active,
+        area=area
     )
-    quantity = await services.count_search_all()
 
     if not properties:
         raise HTTPException(status_code=404, detail="Not found")
 
-    return JSONResponse(jsonable_encoder({"count": quantity, "data": properties}))
+    quantity = await services.count_search_all(
+        rooms=rooms,
+        bathrooms=bathrooms,
+        parking_space=parking_space,
+        size=size,
+        zip_code=zip_code,
+        estimated=count_mode == "estimated",
+        is_active=is_active,
+        area=area
+    )
+
+    next_cursor = encode_cursor(properties[-1]["id"]) if len(properties) == page_size and not area else None
+
+    response = FastJSONResponse({"count": quantity, "data": properties, "next_cursor": next_cursor})
+    await services.cache_response(params=cache_params, body=response.body)
+
+    return response
 
 @router.get("/export/csv")
-async def search_all_properties_in_csv(model_id: int, services: PropertyServices = Depends(property_composer)):
-    file_url = await services.export_to_csv(model_id=model_id)
+async def search_all_properties_in_csv(model_id: int, export_jobs: ExportJobs = Depends(get_export_jobs)):
+    job = await export_jobs.submit(model_id=model_id)
+    job = await export_jobs.wait(job_id=job.job_id, timeout=_env.EXPORT_JOB_WAIT_SECONDS)
+
+    if job and job.status == ExportJobStatus.FAILED:
+        raise HTTPException(status_code=500, detail="Error on export")
 
-    if not file_url:
+    if job and job.is_finished and not job.file_url:
         raise HTTPException(status_code=404, detail="Not found")
 
-    data = {"file_url": file_url}
-    return JSONResponse(jsonable_encoder(data))
+    if not job or not job.is_finished:
+        # Still running, let the client follow the job instead of holding the request
+        return FastJSONResponse(job, status_code=202)
+
+    data = {"file_url": job.file_url}
+    return FastJSONResponse(data)
+
+@router.post("/export/csv", status_code=202)
+async def submit_export_job(model_id: int, export_jobs: ExportJobs = Depends(get_export_jobs)) -> ExportJob:
+    job = await export_jobs.submit(model_id=model_id)
+    return job
+
+@router.get("/export/csv/{job_id}")
+async def search_export_job(job_id: str, export_jobs: ExportJobs = Depends(get_export_jobs)) -> ExportJob:
+    job = await export_jobs.get(job_id=job_id)
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Not found")
+
+    return job
 
 @router.post("/price/predict")
 async def predict_price(
@@ -67,3 +209,16 @@ async def predict_price(
         raise HTTPException(status_code=404, detail="Not found")
 
     return predicted_property
+
+@router.post("/price/predict/batch")
+async def predict_prices(
+    predict_prices: List[PredictProperty],
+    model_id: int = None,
+    services: PropertyServices = Depends(property_composer)
+) -> List[BatchPrediction]:
+    if len(predict_prices) > _env.BATCH_PREDICT_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {_env.BATCH_PREDICT_MAX_ITEMS} properties per batch")
+
+    predicted_properties = await services.predict_prices(predict_properties=predict_prices, model_id=model_id)
+
+    return predicted_properties
@@ -1 +1 @@
-from .properties import PredictProperty, Property, PredictedProperty
+from .properties import PredictProperty, Property, PredictedProperty, BatchPrediction
@@ -22,3 +22,9 @@ class PredictedProperty(BaseModel):
     property: Property
     predicted_price: float = Field(example=123)
     mse: float = Field(example=123)
+
+
+class BatchPrediction(BaseModel):
+    index: int = Field(example=0)
+    predicted_property: Optional[PredictedProperty] = Field(default=None)
+    error: Optional[str] = Field(default=None, example="Address not found")
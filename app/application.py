@@ -1,11 +1,24 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.api.routes import property_router
+from app.api.dependencies import bucket_lifespan
+from app.api.middlewares import MetricsMiddleware
+from app.api.routes import property_router, admin_router, metrics_router
+from app.core.clients import lifespan as clients_lifespan
+from app.core.db import DatabaseUnavailable, database_unavailable_handler, lifespan as database_lifespan, redis_lifespan, property_search_lifespan, property_snapshot_lifespan, similarity_index_lifespan
+from app.core.services.export_jobs import lifespan as export_jobs_lifespan
 from starlette.middleware.cors import CORSMiddleware
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with database_lifespan(app), redis_lifespan(app), property_search_lifespan(app), property_snapshot_lifespan(app), similarity_index_lifespan(app), clients_lifespan(app), bucket_lifespan(app), export_jobs_lifespan(app):
+        yield
+
+
 def create_app() -> FastAPI:
     app = FastAPI(
-        title="PropertyAPI")
+        title="PropertyAPI",
+        lifespan=lifespan)
 
     app.add_middleware(
         CORSMiddleware,
@@ -13,8 +26,13 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["Server-Timing"],
     )
+    app.add_middleware(MetricsMiddleware)
+    app.add_exception_handler(DatabaseUnavailable, database_unavailable_handler)
 
     app.include_router(property_router)
+    app.include_router(admin_router)
+    app.include_router(metrics_router)
 
     return app
@@ -0,0 +1,6 @@
+from .ttl_cache import TTLCache
+from .data_version import DataVersion, get_data_version
+from .address_cache import AddressCache
+from .single_flight import SingleFlight
+from .property_versions import PropertyVersions
+from .response_cache import ResponseCache
@@ -0,0 +1,88 @@
+import json
+from typing import Any, Optional
+from app.core.configs import get_environment, get_logger
+from redis.asyncio import Redis
+from app.core.metrics import observed, record_cache
+from .ttl_cache import TTLCache
+
+_env = get_environment()
+_logger = get_logger(__name__)
+
+
+class AddressCache:
+    """
+    Two-tier zip code cache: an in-process LRU in front of Redis.
+    Unknown zip codes are cached as None for a shorter time.
+    """
+
+    MISSING = object()
+
+    def __init__(self) -> None:
+        self.__local = TTLCache(
+            max_size=_env.ADDRESS_CACHE_LOCAL_MAX_SIZE,
+            ttl=_env.ADDRESS_CACHE_LOCAL_TTL_SECONDS
+        )
+        self.redis_hits = 0
+        self.redis_misses = 0
+
+    @observed("cache", "addresses.get")
+    async def get(self, zip_code: str, redis: Redis) -> Any:
+        """
+        Return the cached address, None for a known unknown zip code or MISSING
+        """
+        address = self.__local.get(zip_code, self.MISSING)
+
+        if address is not self.MISSING:
+            record_cache(cache="addresses", result="local_hit")
+            return address
+
+        try:
+            raw_address = await redis.get(self.__key(zip_code=zip_code))
+
+        except Exception as error:
+            record_cache(cache="addresses", result="error")
+            _logger.error(f"Error on read address cache: {str(error)}")
+            return self.MISSING
+
+        if raw_address is None:
+            record_cache(cache="addresses", result="miss")
+            self.redis_misses += 1
+            return self.MISSING
+
+        record_cache(cache="addresses", result="redis_hit")
+        self.redis_hits += 1
+        address = json.loads(raw_address)
+        self.__local.set(zip_code, address, ttl=self.__local_ttl(address=address))
+
+        return address
+
+    @observed("cache", "addresses.set")
+    async def set(self, zip_code: str, address: Optional[dict], redis: Redis):
+        self.__local.set(zip_code, address, ttl=self.__local_ttl(address=address))
+
+        try:
+            await redis.setex(
+                name=self.__key(zip_code=zip_code),
+                value=json.dumps(address),
+                time=_env.ADDRESS_CACHE_REDIS_TTL_SECONDS if address else _env.ADDRESS_CACHE_NEGATIVE_TTL_SECONDS
+            )
+
+        except Exception as error:
+            _logger.error(f"Error on write address cache: {str(error)}")
+
+    def stats(self) -> dict:
+        return {
+            "local": self.__local.stats(),
+            "redis": {"hits": self.redis_hits, "misses": self.redis_misses},
+        }
+
+    @staticmethod
+    def __local_ttl(address: Optional[dict]) -> float:
+        if address:
+            return _env.ADDRESS_CACHE_LOCAL_TTL_SECONDS
+
+        return min(_env.ADDRESS_CACHE_LOCAL_TTL_SECONDS, _env.ADDRESS_CACHE_NEGATIVE_TTL_SECONDS)
+
+    @staticmethod
+    def __key(zip_code: str) -> str:
+        return f"address:zip-code:{zip_code}"
@@ -0,0 +1,54 @@
+import time
+from redis.asyncio import Redis
+from app.core.configs import get_environment, get_logger
+
+_env = get_environment()
+_logger = get_logger(__name__)
+
+
+class DataVersion:
+    """
+    Version of the property data, bumped in Redis after every change so caches
+    that carry it in their keys are invalidated in all processes at once.
+    Read from Redis at most every RESPONSE_CACHE_VERSION_CHECK_SECONDS.
+    """
+
+    KEY = "properties:data-version"
+
+    def __init__(self) -> None:
+        self.__version = None
+        self.__checked_at = 0.0
+
+    async def get(self, redis: Redis) -> int:
+        # Asking Redis on every request would cost a round trip even on local hits
+        if time.monotonic() - self.__checked_at < _env.RESPONSE_CACHE_VERSION_CHECK_SECONDS:
+            return self.__version
+
+        try:
+            version = int(await redis.get(self.KEY) or 0)
+
+        except Exception as error:
+            _logger.error(f"Error on read data version: {str(error)}")
+            return self.__version or 0
+
+        self.__use(version=version)
+
+        return version
+
+    async def bump(self, redis: Redis) -> int:
+        version = await redis.incr(self.KEY)
+        self.__use(version=version)
+
+        return version
+
+    def __use(self, version: int):
+        self.__version = version
+        self.__checked_at = time.monotonic()
+
+
+_data_version = DataVersion()
+
+
+def get_data_version() -> DataVersion:
+    """Helper function to get the data version shared by the caches of this process"""
+    return _data_version
@@ -0,0 +1,70 @@
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Optional
+from redis.asyncio import Redis
+from app.core.configs import get_environment, get_logger
+from app.core.metrics import observed, record_cache, timed
+from .data_version import get_data_version
+
+_env = get_environment()
+_logger = get_logger(__name__)
+
+
+class PropertyVersions:
+    """
+    ETag and Last-Modified of each property detail, kept in Redis so
+    conditional requests can be answered without querying Postgres.
+    Each projection of a property (see fields=) is a variant with its own version.
+    Keys carry the data version, so an invalidation drops every stored version.
+    """
+
+    @classmethod
+    @observed("cache", "versions.get")
+    async def get(cls, property_id: int, redis: Redis, variant: str = "") -> Optional[dict]:
+        try:
+            key = await cls.__key(property_id=property_id, variant=variant, redis=redis)
+            raw_version = await redis.get(key)
+            record_cache(cache="versions", result="hit" if raw_version else "miss")
+
+            if raw_version:
+                return json.loads(raw_version)
+
+        except Exception as error:
+            record_cache(cache="versions", result="error")
+            _logger.error(f"Error on read property version: {str(error)}")
+
+    @classmethod
+    async def save(cls, property_id: int, etag: str, redis: Redis, variant: str = "") -> dict:
+        """
+        Store the current ETag, Last-Modified only moves when the ETag changes
+        """
+        version = await cls.get(property_id=property_id, redis=redis, variant=variant)
+
+        if not version or version["etag"] != etag:
+            version = {
+                "etag": etag,
+                "last_modified": format_datetime(datetime.now(timezone.utc), usegmt=True),
+            }
+
+        try:
+            with timed(stage="cache", operation="versions.set"):
+                await redis.setex(
+                    name=await cls.__key(property_id=property_id, variant=variant, redis=redis),
+                    value=json.dumps(version),
+                    time=_env.PROPERTY_VERSION_TTL_SECONDS
+                )
+
+        except Exception as error:
+            _logger.error(f"Error on save property version: {str(error)}")
+
+        return version
+
+    @staticmethod
+    async def __key(property_id: int, redis: Redis, variant: str = "") -> str:
+        version = await get_data_version().get(redis=redis)
+
+        if variant:
+            return f"property:version:v{version}:{property_id}:{variant}"
+
+        return f"property:version:v{version}:{property_id}"
@@ -0,0 +1,122 @@
+import hashlib
+import json
+from typing import Optional
+from redis.asyncio import Redis
+from app.core.configs import get_environment, get_logger
+from app.core.metrics import observed, record_cache
+from .data_version import DataVersion, get_data_version
+from .ttl_cache import TTLCache
+
+_env = get_environment()
+_logger = get_logger(__name__)
+
+
+class ResponseCache:
+    """
+    Serialized list responses in an in-process LRU bounded by entries and bytes, in front of Redis.
+    Every key carries the data version, bumping it in Redis invalidates all processes at once.
+    """
+
+    VERSION_KEY = DataVersion.KEY
+
+    def __init__(self) -> None:
+        self.__local = TTLCache(
+            max_size=_env.RESPONSE_CACHE_LOCAL_MAX_SIZE,
+            ttl=_env.RESPONSE_CACHE_TTL_SECONDS,
+            max_bytes=_env.RESPONSE_CACHE_LOCAL_MAX_BYTES
+        )
+        self.__version = None
+        self.redis_hits = 0
+        self.redis_misses = 0
+
+    @observed("cache", "responses.get")
+    async def get(self, params: dict, redis: Redis) -> Optional[bytes]:
+        key = await self.__key(params=params, redis=redis)
+        body = self.__local.get(key)
+
+        if body is not None:
+            record_cache(cache="responses", result="local_hit")
+            return body
+
+        try:
+            raw_body = await redis.get(key)
+
+        except Exception as error:
+            record_cache(cache="responses", result="error")
+            _logger.error(f"Error on read response cache: {str(error)}")
+            return
+
+        if raw_body is None:
+            record_cache(cache="responses", result="miss")
+            self.redis_misses += 1
+            return
+
+        record_cache(cache="responses", result="redis_hit")
+        self.redis_hits += 1
+        body = raw_body.encode("UTF-8")
+        self.__local.set(key, body)
+
+        return body
+
+    @observed("cache", "responses.set")
+    async def set(self, params: dict, body: bytes, redis: Redis):
+        key = await self.__key(params=params, redis=redis)
+        self.__local.set(key, body)
+
+        try:
+            await redis.setex(name=key, value=body, time=_env.RESPONSE_CACHE_TTL_SECONDS)
+
+        except Exception as error:
+            _logger.error(f"Error on write response cache: {str(error)}")
+
+    async def invalidate(self, redis: Redis) -> int:
+        """
+        Bump the data version, entries of older versions are never read again
+        """
+        version = await get_data_version().bump(redis=redis)
+        self.__use_version(version=version)
+
+        return version
+
+    def stats(self) -> dict:
+        local = self.__local.stats()
+        redis_lookups = self.redis_hits + self.redis_misses
+        hits = local["hits"] + self.redis_hits
+
+        return {
+            "data_version": self.__version,
+            "hit_ratio": hits / (local["hits"] + local["misses"]) if local["hits"] + local["misses"] else 0.0,
+            "local": local,
+            "redis": {
+                "hits": self.redis_hits,
+                "misses": self.redis_misses,
+                "hit_ratio": self.redis_hits / redis_lookups if redis_lookups else 0.0,
+            },
+        }
+
+    async def __data_version(self, redis: Redis) -> int:
+        version = await get_data_version().get(redis=redis)
+        self.__use_version(version=version)
+
+        return version
+
+    def __use_version(self, version: int):
+        if version != self.__version:
+            self.__local.clear()
+
+        self.__version = version
+
+    async def __key(self, params: dict, redis: Redis) -> str:
+        # Unset filters and pagination left at its default share one entry
+        normalized = {name: value for name, value in params.items() if self.__is_set(value=value)}
+        digest = hashlib.sha1(json.dumps(normalized, sort_keys=True).encode("UTF-8")).hexdigest()
+        version = await self.__data_version(redis=redis)
+
+        return f"response:properties:v{version}:{digest}"
+
+    @staticmethod
+    def __is_set(value) -> bool:
+        if isinstance(value, bool):
+            return True
+
+        return value not in (None, "", 0)
@@ -0,0 +1,38 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Runs a single call per key at a time, concurrent callers for the
+    same key await the result of the call already in flight
+    """
+
+    def __init__(self) -> None:
+        self.joined = 0
+        self.__calls: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, function: Callable[[], Awaitable[Any]]) -> Any:
+        call = self.__calls.get(key)
+
+        if call is None:
+            # The call runs on its own task so a cancelled caller doesn't cancel the others
+            call = asyncio.ensure_future(function())
+            self.__calls[key] = call
+            call.add_done_callback(lambda _: self.__forget(key=key, call=call))
+
+        else:
+            self.joined += 1
+
+        return await asyncio.shield(call)
+
+    def __forget(self, key: str, call: asyncio.Future):
+        if self.__calls.get(key) is call:
+            del self.__calls[key]
+
+        if not call.cancelled():
+            # Mark the error as seen even when every caller went away
+            call.exception()
+
+    def __len__(self) -> int:
+        return len(self.__calls)
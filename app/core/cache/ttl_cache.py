@@ -0,0 +1,71 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class TTLCache:
+    """
+    In-process LRU cache whose entries expire after a time to live.
+    With max_bytes set, bytes and str values are also bounded by their total size.
+    """
+
+    def __init__(self, max_size: int, ttl: float, max_bytes: int = None) -> None:
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.memory_bytes = 0
+        self.__entries: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self.__entries.get(key)
+
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self.delete(key)
+
+            self.misses += 1
+            return default
+
+        self.__entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self.delete(key)
+        self.__entries[key] = (expires_at, value)
+        self.memory_bytes += self.__sizeof(value)
+
+        while len(self.__entries) > self.max_size or (self.max_bytes and self.memory_bytes > self.max_bytes):
+            _, (_, evicted) = self.__entries.popitem(last=False)
+            self.memory_bytes -= self.__sizeof(evicted)
+
+    def delete(self, key: Hashable):
+        entry = self.__entries.pop(key, None)
+
+        if entry is not None:
+            self.memory_bytes -= self.__sizeof(entry[1])
+
+    def clear(self):
+        self.__entries.clear()
+        self.memory_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            "size": len(self.__entries),
+            "max_size": self.max_size,
+            "memory_bytes": self.memory_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / requests if requests else 0.0,
+        }
+
+    @staticmethod
+    def __sizeof(value: Any) -> int:
+        return len(value) if isinstance(value, (bytes, str)) else 0
@@ -0,0 +1,48 @@
+"""
+Clients for the upstream HTTP services
+"""
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from app.core.configs import get_environment
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .upstream_client import UpstreamClient, backoff_delay
+
+_env = get_environment()
+_clients = {}
+
+
+def get_address_client() -> UpstreamClient:
+    """Helper function to get the shared address service client"""
+    if "address" not in _clients:
+        _clients["address"] = UpstreamClient(
+            name="address",
+            base_url=_env.ADDRESS_SERVICES_URL,
+            timeout=_env.ADDRESS_SERVICES_TIMEOUT_SECONDS,
+            attempts=_env.ADDRESS_SERVICES_RETRY_ATTEMPTS
+        )
+
+    return _clients["address"]
+
+
+def get_grey_wolf_client() -> UpstreamClient:
+    """Helper function to get the shared Grey Wolf client"""
+    if "grey_wolf" not in _clients:
+        _clients["grey_wolf"] = UpstreamClient(
+            name="grey_wolf",
+            base_url=_env.GREY_WOLF_URL,
+            timeout=_env.GREY_WOLF_TIMEOUT_SECONDS,
+            attempts=_env.GREY_WOLF_RETRY_ATTEMPTS
+        )
+
+    return _clients["grey_wolf"]
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+
+    for client in _clients.values():
+        await client.close()
+
+    _clients.clear()
@@ -0,0 +1,58 @@
+import time
+from app.core.configs import get_logger
+
+_logger = get_logger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when a call is refused because the upstream circuit is open
+    """
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream after consecutive failures and lets a single
+    trial call through once the reset timeout has passed
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.__opened_at = 0.0
+
+    def before_call(self):
+        if self.state == self.CLOSED:
+            return
+
+        if time.monotonic() - self.__opened_at >= self.reset_timeout:
+            # One trial call per reset window, the others keep failing fast
+            self.state = self.HALF_OPEN
+            self.__opened_at = time.monotonic()
+            return
+
+        raise CircuitOpenError(f"Circuit {self.name} is open")
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            _logger.info(f"Circuit {self.name} closed")
+
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                _logger.warning(f"Circuit {self.name} opened after {self.failures} failures")
+
+            self.state = self.OPEN
+            self.__opened_at = time.monotonic()
@@ -0,0 +1,96 @@
+import asyncio
+import random
+import httpx
+from app.core.configs import get_environment, get_logger
+from app.core.metrics import timed
+from .circuit_breaker import CircuitBreaker
+
+_env = get_environment()
+_logger = get_logger(__name__)
+
+
+def backoff_delay(attempt: int, base: float = None, maximum: float = None) -> float:
+    """
+    Exponential backoff with full jitter for the given attempt, starting at 0,
+    bounded by the HTTP_BACKOFF_* settings unless base and maximum are given
+    """
+    base = _env.HTTP_BACKOFF_BASE_SECONDS if base is None else base
+    maximum = _env.HTTP_BACKOFF_MAX_SECONDS if maximum is None else maximum
+    ceiling = min(maximum, base * 2 ** attempt)
+    return random.uniform(0, ceiling)
+
+
+class UpstreamClient:
+    """
+    Keep-alive pooled HTTP client for one upstream service, retrying
+    transport errors and 5xx responses behind a circuit breaker
+    """
+
+    def __init__(self, name: str, base_url: str, timeout: float, attempts: int) -> None:
+        if attempts < 1:
+            raise ValueError(f"{name} needs at least 1 attempt, got {attempts}")
+
+        self.name = name
+        self.attempts = attempts
+        self.breaker = CircuitBreaker(
+            name=name,
+            failure_threshold=_env.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=_env.CIRCUIT_BREAKER_RESET_SECONDS
+        )
+        self.__client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(timeout, connect=_env.HTTP_CONNECT_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=_env.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=_env.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=_env.HTTP_KEEPALIVE_EXPIRY_SECONDS
+            )
+        )
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def request(self, method: str, url: str, timeout: float = None, attempts: int = None, **kwargs) -> httpx.Response:
+        attempts = self.attempts if attempts is None else attempts
+
+        if attempts < 1:
+            raise ValueError(f"{self.name} needs at least 1 attempt, got {attempts}")
+
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+
+        last_error = None
+
+        for attempt in range(attempts):
+            if attempt:
+                await asyncio.sleep(backoff_delay(attempt - 1))
+
+            self.breaker.before_call()
+
+            try:
+                with timed(stage="upstream", operation=self.name):
+                    response = await self.__client.request(method, url, **kwargs)
+
+                if response.status_code < 500:
+                    self.breaker.record_success()
+                    return response
+
+                self.breaker.record_failure()
+
+                if attempt == attempts - 1:
+                    return response
+
+                _logger.warning(f"{self.name} answered {response.status_code} - attempt {attempt + 1}")
+
+            except httpx.TransportError as error:
+                self.breaker.record_failure()
+                last_error = error
+                _logger.warning(f"Error on {self.name} request: {str(error)} - attempt {attempt + 1}")
+
+        raise last_error
+
+    async def close(self):
+        await self.__client.aclose()
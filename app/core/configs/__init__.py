@@ -16,4 +16,4 @@ def get_environment():
 @lru_cache()
 def get_logger(name):
     """Helper function to get Logger"""
-    return Logger(name=name).get_logger()
+    return Logger(name=name, environment=get_environment()).get_logger()
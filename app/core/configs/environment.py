@@ -2,6 +2,7 @@
 Module to load all Environment variables
 """
 
+from typing import Literal
 from pydantic_settings import BaseSettings
 
 
@@ -24,11 +25,36 @@ class Environment(BaseSettings):
     DATABASE_NAME: str = "test"
     ENVIRONMENT: str = "test"
     DATABASE_MIN_CONNECTIONS: int = 1
-    DATABASE_MAX_CONNECTIONS: int = 1
+    DATABASE_MAX_CONNECTIONS: int = 10
+    DATABASE_POOL_TIMEOUT: float = 5.0
+    DATABASE_POOL_MAX_WAITING: int = 0
+    DATABASE_POOL_MAX_IDLE: float = 600.0
+    DATABASE_POOL_MAX_LIFETIME: float = 3600.0
+    DATABASE_MIGRATE_ON_STARTUP: bool = False
+    DATABASE_RETRY_ATTEMPTS: int = 3
+    DATABASE_RETRY_DEADLINE_SECONDS: float = 3.0
+    DATABASE_BACKOFF_BASE_SECONDS: float = 0.05
+    DATABASE_BACKOFF_MAX_SECONDS: float = 0.5
+    PROPERTY_SEARCH_VIEW: bool = False
+    PROPERTY_SEARCH_REFRESH_SECONDS: float = 60.0
+    PROPERTY_SNAPSHOT: bool = False
+    PROPERTY_SNAPSHOT_REFRESH_SECONDS: float = 30.0
+    PROPERTY_SNAPSHOT_FULL_RELOAD_SECONDS: float = 900.0
+    PROPERTY_SNAPSHOT_BATCH_SIZE: int = 5000
+    SIMILAR_PROPERTIES_INDEX: bool = False
+    SIMILAR_PROPERTIES_REFRESH_SECONDS: float = 60.0
+    SIMILAR_PROPERTIES_FULL_RELOAD_SECONDS: float = 3600.0
+    SIMILAR_PROPERTIES_REBUILD_RATIO: float = 0.1
+    SIMILAR_PROPERTIES_BATCH_SIZE: int = 20000
+    SIMILAR_PROPERTIES_MAX_K: int = 50
 
     # REDIS
     REDIS_HOST: str
     REDIS_PORT: str
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_SOCKET_TIMEOUT_SECONDS: float = 1.0
+    REDIS_CONNECT_TIMEOUT_SECONDS: float = 1.0
+    REDIS_HEALTH_CHECK_INTERVAL_SECONDS: int = 30
 
     # S3
     BUCKET_BASE_URL: str = "localhost"
@@ -37,9 +63,80 @@ class Environment(BaseSettings):
     BUCKET_NAME: str = "test"
     BUCKET_ACL: str = "test"
     BUCKET_URL_EXPIRES_IN_SECONDS: int = 0
+    BUCKET_MULTIPART_PART_SIZE: int = 8 * 1024 * 1024
+    BUCKET_URL_REUSE_MARGIN_SECONDS: int = 30
+    BUCKET_TRANSFER_CONCURRENCY: int = 4
+    BUCKET_MAX_POOL_CONNECTIONS: int = 16
+    BUCKET_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    BUCKET_READ_TIMEOUT_SECONDS: float = 30.0
+    BUCKET_MAX_ATTEMPTS: int = 3
+
+    # CACHE
+    COUNT_CACHE_TTL_SECONDS: float = 30.0
+    COUNT_CACHE_MAX_SIZE: int = 1024
+    PROPERTY_VERSION_TTL_SECONDS: int = 60
+    ADDRESS_CACHE_LOCAL_TTL_SECONDS: float = 300.0
+    ADDRESS_CACHE_LOCAL_MAX_SIZE: int = 10000
+    ADDRESS_CACHE_REDIS_TTL_SECONDS: int = 86400
+    ADDRESS_CACHE_NEGATIVE_TTL_SECONDS: int = 60
+    RESPONSE_CACHE_TTL_SECONDS: int = 30
+    RESPONSE_CACHE_LOCAL_MAX_SIZE: int = 1024
+    RESPONSE_CACHE_LOCAL_MAX_BYTES: int = 64 * 1024 * 1024
+    RESPONSE_CACHE_VERSION_CHECK_SECONDS: float = 1.0
+
+    # EXPORT JOBS
+    EXPORT_WORKERS: int = 1
+    EXPORT_JOB_TTL_SECONDS: int = 86400
+    EXPORT_JOB_WAIT_SECONDS: float = 20.0
+    EXPORT_JOB_HEARTBEAT_SECONDS: float = 10.0
+    EXPORT_JOB_STALE_SECONDS: float = 60.0
+    EXPORT_PROGRESS_INTERVAL_ROWS: int = 10000
 
     GREY_WOLF_URL: str
+    GREY_WOLF_TIMEOUT_SECONDS: float = 10.0
+    GREY_WOLF_RETRY_ATTEMPTS: int = 1
     ADDRESS_SERVICES_URL: str
+    ADDRESS_SERVICES_TIMEOUT_SECONDS: float = 3.0
+    ADDRESS_SERVICES_RETRY_ATTEMPTS: int = 5
+
+    PREDICTION_DISTRIBUTED_LOCK: bool = False
+    PREDICTION_LOCK_TTL_SECONDS: float = 15.0
+    PREDICTION_LOCK_WAIT_SECONDS: float = 10.0
+    BATCH_PREDICT_MAX_ITEMS: int = 1000
+    BATCH_PREDICT_CONCURRENCY: int = 8
+
+    # LOGGING
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: str = ""
+    LOG_FORMAT: Literal["text", "json"] = "text"
+    LOG_FILE: str = "debug.log"
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_RATE_LIMIT_PER_SECOND: float = 10.0
+    LOG_RATE_LIMIT_BURST: int = 20
+
+    # METRICS
+    SERVER_TIMING: bool = True
+
+    # PROFILING
+    PROFILING: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_TOKEN: str = ""
+    PROFILING_DIRECTORY: str = "profiles"
+    PROFILING_FORMAT: Literal["speedscope", "html", "text"] = "speedscope"
+    PROFILING_INTERVAL_SECONDS: float = 0.001
+
+    # ADMIN
+    ADMIN_TOKEN: str = ""
+
+    # HTTP CLIENTS
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 2.0
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    HTTP_BACKOFF_BASE_SECONDS: float = 0.2
+    HTTP_BACKOFF_MAX_SECONDS: float = 2.0
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_BREAKER_RESET_SECONDS: float = 30.0
 
     class Config:
         """Load config file"""
@@ -1,7 +1,180 @@
 """
 Looger Module
 """
+import atexit
+import json
 import logging
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+TEXT_FORMAT = "%(levelname)s\t| %(asctime)s| %(module)s:%(lineno)s => %(message)s\t"
+
+
+class TextFormatter(logging.Formatter):
+    """
+    The historical one line format, noting the records dropped by the rate limit
+    """
+
+    def format(self, record):
+        message = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+
+        if suppressed:
+            message = f"{message}({suppressed} similar messages suppressed)"
+
+        return message
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line, carrying the fields passed through extra=
+    """
+
+    RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+
+        for key, value in vars(record).items():
+            if key not in self.RESERVED:
+                entry[key] = value
+
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per call site for records below WARNING: burst records pass at
+    once, then at most rate per second. The next record let through carries how
+    many were dropped meanwhile. Warnings and errors are never dropped.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        super().__init__()
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.__buckets = {}
+        self.__lock = threading.Lock()
+
+    def filter(self, record):
+        if self.rate <= 0 or record.levelno >= logging.WARNING:
+            return True
+
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+
+        with self.__lock:
+            tokens, updated, suppressed = self.__buckets.get(key, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+
+            if tokens < 1:
+                self.__buckets[key] = (tokens, now, suppressed + 1)
+                return False
+
+            self.__buckets[key] = (tokens - 1, now, 0)
+
+        if suppressed:
+            record.suppressed = suppressed
+
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without formatting them, a full queue
+    drops the record instead of blocking the event loop
+    """
+
+    def __init__(self, records: queue.Queue):
+        super().__init__(records)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # The queue never leaves the process, so the record goes as it is and
+        # the message and traceback are only rendered by the listener thread
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """
+    Single QueueListener thread that owns the console and file handlers, every
+    module logger only puts records on its queue
+    """
+
+    def __init__(self, environment):
+        self.records = queue.Queue(maxsize=environment.LOG_QUEUE_SIZE)
+        formatter = JsonFormatter() if environment.LOG_FORMAT == "json" else TextFormatter(TEXT_FORMAT)
+        handlers = [logging.StreamHandler()]
+
+        if environment.LOG_FILE:
+            handlers.append(logging.FileHandler(environment.LOG_FILE))
+
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        self.handler = NonBlockingQueueHandler(self.records)
+        self.handler.addFilter(RateLimitFilter(
+            rate=environment.LOG_RATE_LIMIT_PER_SECOND,
+            burst=environment.LOG_RATE_LIMIT_BURST
+        ))
+        self.listener = QueueListener(self.records, *handlers)
+        self.__levels = self.__parse_levels(default=environment.LOG_LEVEL, overrides=environment.LOG_LEVELS)
+        self.__lock = threading.Lock()
+        self.__started = False
+
+    def start(self):
+        with self.__lock:
+            if not self.__started:
+                self.listener.start()
+                self.__started = True
+                atexit.register(self.stop)
+
+    def stop(self):
+        """
+        Write out whatever is still queued and join the listener thread
+        """
+        with self.__lock:
+            if self.__started:
+                self.listener.stop()
+                self.__started = False
+
+    def level(self, name: str) -> int:
+        # The most specific LOG_LEVELS prefix wins, LOG_LEVEL otherwise
+        for prefix, level in self.__levels:
+            if name == prefix or name.startswith(f"{prefix}.") or not prefix:
+                return level
+
+        return logging.DEBUG
+
+    @staticmethod
+    def __parse_levels(default: str, overrides: str):
+        levels = [("", logging.getLevelName(default.upper()))]
+
+        for override in filter(None, (item.strip() for item in overrides.split(","))):
+            prefix, level = override.split("=", 1)
+            levels.append((prefix.strip(), logging.getLevelName(level.strip().upper())))
+
+        return sorted(levels, key=lambda item: len(item[0]), reverse=True)
 
 
 class Logger:
@@ -15,31 +188,39 @@ class Logger:
     ERROR = logging.ERROR
     CRITITAL = logging.CRITICAL
 
-    def __init__(self, name=__name__):
+    _pipeline = None
+
+    def __init__(self, name=__name__, environment=None):
         # create logger
         self.logger_worker = logging.getLogger(name)
-        self.__config_logger()
+        self.__config_logger(environment)
 
-    def __config_logger(self):
+    def __config_logger(self, environment):
         """
         Config logger
         """
-        self.logger_worker.setLevel(self.DEBUG)
-        self.__config_handler(logging.DEBUG)
-        self.__config_handler(logging.DEBUG, "debug.log")
-
-    def __config_handler(self, level, file=None):
-        # create console handler and set level to debug
-        console_handler = logging.FileHandler(file) if file else logging.StreamHandler()
-        console_handler.setLevel(level)
-        # create formatter
-        formatter = logging.Formatter(
-            "%(levelname)s\t| %(asctime)s| %(module)s:%(lineno)s => %(message)s\t"
-        )
-        # add formatter to console_handler
-        console_handler.setFormatter(formatter)
-        # add console_handler to logge  r
-        self.logger_worker.addHandler(console_handler)
+        pipeline = self.pipeline(environment)
+        self.logger_worker.setLevel(pipeline.level(self.logger_worker.name))
+        # Every module logger has the shared handler, propagating would emit twice
+        self.logger_worker.propagate = False
+
+        if pipeline.handler not in self.logger_worker.handlers:
+            self.logger_worker.addHandler(pipeline.handler)
+
+    @classmethod
+    def pipeline(cls, environment=None) -> LogPipeline:
+        """
+        The process wide pipeline, started by the first logger asking for it
+        """
+        if cls._pipeline is None:
+            if environment is None:
+                from app.core.configs import get_environment
+                environment = get_environment()
+
+            cls._pipeline = LogPipeline(environment)
+            cls._pipeline.start()
+
+        return cls._pipeline
 
     def get_logger(self):
         """
@@ -1,3 +1,6 @@
-from .database_pool import lifespan, get_connection
-from .base_connection import DBConnection
-from .redis_client import RedisClient
+from .database_pool import lifespan, get_connection, database_unavailable_handler
+from .base_connection import DBConnection, DatabaseUnavailable
+from .redis_client import lifespan as redis_lifespan, get_redis
+from .property_search_view import lifespan as property_search_lifespan
+from .property_snapshot import lifespan as property_snapshot_lifespan, get_property_snapshot, PropertySnapshot
+from .similarity_index import lifespan as similarity_index_lifespan, get_similarity_index, SimilarityIndex
@@ -1,4 +1,12 @@
 from abc import ABC, abstractmethod
+from typing import AsyncIterator
+
+
+class DatabaseUnavailable(Exception):
+    """
+    No connection could be taken from the pool in time, or the connection
+    kept failing after the retries
+    """
 
 
 class DBConnection(ABC):
@@ -9,6 +17,12 @@ class DBConnection(ABC):
         Method to execute query
         """
 
+    @abstractmethod
+    def copy_to(self, sql_statement: str) -> AsyncIterator[bytes]:
+        """
+        Method to stream the output of a COPY ... TO STDOUT statement
+        """
+
     @abstractmethod
     async def commit(self):
         """
@@ -1,32 +1,62 @@
 from psycopg_pool.pool_async import AsyncConnectionPool, AsyncConnection
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from app.core.configs import get_logger, get_environment
 from contextlib import asynccontextmanager
+from .base_connection import DatabaseUnavailable
 from .pg_connection import PGConnection
+from .migrations import Migrator
 
 _env = get_environment()
 _logger = get_logger(__name__)
 
 
+def build_conninfo() -> str:
+    return (
+        f"host={_env.DATABASE_HOST} "
+        f"port={_env.DATABASE_PORT} "
+        f"user={_env.DATABASE_USER} "
+        f"password={_env.DATABASE_PASSWORD} "
+        f"dbname={_env.DATABASE_NAME}"
+    )
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    if _env.DATABASE_MIGRATE_ON_STARTUP:
+        _logger.info("Applying migrations")
+        await Migrator(conninfo=build_conninfo()).upgrade()
+
     _logger.info("Starting pool")
     app.async_pool = AsyncConnectionPool(
-        conninfo=(
-            f"host={_env.DATABASE_HOST} "
-            f"port={_env.DATABASE_PORT} "
-            f"user={_env.DATABASE_USER} "
-            f"password={_env.DATABASE_PASSWORD} "
-            f"dbname={_env.DATABASE_NAME}"),
+        conninfo=build_conninfo(),
         min_size=_env.DATABASE_MIN_CONNECTIONS,
         max_size=_env.DATABASE_MAX_CONNECTIONS,
-        timeout=None
+        timeout=_env.DATABASE_POOL_TIMEOUT,
+        max_waiting=_env.DATABASE_POOL_MAX_WAITING,
+        max_idle=_env.DATABASE_POOL_MAX_IDLE,
+        max_lifetime=_env.DATABASE_POOL_MAX_LIFETIME,
+        # Read paths don't need a transaction, autocommit saves the BEGIN/COMMIT round trips
+        kwargs={"autocommit": True},
+        open=False
     )
+    await app.async_pool.open()
     yield
 
     _logger.info("Closing pool")
     await app.async_pool.close()
 
 async def get_connection(request: Request) -> AsyncConnection:
-    async with request.app.async_pool.connection() as conn:
-        yield PGConnection(conn=conn)
+    # Taken from the pool by the first statement, routes answered from caches never wait for one
+    connection = PGConnection(pool=request.app.async_pool)
+
+    try:
+        yield connection
+
+    finally:
+        if connection.conn is not None:
+            await request.app.async_pool.putconn(connection.conn)
+
+
+async def database_unavailable_handler(request: Request, error: DatabaseUnavailable) -> JSONResponse:
+    return JSONResponse(status_code=503, content={"detail": "Database unavailable"})
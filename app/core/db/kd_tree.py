@@ -0,0 +1,95 @@
+import heapq
+from typing import List, Tuple
+import numpy as np
+
+
+class KDTree:
+    """
+    Static k-d tree over the rows of points, answering k nearest neighbour
+    queries by euclidean distance. Leaves hold small buckets of points that
+    are compared in one vectorized step.
+    """
+
+    LEAF_SIZE = 32
+
+    def __init__(self, points: np.ndarray) -> None:
+        self.points = points
+        self.__order = np.arange(len(points))
+        # start, end, split dimension, split value, left child, right child
+        self.__nodes: List[Tuple[int, int, int, float, int, int]] = []
+
+        if len(points):
+            self.__build()
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def query(self, point: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Distances and row positions of the k points nearest to point, nearest first
+        """
+        if not self.__nodes or k <= 0:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+
+        # Max-heap of the best candidates so far, as (-distance, position)
+        best: List[Tuple[float, int]] = []
+        stack = [0]
+
+        while stack:
+            start, end, dimension, value, left, right = self.__nodes[stack.pop()]
+
+            if left < 0:
+                positions = self.__order[start:end]
+                distances = np.sqrt(((self.points[positions] - point) ** 2).sum(axis=1))
+
+                for distance, position in zip(distances.tolist(), positions.tolist()):
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, position))
+
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, position))
+
+                continue
+
+            offset = point[dimension] - value
+            near, far = (left, right) if offset <= 0 else (right, left)
+
+            # The far side can only hold closer points when the split plane is nearer than the worst candidate
+            if len(best) < k or abs(offset) < -best[0][0]:
+                stack.append(far)
+
+            stack.append(near)
+
+        best.sort(key=lambda candidate: -candidate[0])
+        return (
+            np.array([-distance for distance, _ in best]),
+            np.array([position for _, position in best], dtype=np.int64)
+        )
+
+    def __build(self):
+        self.__nodes.append((0, len(self.points), -1, 0.0, -1, -1))
+        pending = [0]
+
+        while pending:
+            node = pending.pop()
+            start, end, _, _, _, _ = self.__nodes[node]
+
+            if end - start <= self.LEAF_SIZE:
+                continue
+
+            positions = self.__order[start:end]
+            values = self.points[positions]
+            dimension = int(np.argmax(values.max(axis=0) - values.min(axis=0)))
+
+            middle = (end - start) // 2
+            partition = np.argpartition(values[:, dimension], middle)
+            self.__order[start:end] = positions[partition]
+            split_value = float(self.points[self.__order[start + middle], dimension])
+
+            left = len(self.__nodes)
+            self.__nodes.append((start, start + middle, -1, 0.0, -1, -1))
+            right = len(self.__nodes)
+            self.__nodes.append((start + middle, end, -1, 0.0, -1, -1))
+
+            self.__nodes[node] = (start, end, dimension, split_value, left, right)
+            pending.extend((left, right))
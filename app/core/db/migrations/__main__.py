@@ -0,0 +1,34 @@
+"""
+Apply or list the database migrations
+
+    python -m app.core.db.migrations upgrade
+    python -m app.core.db.migrations status
+"""
+import argparse
+import asyncio
+from app.core.db.database_pool import build_conninfo
+from .migrator import Migrator
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["upgrade", "status"], nargs="?", default="upgrade")
+    parser.add_argument("--schema", default=None, help="Target schema, defaults to ENVIRONMENT")
+    args = parser.parse_args()
+
+    migrator = Migrator(conninfo=build_conninfo(), schema=args.schema)
+
+    if args.command == "upgrade":
+        applied = await migrator.upgrade()
+        print(f"{len(applied)} migration(s) applied on {migrator.schema}")
+
+        for migration in applied:
+            print(f"  {migration.version:04d} {migration.name}")
+
+    else:
+        for migration in await migrator.status():
+            applied_at = migration["applied_at"] or "pending"
+            print(f"{migration['version']:04d} {migration['name']:<30} {applied_at}")
+
+
+asyncio.run(main())
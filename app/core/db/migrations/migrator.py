@@ -0,0 +1,125 @@
+import hashlib
+import re
+from pathlib import Path
+from typing import List, NamedTuple
+from psycopg import AsyncConnection
+from psycopg.rows import dict_row
+from app.core.configs import get_environment, get_logger
+
+_env = get_environment()
+_logger = get_logger(__name__)
+
+VERSIONS_PATH = Path(__file__).parent / "versions"
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    sql: str
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.sql.encode("UTF-8")).hexdigest()
+
+
+class Migrator:
+    """
+    Applies the versioned sql files in order, each one in its own transaction,
+    and records them in schema_migrations. An advisory lock keeps processes
+    started together from applying the same migration twice.
+    As in PGConnection, "public" in the sql is replaced by the target schema.
+    """
+
+    LOCK_ID = 8_675_309
+
+    def __init__(self, conninfo: str, schema: str = None) -> None:
+        self.conninfo = conninfo
+        self.schema = schema or _env.ENVIRONMENT
+
+    @staticmethod
+    def available() -> List[Migration]:
+        migrations = []
+
+        for path in sorted(VERSIONS_PATH.glob("*.sql")):
+            match = re.fullmatch(r"(\d+)_(\w+)\.sql", path.name)
+
+            if not match:
+                _logger.warning(f"Ignoring migration file {path.name}")
+                continue
+
+            migrations.append(Migration(
+                version=int(match.group(1)),
+                name=match.group(2),
+                sql=path.read_text(encoding="UTF-8")
+            ))
+
+        return migrations
+
+    async def status(self) -> List[dict]:
+        async with await AsyncConnection.connect(self.conninfo, autocommit=True) as conn:
+            applied = await self.__applied(conn=conn)
+
+        return [
+            {
+                "version": migration.version,
+                "name": migration.name,
+                "applied_at": applied[migration.version]["applied_at"] if migration.version in applied else None,
+            }
+            for migration in self.available()
+        ]
+
+    async def upgrade(self) -> List[Migration]:
+        applied_now = []
+
+        async with await AsyncConnection.connect(self.conninfo, autocommit=True) as conn:
+            await conn.execute("SELECT pg_advisory_lock(%(lock_id)s);", {"lock_id": self.LOCK_ID})
+
+            try:
+                await conn.execute(self.__sql("CREATE SCHEMA IF NOT EXISTS public;"))
+                await conn.execute(self.__sql("""--sql
+                CREATE TABLE IF NOT EXISTS public.schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name VARCHAR NOT NULL,
+                    checksum VARCHAR NOT NULL,
+                    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                );
+                """))
+
+                applied = await self.__applied(conn=conn)
+
+                for migration in self.available():
+                    if migration.version in applied:
+                        if applied[migration.version]["checksum"] != migration.checksum:
+                            _logger.warning(f"Migration {migration.version:04d}_{migration.name} changed after it was applied")
+
+                        continue
+
+                    _logger.info(f"Applying migration {migration.version:04d}_{migration.name} on {self.schema}")
+
+                    async with conn.transaction():
+                        await conn.execute(self.__sql(migration.sql))
+                        await conn.execute(
+                            self.__sql("INSERT INTO public.schema_migrations (version, name, checksum) VALUES (%(version)s, %(name)s, %(checksum)s);"),
+                            {"version": migration.version, "name": migration.name, "checksum": migration.checksum}
+                        )
+
+                    applied_now.append(migration)
+
+            finally:
+                await conn.execute("SELECT pg_advisory_unlock(%(lock_id)s);", {"lock_id": self.LOCK_ID})
+
+        return applied_now
+
+    async def __applied(self, conn: AsyncConnection) -> dict:
+        async with conn.cursor(row_factory=dict_row) as cursor:
+            await cursor.execute("SELECT to_regclass(%(table)s) AS migrations_table;", {"table": f"{self.schema}.schema_migrations"})
+            exists = await cursor.fetchone()
+
+            if not exists["migrations_table"]:
+                return {}
+
+            await cursor.execute(self.__sql("SELECT version, name, checksum, applied_at FROM public.schema_migrations;"))
+            return {row["version"]: row for row in await cursor.fetchall()}
+
+    def __sql(self, sql_statement: str) -> str:
+        return sql_statement.replace("public", self.schema)
@@ -0,0 +1,47 @@
+-- Tables the API reads, as written by the crawler. IF NOT EXISTS keeps this a no-op on existing databases.
+CREATE TABLE IF NOT EXISTS public.neighborhoods (
+    id SERIAL PRIMARY KEY,
+    "name" VARCHAR NOT NULL,
+    population INTEGER NOT NULL,
+    houses INTEGER NOT NULL,
+    area DOUBLE PRECISION NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS public.streets (
+    id SERIAL PRIMARY KEY,
+    "name" VARCHAR,
+    zip_code VARCHAR,
+    flood_quota DOUBLE PRECISION,
+    latitude VARCHAR,
+    longitude VARCHAR
+);
+
+CREATE TABLE IF NOT EXISTS public.modalities (
+    id SERIAL PRIMARY KEY,
+    "name" VARCHAR
+);
+
+CREATE TABLE IF NOT EXISTS public.companies (
+    id SERIAL PRIMARY KEY,
+    "name" VARCHAR NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS public.properties (
+    id SERIAL PRIMARY KEY,
+    title VARCHAR NOT NULL,
+    price NUMERIC(14, 2) NOT NULL,
+    description TEXT NOT NULL,
+    rooms INTEGER,
+    bathrooms INTEGER,
+    "size" DOUBLE PRECISION,
+    parking_space INTEGER,
+    image_url VARCHAR,
+    "type" VARCHAR NOT NULL,
+    property_url VARCHAR NOT NULL,
+    "number" VARCHAR,
+    is_active BOOLEAN NOT NULL DEFAULT TRUE,
+    neighborhood_id INTEGER NOT NULL REFERENCES public.neighborhoods (id),
+    street_id INTEGER NOT NULL REFERENCES public.streets (id),
+    modality_id INTEGER NOT NULL REFERENCES public.modalities (id),
+    company_id INTEGER NOT NULL REFERENCES public.companies (id)
+);
@@ -0,0 +1,14 @@
+-- Indexes behind the select_all and count_select_all filters, rows are always sorted by the primary key
+CREATE INDEX IF NOT EXISTS neighborhoods_name_idx ON public.neighborhoods ("name");
+
+CREATE INDEX IF NOT EXISTS properties_neighborhood_rooms_idx ON public.properties (neighborhood_id, rooms);
+CREATE INDEX IF NOT EXISTS properties_rooms_bathrooms_parking_idx ON public.properties (rooms, bathrooms, parking_space);
+CREATE INDEX IF NOT EXISTS properties_bathrooms_idx ON public.properties (bathrooms);
+CREATE INDEX IF NOT EXISTS properties_parking_space_idx ON public.properties (parking_space);
+CREATE INDEX IF NOT EXISTS properties_size_idx ON public.properties ("size");
+
+-- Listings usually ask for active properties only
+CREATE INDEX IF NOT EXISTS properties_active_id_idx ON public.properties (id) WHERE is_active;
+CREATE INDEX IF NOT EXISTS properties_active_neighborhood_rooms_idx ON public.properties (neighborhood_id, rooms) WHERE is_active;
+CREATE INDEX IF NOT EXISTS properties_active_rooms_bathrooms_parking_idx ON public.properties (rooms, bathrooms, parking_space) WHERE is_active;
+CREATE INDEX IF NOT EXISTS properties_active_size_idx ON public.properties ("size") WHERE is_active;
@@ -0,0 +1,46 @@
+-- Denormalized read model used when PROPERTY_SEARCH_VIEW is enabled
+CREATE MATERIALIZED VIEW IF NOT EXISTS public.property_search AS
+SELECT
+    p.id,
+    p.title,
+    p.price,
+    p.description,
+    p.rooms,
+    p.bathrooms,
+    p."size",
+    p.parking_space,
+    p.image_url,
+    p."type",
+    p.property_url,
+    p."number",
+    p.is_active,
+    n."name" AS neighborhood_name,
+    n.population,
+    n.houses,
+    n.area,
+    s."name" AS street_name,
+    s.zip_code,
+    s.flood_quota,
+    s.latitude,
+    s.longitude,
+    m."name" AS modality_name,
+    c."name" AS company_name
+FROM
+    public.properties p
+INNER JOIN public.neighborhoods n ON
+    p.neighborhood_id = n.id
+INNER JOIN public.streets s ON
+    p.street_id = s.id
+INNER JOIN public.modalities m ON
+    p.modality_id = m.id
+INNER JOIN public.companies c ON
+    p.company_id = c.id;
+
+-- REFRESH ... CONCURRENTLY needs a unique index
+CREATE UNIQUE INDEX IF NOT EXISTS property_search_id_idx ON public.property_search (id);
+CREATE INDEX IF NOT EXISTS property_search_neighborhood_rooms_idx ON public.property_search (neighborhood_name, rooms);
+CREATE INDEX IF NOT EXISTS property_search_rooms_bathrooms_parking_idx ON public.property_search (rooms, bathrooms, parking_space);
+CREATE INDEX IF NOT EXISTS property_search_bathrooms_idx ON public.property_search (bathrooms);
+CREATE INDEX IF NOT EXISTS property_search_parking_space_idx ON public.property_search (parking_space);
+CREATE INDEX IF NOT EXISTS property_search_size_idx ON public.property_search ("size");
+CREATE INDEX IF NOT EXISTS property_search_active_id_idx ON public.property_search (id) WHERE is_active;
@@ -0,0 +1,98 @@
+-- Numeric coordinates next to the latitude/longitude text written by the crawler, kept in sync by a trigger
+ALTER TABLE public.streets ADD COLUMN IF NOT EXISTS lat DOUBLE PRECISION;
+ALTER TABLE public.streets ADD COLUMN IF NOT EXISTS lng DOUBLE PRECISION;
+
+-- NULL instead of an error for anything that is not a coordinate in range
+CREATE OR REPLACE FUNCTION public.parse_coordinate(raw TEXT, coordinate_limit DOUBLE PRECISION)
+RETURNS DOUBLE PRECISION
+LANGUAGE plpgsql IMMUTABLE AS $$
+DECLARE
+    coordinate DOUBLE PRECISION;
+BEGIN
+    IF raw IS NULL OR btrim(raw) !~ '^[-+]?[0-9]+(\.[0-9]+)?$' THEN
+        RETURN NULL;
+    END IF;
+
+    coordinate := btrim(raw)::DOUBLE PRECISION;
+
+    IF abs(coordinate) > coordinate_limit THEN
+        RETURN NULL;
+    END IF;
+
+    RETURN coordinate;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.streets_set_coordinates()
+RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.lat := public.parse_coordinate(NEW.latitude, 90);
+    NEW.lng := public.parse_coordinate(NEW.longitude, 180);
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS streets_set_coordinates ON public.streets;
+CREATE TRIGGER streets_set_coordinates
+BEFORE INSERT OR UPDATE OF latitude, longitude ON public.streets
+FOR EACH ROW EXECUTE FUNCTION public.streets_set_coordinates();
+
+UPDATE public.streets
+SET
+    lat = public.parse_coordinate(latitude, 90),
+    lng = public.parse_coordinate(longitude, 180);
+
+CREATE INDEX IF NOT EXISTS streets_lat_lng_idx ON public.streets (lat, lng);
+CREATE INDEX IF NOT EXISTS properties_street_id_idx ON public.properties (street_id);
+
+-- The read model gains the numeric coordinates too
+DROP MATERIALIZED VIEW IF EXISTS public.property_search;
+
+CREATE MATERIALIZED VIEW public.property_search AS
+SELECT
+    p.id,
+    p.title,
+    p.price,
+    p.description,
+    p.rooms,
+    p.bathrooms,
+    p."size",
+    p.parking_space,
+    p.image_url,
+    p."type",
+    p.property_url,
+    p."number",
+    p.is_active,
+    n."name" AS neighborhood_name,
+    n.population,
+    n.houses,
+    n.area,
+    s."name" AS street_name,
+    s.zip_code,
+    s.flood_quota,
+    s.latitude,
+    s.longitude,
+    s.lat,
+    s.lng,
+    m."name" AS modality_name,
+    c."name" AS company_name
+FROM
+    public.properties p
+INNER JOIN public.neighborhoods n ON
+    p.neighborhood_id = n.id
+INNER JOIN public.streets s ON
+    p.street_id = s.id
+INNER JOIN public.modalities m ON
+    p.modality_id = m.id
+INNER JOIN public.companies c ON
+    p.company_id = c.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS property_search_id_idx ON public.property_search (id);
+CREATE INDEX IF NOT EXISTS property_search_neighborhood_rooms_idx ON public.property_search (neighborhood_name, rooms);
+CREATE INDEX IF NOT EXISTS property_search_rooms_bathrooms_parking_idx ON public.property_search (rooms, bathrooms, parking_space);
+CREATE INDEX IF NOT EXISTS property_search_bathrooms_idx ON public.property_search (bathrooms);
+CREATE INDEX IF NOT EXISTS property_search_parking_space_idx ON public.property_search (parking_space);
+CREATE INDEX IF NOT EXISTS property_search_size_idx ON public.property_search ("size");
+CREATE INDEX IF NOT EXISTS property_search_active_id_idx ON public.property_search (id) WHERE is_active;
+CREATE INDEX IF NOT EXISTS property_search_lat_lng_idx ON public.property_search (lat, lng);
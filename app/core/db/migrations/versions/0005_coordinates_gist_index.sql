@@ -0,0 +1,7 @@
+-- A GiST index on the point narrows a bounding box on both coordinates at once,
+-- the (lat, lng) btree only narrowed lat and filtered lng row by row in that band
+CREATE INDEX IF NOT EXISTS streets_location_idx ON public.streets USING gist (point(lng, lat));
+DROP INDEX IF EXISTS public.streets_lat_lng_idx;
+
+CREATE INDEX IF NOT EXISTS property_search_location_idx ON public.property_search USING gist (point(lng, lat));
+DROP INDEX IF EXISTS public.property_search_lat_lng_idx;
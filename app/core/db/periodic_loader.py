@@ -0,0 +1,140 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from typing import Any, List, Optional
+from psycopg_pool.pool_async import AsyncConnectionPool
+from redis.asyncio import Redis
+from app.core.cache import get_data_version
+from app.core.configs import get_logger
+from .pg_connection import PGConnection
+from .repositories import PropertyRepository
+
+_logger = get_logger(__name__)
+
+
+class PeriodicRefresher(ABC):
+    """
+    Calls refresh every refresh_seconds in a background task, from start until
+    stop. A failed refresh is logged and tried again on the next turn.
+    """
+
+    NAME = "periodic refresher"
+
+    def __init__(self) -> None:
+        self.__refresher: Optional[asyncio.Task] = None
+
+    @property
+    @abstractmethod
+    def refresh_seconds(self) -> float:
+        """
+        Seconds between two refreshes
+        """
+
+    @abstractmethod
+    async def refresh(self):
+        """
+        Method to bring the refreshed data up to date
+        """
+
+    def start(self):
+        self.__refresher = asyncio.create_task(self.__refresh_periodically())
+
+    async def stop(self):
+        if self.__refresher:
+            self.__refresher.cancel()
+            await asyncio.gather(self.__refresher, return_exceptions=True)
+            self.__refresher = None
+
+    async def __refresh_periodically(self):
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+
+            try:
+                await self.refresh()
+
+            except Exception as error:
+                _logger.error(f"Error on refresh {self.NAME}: {str(error)}")
+
+
+class CatalogLoader(PeriodicRefresher):
+    """
+    Keeps an in-memory structure built from the catalog current: rows past the
+    id watermark are appended every refresh and the whole catalog is reloaded
+    now and then to pick up updates and deletes, or at the first refresh after
+    the data version was bumped by a cache invalidation. Each new structure
+    replaces the previous one in a single assignment, so a reader always sees
+    one consistent copy.
+    """
+
+    def __init__(self, pool: AsyncConnectionPool, redis: Redis) -> None:
+        super().__init__()
+        self.__pool = pool
+        self.__redis = redis
+        self.__data_version = None
+        self.current: Optional[Any] = None
+
+    @property
+    @abstractmethod
+    def full_reload_seconds(self) -> float:
+        """
+        Seconds a full load is kept before the catalog is loaded again
+        """
+
+    @property
+    @abstractmethod
+    def batch_size(self) -> int:
+        """
+        Rows selected per query while loading
+        """
+
+    @abstractmethod
+    def build(self, rows: List[dict]) -> Any:
+        """
+        Method to build the structure from every row of the catalog, it runs in a thread
+        """
+
+    @abstractmethod
+    async def select_after(self, property_repository: PropertyRepository, after_id: int, limit: int) -> List[dict]:
+        """
+        Method to select the rows past after_id, in id order
+        """
+
+    async def load(self):
+        # Read first, a change made while loading is picked up by the next refresh
+        data_version = await get_data_version().get(redis=self.__redis)
+        rows = await self.__select_all_after(after_id=0)
+        self.current = await asyncio.to_thread(self.build, rows)
+        self.__data_version = data_version
+        _logger.info(f"{self.NAME.capitalize()} loaded - {len(rows)} properties")
+
+    async def refresh(self):
+        current = self.current
+
+        if not current or time.time() - current.loaded_at >= self.full_reload_seconds or await self.__is_invalidated():
+            await self.load()
+            return
+
+        rows = await self.__select_all_after(after_id=current.watermark)
+
+        if rows:
+            self.current = await asyncio.to_thread(current.extend, rows)
+            _logger.info(f"{self.NAME.capitalize()} extended - {len(rows)} new properties")
+
+    async def __is_invalidated(self) -> bool:
+        # Updates and deletes are only seen by a full load, after an invalidation it is due at once
+        return await get_data_version().get(redis=self.__redis) != self.__data_version
+
+    async def __select_all_after(self, after_id: int) -> List[dict]:
+        rows = []
+
+        async with self.__pool.connection() as conn:
+            property_repository = PropertyRepository(connection=PGConnection(conn=conn))
+
+            while True:
+                batch = await self.select_after(property_repository=property_repository, after_id=after_id, limit=self.batch_size)
+                rows.extend(batch)
+
+                if len(batch) < self.batch_size:
+                    return rows
+
+                after_id = batch[-1]["id"]
@@ -1,27 +1,123 @@
+import asyncio
+import time
+from psycopg import OperationalError
 from psycopg.connection_async import AsyncConnection
+from psycopg.pq import TransactionStatus
 from psycopg.rows import dict_row
-from .base_connection import DBConnection
-from app.core.configs import get_environment
-import time
+from psycopg_pool import AsyncConnectionPool, PoolTimeout, TooManyRequests
+from typing import AsyncIterator
+from .base_connection import DBConnection, DatabaseUnavailable
+from app.core.clients import backoff_delay
+from app.core.configs import get_environment, get_logger
+from app.core.metrics import record_stage
 
 _env = get_environment()
+_logger = get_logger(__name__)
+
+# admin_shutdown, crash_shutdown and cannot_connect_now, the server is going away or not there yet
+RECONNECT_SQLSTATES = {"57P01", "57P02", "57P03"}
 
 
 class PGConnection(DBConnection):
+    """
+    Runs statements on conn or, given only a pool, on a connection taken from
+    it at the first statement, so requests that never query hold none.
+    With a pool, a statement run outside of a transaction is retried on a
+    fresh pooled connection when it fails because the connection was lost,
+    at most DATABASE_RETRY_ATTEMPTS times within DATABASE_RETRY_DEADLINE_SECONDS.
+    A lost connection that is not retried again is raised as DatabaseUnavailable.
+    Errors of the statement itself and empty results are never retried.
+    """
 
-    def __init__(self, conn: AsyncConnection) -> None:
+    def __init__(self, conn: AsyncConnection = None, pool: AsyncConnectionPool = None) -> None:
         self.conn = conn
-        self.cursor = None
+        self.__pool = pool
 
     async def execute(self, sql_statement: str, values: dict = None, many: bool = False):
         sql = sql_statement.replace("public", _env.ENVIRONMENT)
+        deadline = time.monotonic() + _env.DATABASE_RETRY_DEADLINE_SECONDS
+        attempt = 0
+        await self.__acquire()
+
+        while True:
+            # Inside a transaction the earlier statements would be lost with the connection
+            retryable = self.__pool is not None and self.conn.info.transaction_status == TransactionStatus.IDLE
+
+            try:
+                return await self.__execute(sql=sql, values=values, many=many)
+
+            except OperationalError as error:
+                if not self.__is_connection_error(error):
+                    raise
+
+                attempt += 1
+                remaining = deadline - time.monotonic()
+
+                if not retryable or attempt >= _env.DATABASE_RETRY_ATTEMPTS or remaining <= 0:
+                    _logger.error(f"Error on database connection: {str(error)} - giving up after attempt {attempt}")
+                    raise DatabaseUnavailable(str(error)) from error
+
+                _logger.warning(f"Error on database connection: {str(error)} - attempt {attempt}")
+                await asyncio.sleep(min(remaining, backoff_delay(
+                    attempt - 1,
+                    base=_env.DATABASE_BACKOFF_BASE_SECONDS,
+                    maximum=_env.DATABASE_BACKOFF_MAX_SECONDS
+                )))
+                await self.__reconnect(timeout=max(deadline - time.monotonic(), 0.001))
+
+    async def __acquire(self):
+        if self.conn is not None:
+            return
+
+        try:
+            started = time.perf_counter()
+            self.conn = await self.__pool.getconn()
+            record_stage(stage="pool_wait", operation="postgres", seconds=time.perf_counter() - started)
+
+        except (PoolTimeout, TooManyRequests) as error:
+            _logger.error(f"Database pool exhausted: {str(error)}")
+            raise DatabaseUnavailable(str(error)) from error
+
+    async def __execute(self, sql: str, values: dict, many: bool):
+        async with self.conn.cursor(row_factory=dict_row) as cursor:
+            await cursor.execute(sql, values)
+
+            # Statements like DDL produce no result set
+            if cursor.description is None:
+                return
+
+            return await cursor.fetchall() if many else await cursor.fetchone()
+
+    def __is_connection_error(self, error: OperationalError) -> bool:
+        sqlstate = error.sqlstate or ""
+        return self.conn.broken or sqlstate.startswith("08") or sqlstate in RECONNECT_SQLSTATES
+
+    async def __reconnect(self, timeout: float):
+        # The pool discards the broken connection, the old one goes back first
+        # so a pool of one connection can still hand out its replacement
+        conn, self.conn = self.conn, None
+        await self.__pool.putconn(conn)
+
+        try:
+            self.conn = await self.__pool.getconn(timeout=timeout)
+
+        except (PoolTimeout, TooManyRequests) as error:
+            _logger.error(f"Database pool exhausted on reconnect: {str(error)}")
+            raise DatabaseUnavailable(str(error)) from error
+
+    async def copy_to(self, sql_statement: str) -> AsyncIterator[bytes]:
+        sql = sql_statement.replace("public", _env.ENVIRONMENT)
+        await self.__acquire()
 
-        self.cursor = self.conn.cursor(row_factory=dict_row)
-        await self.cursor.execute(sql, values)
-        return await self.cursor.fetchall() if many else await self.cursor.fetchone()
+        async with self.conn.cursor() as cursor:
+            async with cursor.copy(sql) as copy:
+                async for data in copy:
+                    yield bytes(data)
 
     async def commit(self):
-        await self.conn.commit()
+        if self.conn is not None:
+            await self.conn.commit()
 
     async def rollback(self):
-        await self.conn.rollback()
+        if self.conn is not None:
+            await self.conn.rollback()
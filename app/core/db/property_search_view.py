@@ -0,0 +1,67 @@
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from psycopg_pool.pool_async import AsyncConnectionPool
+from app.core.configs import get_environment, get_logger
+from .periodic_loader import PeriodicRefresher
+from .pg_connection import PGConnection
+
+_env = get_environment()
+_logger = get_logger(__name__)
+
+
+class PropertySearchView(PeriodicRefresher):
+    """
+    Denormalized read model of the property search: one row per property with
+    its neighborhood, street, modality and company columns already joined.
+    It is created by the 0003 migration and refreshed concurrently in the
+    background, so reads never wait on it.
+    """
+
+    # Only one process refreshes at a time, the others skip their turn
+    REFRESH_LOCK_ID = 4_815_162_342
+    NAME = "property search view"
+
+    def __init__(self, pool: AsyncConnectionPool) -> None:
+        super().__init__()
+        self.__pool = pool
+
+    @property
+    def refresh_seconds(self) -> float:
+        return _env.PROPERTY_SEARCH_REFRESH_SECONDS
+
+    async def refresh(self) -> bool:
+        async with self.__pool.connection() as conn:
+            connection = PGConnection(conn=conn)
+            lock = await connection.execute(
+                sql_statement="SELECT pg_try_advisory_lock(%(lock_id)s) AS locked;",
+                values={"lock_id": self.REFRESH_LOCK_ID}
+            )
+
+            if not lock["locked"]:
+                return False
+
+            try:
+                await connection.execute(sql_statement="REFRESH MATERIALIZED VIEW CONCURRENTLY public.property_search;")
+                _logger.info("Property search view refreshed")
+                return True
+
+            finally:
+                await connection.execute(
+                    sql_statement="SELECT pg_advisory_unlock(%(lock_id)s);",
+                    values={"lock_id": self.REFRESH_LOCK_ID}
+                )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not _env.PROPERTY_SEARCH_VIEW:
+        yield
+        return
+
+    _logger.info("Starting property search view")
+    app.property_search_view = PropertySearchView(pool=app.async_pool)
+    app.property_search_view.start()
+    yield
+
+    _logger.info("Stopping property search view refresh")
+    await app.property_search_view.stop()
@@ -0,0 +1,196 @@
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+from fastapi import FastAPI, Request
+import numpy as np
+from app.core.configs import get_environment, get_logger
+from .periodic_loader import CatalogLoader
+from .repositories import PropertyRepository
+
+_env = get_environment()
+_logger = get_logger(__name__)
+
+
+class PropertySnapshot:
+    """
+    Immutable in-memory copy of the catalog. Filter columns are NumPy arrays in id
+    order, so a search is a few vectorized comparisons instead of a query.
+    NULLs are NaN and never match a filter, as in SQL.
+    """
+
+    FILTER_COLUMNS = ("rooms", "bathrooms", "parking_space", "size", "is_active")
+
+    def __init__(self, rows: List[dict], columns: Dict[str, np.ndarray], neighborhoods: Dict[str, int], loaded_at: float = None) -> None:
+        self.rows = rows
+        self.columns = columns
+        self.neighborhoods = neighborhoods
+        # When the catalog was last loaded in full, extending keeps it
+        self.loaded_at = loaded_at or time.time()
+
+    @classmethod
+    def build(cls, rows: List[dict]) -> "PropertySnapshot":
+        neighborhoods = {}
+        return cls(rows=rows, columns=cls.__columns(rows=rows, neighborhoods=neighborhoods), neighborhoods=neighborhoods)
+
+    def extend(self, rows: List[dict]) -> "PropertySnapshot":
+        """
+        New snapshot with rows past the watermark appended, this one is left untouched
+        """
+        neighborhoods = dict(self.neighborhoods)
+        columns = self.__columns(rows=rows, neighborhoods=neighborhoods)
+
+        return PropertySnapshot(
+            rows=self.rows + rows,
+            columns={name: np.concatenate((self.columns[name], columns[name])) for name in columns},
+            neighborhoods=neighborhoods,
+            loaded_at=self.loaded_at
+        )
+
+    @property
+    def watermark(self) -> int:
+        return int(self.columns["id"][-1]) if len(self.rows) else 0
+
+    def search(self, page_size: int, offset: int, rooms: int, bathrooms: int, parking_space: int, size: int, neighborhood: str, after_id: int = None, fields: List[str] = None, is_active: bool = None) -> List[dict]:
+        mask = self.__mask(
+            rooms=rooms,
+            bathrooms=bathrooms,
+            parking_space=parking_space,
+            size=size,
+            neighborhood=neighborhood,
+            is_active=is_active
+        )
+
+        if after_id is not None:
+            mask &= self.columns["id"] > after_id
+
+        positions = np.flatnonzero(mask)
+
+        if page_size:
+            start = 0 if after_id is not None else offset
+            positions = positions[start:start + page_size]
+
+        if fields:
+            return [{field: self.rows[position][field] for field in fields} for position in positions]
+
+        return [self.rows[position] for position in positions]
+
+    def count(self, rooms: int, bathrooms: int, parking_space: int, size: int, neighborhood: str, is_active: bool = None) -> int:
+        mask = self.__mask(
+            rooms=rooms,
+            bathrooms=bathrooms,
+            parking_space=parking_space,
+            size=size,
+            neighborhood=neighborhood,
+            is_active=is_active
+        )
+
+        return int(np.count_nonzero(mask))
+
+    def stats(self) -> dict:
+        return {
+            "rows": len(self.rows),
+            "watermark": self.watermark,
+            "loaded_at": self.loaded_at,
+            "memory_bytes": sum(column.nbytes for column in self.columns.values()),
+        }
+
+    def __mask(self, rooms: int, bathrooms: int, parking_space: int, size: int, neighborhood: str, is_active: bool = None) -> np.ndarray:
+        # Same filters as PropertyRepository.select_all
+        mask = np.ones(len(self.rows), dtype=bool)
+
+        if rooms:
+            mask &= self.columns["rooms"] == rooms
+
+        if bathrooms:
+            mask &= self.columns["bathrooms"] == bathrooms
+
+        if parking_space:
+            mask &= self.columns["parking_space"] == parking_space
+
+        if neighborhood:
+            code = self.neighborhoods.get(neighborhood)
+            mask &= (self.columns["neighborhood"] == code) if code is not None else False
+
+        if size:
+            mask &= (self.columns["size"] > size - 10) & (self.columns["size"] < size + 10)
+
+        if is_active is not None:
+            mask &= self.columns["is_active"] == float(is_active)
+
+        return mask
+
+    @classmethod
+    def __columns(cls, rows: List[dict], neighborhoods: Dict[str, int]) -> Dict[str, np.ndarray]:
+        columns = {"id": np.fromiter((row["id"] for row in rows), dtype=np.int64, count=len(rows))}
+
+        for name in cls.FILTER_COLUMNS:
+            columns[name] = np.fromiter(
+                (np.nan if row[name] is None else float(row[name]) for row in rows),
+                dtype=np.float64,
+                count=len(rows)
+            )
+
+        columns["neighborhood"] = np.fromiter(
+            (
+                -1 if row["neighborhood_name"] is None else neighborhoods.setdefault(row["neighborhood_name"], len(neighborhoods))
+                for row in rows
+            ),
+            dtype=np.int32,
+            count=len(rows)
+        )
+
+        return columns
+
+
+class PropertySnapshotLoader(CatalogLoader):
+    """
+    Keeps a PropertySnapshot current, see CatalogLoader
+    """
+
+    NAME = "property snapshot"
+
+    @property
+    def refresh_seconds(self) -> float:
+        return _env.PROPERTY_SNAPSHOT_REFRESH_SECONDS
+
+    @property
+    def full_reload_seconds(self) -> float:
+        return _env.PROPERTY_SNAPSHOT_FULL_RELOAD_SECONDS
+
+    @property
+    def batch_size(self) -> int:
+        return _env.PROPERTY_SNAPSHOT_BATCH_SIZE
+
+    def build(self, rows: List[dict]) -> PropertySnapshot:
+        return PropertySnapshot.build(rows)
+
+    async def select_after(self, property_repository: PropertyRepository, after_id: int, limit: int) -> List[dict]:
+        return await property_repository.select_after(after_id=after_id, limit=limit)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not _env.PROPERTY_SNAPSHOT:
+        yield
+        return
+
+    _logger.info("Loading property snapshot")
+    app.property_snapshot = PropertySnapshotLoader(pool=app.async_pool, redis=app.redis)
+
+    try:
+        await app.property_snapshot.load()
+
+    except Exception as error:
+        # Searches go to Postgres until a refresh manages to load it
+        _logger.error(f"Error on load property snapshot: {str(error)}")
+
+    app.property_snapshot.start()
+    yield
+
+    _logger.info("Stopping property snapshot refresh")
+    await app.property_snapshot.stop()
+
+
+async def get_property_snapshot(request: Request) -> Optional[PropertySnapshot]:
+    loader = getattr(request.app, "property_snapshot", None)
+    return loader.current if loader else None
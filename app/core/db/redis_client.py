@@ -1,48 +1,39 @@
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from redis.asyncio import ConnectionPool, Redis
 from app.core.configs import get_environment, get_logger
-import redis
 
 _env = get_environment()
 _logger = get_logger(__name__)
 
 
-class RedisClient:
-
-    def __init__(self) -> None:
-        self.__start_conn()
-
-    @property
-    def conn(self):
-        if self.__conn:
-            return self.__conn
-        
-        raise Exception("Redis not connected")
-
-    def __start_conn(self):
-        try:
-            self.__conn = redis.StrictRedis(
-                host=_env.REDIS_HOST,
-                port=_env.REDIS_PORT,
-                decode_responses=True
-            )
-        
-        except Exception as error:
-            _logger.error(f"Error on start redis connection: {str(error)}")
-            self.__conn = None
-
-    def close(self):
-        if self.__conn:
-            self.__conn.close()
-
-    def __enter__(self):
-        """
-        Method to start connection
-        """
-        self.__start_conn()
-        _logger.debug("Redis connected")
-
-    def __exit__(self, type, value, traceback):
-        """
-        Method to close connection
-        """
-        self.close()
-        _logger.debug("Redis connection closed")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    _logger.info("Starting redis pool")
+    app.redis = Redis(
+        connection_pool=ConnectionPool(
+            host=_env.REDIS_HOST,
+            port=int(_env.REDIS_PORT),
+            decode_responses=True,
+            max_connections=_env.REDIS_MAX_CONNECTIONS,
+            socket_timeout=_env.REDIS_SOCKET_TIMEOUT_SECONDS,
+            socket_connect_timeout=_env.REDIS_CONNECT_TIMEOUT_SECONDS,
+            health_check_interval=_env.REDIS_HEALTH_CHECK_INTERVAL_SECONDS,
+            retry_on_timeout=True
+        )
+    )
+
+    try:
+        await app.redis.ping()
+
+    except Exception as error:
+        # The cache is optional, the API keeps serving without it
+        _logger.error(f"Error on start redis connection: {str(error)}")
+
+    yield
+
+    _logger.info("Closing redis pool")
+    await app.redis.aclose(close_connection_pool=True)
+
+async def get_redis(request: Request) -> Redis:
+    return request.app.redis
@@ -1,176 +1,425 @@
-from app.core.entities import PropertyInDB
-from app.core.configs import get_logger
-from app.core.db.pg_connection2 import PGConnection
-from typing import List
+from contextlib import aclosing
+from app.core.configs import get_environment, get_logger
+from app.core.entities import GeoArea, EARTH_RADIUS_METERS
+from app.core.db.base_connection import DBConnection, DatabaseUnavailable
+from app.core.metrics import observed
+from typing import AsyncIterator, List, Set, Tuple
 
+_env = get_environment()
 _logger = get_logger(__name__)
 
 
 class PropertyRepository:
-    def __init__(self, connection: PGConnection) -> None:
-        self.conn: PGConnection = connection
+    # Every field a caller can ask for, with its expression and the join it needs
+    FIELDS = {
+        "id": ("p.id", None),
+        "title": ("p.title", None),
+        "price": ("p.price", None),
+        "description": ("p.description", None),
+        "rooms": ("p.rooms", None),
+        "bathrooms": ("p.bathrooms", None),
+        "size": ('p."size"', None),
+        "parking_space": ("p.parking_space", None),
+        "image_url": ("p.image_url", None),
+        "type": ('p."type"', None),
+        "property_url": ("p.property_url", None),
+        "number": ('p."number"', None),
+        "is_active": ("p.is_active", None),
+        "neighborhood_name": ('n."name" AS neighborhood_name', "n"),
+        "population": ("n.population", "n"),
+        "houses": ("n.houses", "n"),
+        "area": ("n.area", "n"),
+        "street_name": ('s."name" AS street_name', "s"),
+        "zip_code": ("s.zip_code", "s"),
+        "flood_quota": ("s.flood_quota", "s"),
+        "latitude": ("s.latitude", "s"),
+        "longitude": ("s.longitude", "s"),
+        "modality_name": ('m."name" AS modality_name', "m"),
+        "company_name": ('c."name" AS company_name', "c"),
+    }
 
-    async def select_by_id(self, property_id: int) -> PropertyInDB:
+    JOINS = {
+        "n": "INNER JOIN public.neighborhoods n ON p.neighborhood_id = n.id",
+        "s": "INNER JOIN public.streets s ON p.street_id = s.id",
+        "m": "INNER JOIN public.modalities m ON p.modality_id = m.id",
+        "c": "INNER JOIN public.companies c ON p.company_id = c.id",
+    }
+
+    def __init__(self, connection: DBConnection) -> None:
+        self.conn: DBConnection = connection
+
+    @observed("db")
+    async def select_by_id(self, property_id: int, fields: List[str] = None) -> dict:
+        """
+        Rows are trusted as they come from Postgres, with the PropertyInDB
+        field names, and are not validated again
+        """
         try:
-            query = """--sql
-            SELECT
-                p.id,
-                p.title,
-                p.price,
-                p.description,
-                p.rooms,
-                p.bathrooms,
-                p."size",
-                p.parking_space,
-                p.image_url,
-                p."type",
-                p.property_url,
-                p."number",
-                p.is_active,
-                n."name" AS neighborhood_name,
-                n.population,
-                n.houses,
-                n.area,
-                s."name" AS street_name,
-                s.zip_code,
-                s.flood_quota,
-                s.latitude,
-                s.longitude,
-                m."name" AS modality_name,
-                c."name" AS company_name
-            FROM
-                public.properties p
-            INNER JOIN public.neighborhoods n ON
-                p.neighborhood_id = n.id
-            INNER JOIN public.streets s ON
-                p.street_id = s.id
-            INNER JOIN public.modalities m ON
-                p.modality_id = m.id
-            INNER JOIN public.companies c ON
-                p.company_id = c.id
-            WHERE p.id = %(property_id)s;
-            """
+            query = self.__build_select(fields=fields) + " WHERE p.id = %(property_id)s;"
 
-            raw_property = self.conn.fetch_with_retry(
+            raw_property = await self.conn.execute(
                 sql_statement=query, values={"property_id": property_id}
             )
 
-            if raw_property:
-                return PropertyInDB(**raw_property)
+            return raw_property
+
+        except DatabaseUnavailable:
+            raise
 
         except Exception as error:
             _logger.error(f"Error: {str(error)}. property_id: {property_id}")
 
-    async def count_select_all(self) -> int:
+    @observed("db")
+    async def count_select_all(self, rooms: int = None, bathrooms: int = None, parking_space: int = None, size: int = None, neighborhood: str = None, is_active: bool = None, area: GeoArea = None) -> int:
         try:
-            query = """--sql
-            SELECT
-                COUNT(*) as quantity
-            FROM
-                public.properties p
-            INNER JOIN public.neighborhoods n ON
-                p.neighborhood_id = n.id
-            INNER JOIN public.streets s ON
-                p.street_id = s.id
-            INNER JOIN public.modalities m ON
-                p.modality_id = m.id
-            INNER JOIN public.companies c ON
-                p.company_id = c.id
-            """
+            query = "SELECT COUNT(*) AS quantity " + self.__build_from(joins=self.__filter_joins(neighborhood=neighborhood, area=area))
 
-            raw_count = self.conn.fetch_with_retry(sql_statement=query)
+            filter_values, values = self.__build_filters(
+                rooms=rooms,
+                bathrooms=bathrooms,
+                parking_space=parking_space,
+                size=size,
+                neighborhood=neighborhood,
+                is_active=is_active,
+                area=area
+            )
+
+            if filter_values:
+                query += " WHERE " + " AND ".join(filter_values)
+
+            raw_count = await self.conn.execute(sql_statement=query, values=values)
 
             if raw_count:
                 return raw_count["quantity"]
             
             return 0
         
+        except DatabaseUnavailable:
+            raise
+
         except Exception as error:
             _logger.error(f"Error: {str(error)}")
             return 0
 
-    async def select_all(self, page_size: int, offset: int, rooms: int, bathrooms: int, parking_space: int, size: int, neighborhood: str) -> List[PropertyInDB]:
+    @observed("db")
+    async def count_estimate(self) -> int:
+        """
+        Row estimate kept by the planner statistics, cheap but only meaningful without filters
+        """
         try:
             query = """--sql
             SELECT
-                p.id,
-                p.title,
-                p.price,
-                p.description,
-                p.rooms,
-                p.bathrooms,
-                p."size",
-                p.parking_space,
-                p.image_url,
-                p."type",
-                p.property_url,
-                p."number",
-                p.is_active,
-                n."name" AS neighborhood_name,
-                n.population,
-                n.houses,
-                n.area,
-                s."name" AS street_name,
-                s.zip_code,
-                s.flood_quota,
-                s.latitude,
-                s.longitude,
-                m."name" AS modality_name,
-                c."name" AS company_name
+                c.reltuples::bigint AS quantity
             FROM
-                public.properties p
-            INNER JOIN public.neighborhoods n ON
-                p.neighborhood_id = n.id
-            INNER JOIN public.streets s ON
-                p.street_id = s.id
-            INNER JOIN public.modalities m ON
-                p.modality_id = m.id
-            INNER JOIN public.companies c ON
-                p.company_id = c.id
+                pg_catalog.pg_class c
+            WHERE c.oid = 'public.properties'::regclass;
             """
-            values = {}
-            filter_values = []
 
-            if rooms:
-                filter_values.append(" p.rooms = %(rooms)s ")
-                values["rooms"] = rooms
+            raw_count = await self.conn.execute(sql_statement=query)
 
-            if bathrooms:
-                filter_values.append(" p.bathrooms = %(bathrooms)s ")
-                values["bathrooms"] = bathrooms
+            if raw_count and raw_count["quantity"] >= 0:
+                return raw_count["quantity"]
 
-            if parking_space:
-                filter_values.append(" p.parking_space = %(parking_space)s")
-                values["parking_space"] = parking_space
+            # Never analyzed, the planner has no estimate yet
+            return await self.count_select_all()
 
-            if neighborhood:
-                filter_values.append(" n.name = %(neighborhood)s")
-                values["neighborhood"] = neighborhood
+        except DatabaseUnavailable:
+            raise
+
+        except Exception as error:
+            _logger.error(f"Error: {str(error)}")
+            return 0
+
+    @observed("db")
+    async def select_all(self, page_size: int, offset: int, rooms: int, bathrooms: int, parking_space: int, size: int, neighborhood: str, after_id: int = None, fields: List[str] = None, is_active: bool = None, area: GeoArea = None) -> List[dict]:
+        try:
+            filter_values, values = self.__build_filters(
+                rooms=rooms,
+                bathrooms=bathrooms,
+                parking_space=parking_space,
+                size=size,
+                neighborhood=neighborhood,
+                is_active=is_active,
+                area=area
+            )
 
-            if size:
-                min_size = size - 10
-                max_size = size + 10
-                filter_values.append(" p.size > %(min_size)s AND p.size < %(max_size)s")
-                values["min_size"] = min_size
-                values["max_size"] = max_size
+            if after_id is not None:
+                # Keyset pagination: seek past the last seen id instead of skipping rows
+                filter_values.append(" p.id > %(after_id)s")
+                values["after_id"] = after_id
 
-            if any([rooms, bathrooms, parking_space, neighborhood, size]):
+            query = self.__build_select(fields=fields, joins=self.__filter_joins(neighborhood=neighborhood, area=area), area=area)
+
+            if filter_values:
                 query += " WHERE " + " AND ".join(filter_values)
 
             if page_size:
-                query += " ORDER BY p.id LIMIT %(page_size)s OFFSET %(offset)s;"
                 values["page_size"] = page_size
-                values["offset"] = offset
 
-            raw_properties = self.conn.fetch_with_retry(sql_statement=query, values=values, all=True)
-            properties = []
+                if area:
+                    # Nearest first, geo searches page by offset only
+                    query += " ORDER BY distance, p.id LIMIT %(page_size)s OFFSET %(offset)s;"
+                    values["offset"] = offset
+
+                elif after_id is not None:
+                    query += " ORDER BY p.id LIMIT %(page_size)s;"
+
+                else:
+                    query += " ORDER BY p.id LIMIT %(page_size)s OFFSET %(offset)s;"
+                    values["offset"] = offset
+
+            raw_properties = await self.conn.execute(sql_statement=query, values=values, many=True)
 
-            if raw_properties:
-                for raw_property in raw_properties:
-                    properties.append(PropertyInDB(**raw_property))
+            return raw_properties or []
 
-            return properties
+        except DatabaseUnavailable:
+            raise
 
         except Exception as error:
             _logger.error(f"Error: {str(error)}")
             return []
+
+    @observed("db")
+    async def select_after(self, after_id: int, limit: int) -> List[dict]:
+        """
+        Every field of the properties past after_id, in id order. Errors are raised
+        rather than swallowed, so a loader never mistakes a failure for the end of the table.
+        """
+        try:
+            query = self.__build_select() + " WHERE p.id > %(after_id)s ORDER BY p.id LIMIT %(limit)s;"
+
+            raw_properties = await self.conn.execute(
+                sql_statement=query, values={"after_id": after_id, "limit": limit}, many=True
+            )
+
+            return raw_properties or []
+
+        except Exception as error:
+            _logger.error(f"Error: {str(error)}. after_id: {after_id}")
+            raise
+
+    @observed("db")
+    async def select_features_after(self, after_id: int, limit: int) -> List[dict]:
+        """
+        The numeric features compared by the similarity index, past after_id in id order.
+        Raises like select_after.
+        """
+        try:
+            query = self.__build_features() + " WHERE p.id > %(after_id)s ORDER BY p.id LIMIT %(limit)s;"
+
+            raw_features = await self.conn.execute(
+                sql_statement=query, values={"after_id": after_id, "limit": limit}, many=True
+            )
+
+            return raw_features or []
+
+        except Exception as error:
+            _logger.error(f"Error: {str(error)}. after_id: {after_id}")
+            raise
+
+    @observed("db")
+    async def select_features_by_id(self, property_id: int) -> dict:
+        try:
+            query = self.__build_features() + " WHERE p.id = %(property_id)s;"
+
+            raw_features = await self.conn.execute(
+                sql_statement=query, values={"property_id": property_id}
+            )
+
+            return raw_features
+
+        except DatabaseUnavailable:
+            raise
+
+        except Exception as error:
+            _logger.error(f"Error: {str(error)}. property_id: {property_id}")
+
+    @observed("db")
+    async def select_by_ids(self, property_ids: List[int], fields: List[str] = None) -> List[dict]:
+        """
+        Properties with the given ids, in no particular order
+        """
+        try:
+            query = self.__build_select(fields=fields) + " WHERE p.id = ANY(%(property_ids)s);"
+
+            raw_properties = await self.conn.execute(
+                sql_statement=query, values={"property_ids": property_ids}, many=True
+            )
+
+            return raw_properties or []
+
+        except DatabaseUnavailable:
+            raise
+
+        except Exception as error:
+            _logger.error(f"Error: {str(error)}. property_ids: {property_ids}")
+            return []
+
+    @classmethod
+    def __build_features(cls) -> str:
+        lat, lng = ("p.lat", "p.lng") if _env.PROPERTY_SEARCH_VIEW else ("s.lat", "s.lng")
+
+        return (
+            f'SELECT p.id, p.price, p."size", p.rooms, p.bathrooms, p.parking_space, {lat} AS lat, {lng} AS lng '
+            + cls.__build_from(joins={"s"})
+        )
+
+    @classmethod
+    def __build_select(cls, fields: List[str] = None, joins: Set[str] = None, area: GeoArea = None) -> str:
+        """
+        Select only the requested fields, joining just the tables they or the filters need.
+        Geo searches also select the distance in meters to the center of the area.
+        """
+        fields = fields or list(cls.FIELDS)
+        distance = f", {cls.__distance()} AS distance" if area else ""
+
+        if _env.PROPERTY_SEARCH_VIEW:
+            # The read model holds every field under its own name
+            return "SELECT " + ", ".join(f'p."{field}"' for field in fields) + distance + " " + cls.__build_from()
+
+        columns = [cls.FIELDS[field] for field in fields]
+        joins = set(joins or ()) | {join for _, join in columns if join}
+
+        return "SELECT " + ", ".join(expression for expression, _ in columns) + distance + " " + cls.__build_from(joins=joins)
+
+    @classmethod
+    def __build_from(cls, joins: Set[str] = None) -> str:
+        if _env.PROPERTY_SEARCH_VIEW:
+            return "FROM public.property_search p"
+
+        query = "FROM public.properties p"
+
+        for alias, join in cls.JOINS.items():
+            if alias in (joins or ()):
+                query += " " + join
+
+        return query
+
+    @staticmethod
+    def __filter_joins(neighborhood: str = None, area: GeoArea = None) -> Set[str]:
+        joins = set()
+
+        if neighborhood:
+            joins.add("n")
+
+        if area:
+            joins.add("s")
+
+        return joins
+
+    @staticmethod
+    def __distance() -> str:
+        """
+        Haversine distance in meters between the street and the center of the geo search
+        """
+        lat, lng = ("p.lat", "p.lng") if _env.PROPERTY_SEARCH_VIEW else ("s.lat", "s.lng")
+
+        return (
+            f"{EARTH_RADIUS_METERS} * 2 * asin(sqrt("
+            f"power(sin(radians({lat} - %(center_lat)s) / 2), 2) + "
+            f"cos(radians(%(center_lat)s)) * cos(radians({lat})) * power(sin(radians({lng} - %(center_lng)s) / 2), 2)"
+            "))"
+        )
+
+    @classmethod
+    def __build_filters(cls, rooms: int, bathrooms: int, parking_space: int, size: int, neighborhood: str, is_active: bool = None, area: GeoArea = None) -> Tuple[List[str], dict]:
+        values = {}
+        filter_values = []
+
+        if rooms:
+            filter_values.append(" p.rooms = %(rooms)s ")
+            values["rooms"] = rooms
+
+        if bathrooms:
+            filter_values.append(" p.bathrooms = %(bathrooms)s ")
+            values["bathrooms"] = bathrooms
+
+        if parking_space:
+            filter_values.append(" p.parking_space = %(parking_space)s")
+            values["parking_space"] = parking_space
+
+        if neighborhood:
+            if _env.PROPERTY_SEARCH_VIEW:
+                filter_values.append(" p.neighborhood_name = %(neighborhood)s")
+
+            else:
+                filter_values.append(" n.name = %(neighborhood)s")
+
+            values["neighborhood"] = neighborhood
+
+        if size:
+            min_size = size - 10
+            max_size = size + 10
+            filter_values.append(" p.size > %(min_size)s AND p.size < %(max_size)s")
+            values["min_size"] = min_size
+            values["max_size"] = max_size
+
+        if is_active is not None:
+            # Inlined rather than bound, so the planner can match the partial indexes on active properties
+            filter_values.append(" p.is_active" if is_active else " NOT p.is_active")
+
+        if area:
+            # The bounding box is what the GiST index on the point narrows, the radius is checked on what is left
+            alias = "p" if _env.PROPERTY_SEARCH_VIEW else "s"
+            filter_values.append(
+                f" point({alias}.lng, {alias}.lat) <@ box(point(%(min_lng)s, %(min_lat)s), point(%(max_lng)s, %(max_lat)s))"
+            )
+            values.update(area.model_dump(exclude={"radius"}))
+
+            if area.radius:
+                filter_values.append(f" {cls.__distance()} <= %(radius)s")
+                values["radius"] = area.radius
+
+        return filter_values, values
+
+    @observed("db")
+    async def export_all(self) -> AsyncIterator[bytes]:
+        """
+        Stream every property as csv rows, in the same column order as ExportProperty
+        """
+        try:
+            query = """--sql
+            COPY (
+                SELECT
+                    p.id,
+                    p.title,
+                    p.price,
+                    p.rooms,
+                    p.bathrooms,
+                    p."size",
+                    p.parking_space,
+                    p."type",
+                    p."number",
+                    n."name" AS neighborhood_name,
+                    n.population,
+                    n.houses,
+                    n.area,
+                    s."name" AS street_name,
+                    s.zip_code,
+                    s.flood_quota,
+                    s.latitude,
+                    s.longitude,
+                    m."name" AS modality_name,
+                    c."name" AS company_name
+                FROM
+                    public.properties p
+                INNER JOIN public.neighborhoods n ON
+                    p.neighborhood_id = n.id
+                INNER JOIN public.streets s ON
+                    p.street_id = s.id
+                INNER JOIN public.modalities m ON
+                    p.modality_id = m.id
+                INNER JOIN public.companies c ON
+                    p.company_id = c.id
+                ORDER BY p.id
+            ) TO STDOUT WITH (FORMAT csv, DELIMITER ';', QUOTE '|')
+            """
+
+            # Closed here and not by the event loop, a COPY left open would go back to the pool mid-stream
+            async with aclosing(self.conn.copy_to(sql_statement=query)) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+
+        except Exception as error:
+            _logger.error(f"Error on export_all: {str(error)}")
+            raise
@@ -0,0 +1,212 @@
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+from fastapi import FastAPI, Request
+import numpy as np
+from app.core.configs import get_environment, get_logger
+from .kd_tree import KDTree
+from .periodic_loader import CatalogLoader
+from .repositories import PropertyRepository
+
+_env = get_environment()
+_logger = get_logger(__name__)
+
+
+class SimilarityIndex:
+    """
+    Properties as points of standardized numeric features, with a KDTree over
+    them to find the nearest ones. Missing features take the median of the
+    column, so a property without coordinates is still comparable by the rest.
+    Properties added after the tree was built are kept in a small tail that is
+    compared by brute force, until it is large enough to rebuild the tree.
+    """
+
+    FEATURES = ("size", "rooms", "bathrooms", "parking_space", "lat", "lng", "price_per_m2")
+
+    def __init__(self, ids: np.ndarray, raw: np.ndarray, points: np.ndarray, tree: KDTree, stats: Tuple[np.ndarray, np.ndarray, np.ndarray], loaded_at: float = None) -> None:
+        self.ids = ids
+        self.raw = raw
+        self.points = points
+        self.positions: Dict[int, int] = {int(property_id): position for position, property_id in enumerate(ids.tolist())}
+        self.__tree = tree
+        self.__medians, self.__means, self.__scales = stats
+        # When the catalog was last loaded in full, extending keeps it
+        self.loaded_at = loaded_at or time.time()
+
+    @classmethod
+    def build(cls, rows: List[dict], loaded_at: float = None) -> "SimilarityIndex":
+        ids = np.fromiter((row["id"] for row in rows), dtype=np.int64, count=len(rows))
+        return cls.__fit(ids=ids, raw=cls.__features(rows=rows), loaded_at=loaded_at)
+
+    def extend(self, rows: List[dict]) -> "SimilarityIndex":
+        """
+        New index with rows past the watermark added, this one is left untouched.
+        The tree is rebuilt, and the features standardized again, once the tail
+        outgrows SIMILAR_PROPERTIES_REBUILD_RATIO of it.
+        """
+        ids = np.concatenate((self.ids, np.fromiter((row["id"] for row in rows), dtype=np.int64, count=len(rows))))
+        new_raw = self.__features(rows=rows)
+        raw = np.concatenate((self.raw, new_raw))
+
+        if len(ids) - len(self.__tree) > _env.SIMILAR_PROPERTIES_REBUILD_RATIO * len(self.__tree):
+            return self.__fit(ids=ids, raw=raw, loaded_at=self.loaded_at)
+
+        return SimilarityIndex(
+            ids=ids,
+            raw=raw,
+            points=np.concatenate((self.points, self.__standardize(new_raw))),
+            tree=self.__tree,
+            stats=(self.__medians, self.__means, self.__scales),
+            loaded_at=self.loaded_at
+        )
+
+    @property
+    def watermark(self) -> int:
+        return int(self.ids[-1]) if len(self.ids) else 0
+
+    def point(self, property_id: int) -> Optional[np.ndarray]:
+        position = self.positions.get(property_id)
+        return None if position is None else self.points[position]
+
+    def standardize(self, row: dict) -> np.ndarray:
+        """
+        Point of a property that is not indexed yet
+        """
+        return self.__standardize(self.__features(rows=[row]))[0]
+
+    def nearest(self, point: np.ndarray, k: int, exclude: int = None) -> List[Tuple[int, float]]:
+        """
+        Ids of the k properties nearest to point with their distances, nearest first
+        """
+        distances, positions = self.__tree.query(point=point, k=k + 1)
+
+        if len(self.ids) > len(self.__tree):
+            tail = np.arange(len(self.__tree), len(self.ids))
+            distances = np.concatenate((distances, np.sqrt(((self.points[tail] - point) ** 2).sum(axis=1))))
+            positions = np.concatenate((positions, tail))
+
+        neighbours = []
+
+        for index in np.argsort(distances, kind="stable"):
+            property_id = int(self.ids[positions[index]])
+
+            if property_id != exclude:
+                neighbours.append((property_id, float(distances[index])))
+
+            if len(neighbours) == k:
+                break
+
+        return neighbours
+
+    def stats(self) -> dict:
+        return {
+            "rows": len(self.ids),
+            "tree_rows": len(self.__tree),
+            "watermark": self.watermark,
+            "loaded_at": self.loaded_at,
+            "memory_bytes": self.ids.nbytes + self.raw.nbytes + self.points.nbytes,
+        }
+
+    @classmethod
+    def __fit(cls, ids: np.ndarray, raw: np.ndarray, loaded_at: float = None) -> "SimilarityIndex":
+        if len(raw):
+            missing = np.isnan(raw)
+            # Columns with no value at all fall back to 0
+            medians = np.array([
+                np.median(column[~empty]) if not empty.all() else 0.0
+                for column, empty in zip(raw.T, missing.T)
+            ])
+            filled = np.where(missing, medians, raw)
+            means = filled.mean(axis=0)
+            scales = filled.std(axis=0)
+            scales[scales == 0] = 1.0
+
+        else:
+            medians = means = np.zeros(len(cls.FEATURES))
+            scales = np.ones(len(cls.FEATURES))
+
+        points = (np.where(np.isnan(raw), medians, raw) - means) / scales
+
+        return cls(
+            ids=ids,
+            raw=raw,
+            points=points,
+            tree=KDTree(points=points),
+            stats=(medians, means, scales),
+            loaded_at=loaded_at
+        )
+
+    def __standardize(self, raw: np.ndarray) -> np.ndarray:
+        return (np.where(np.isnan(raw), self.__medians, raw) - self.__means) / self.__scales
+
+    @classmethod
+    def __features(cls, rows: List[dict]) -> np.ndarray:
+        columns = {
+            name: np.fromiter(
+                (np.nan if row[name] is None else float(row[name]) for row in rows),
+                dtype=np.float64,
+                count=len(rows)
+            )
+            for name in ("price", "size", "rooms", "bathrooms", "parking_space", "lat", "lng")
+        }
+
+        sizes = columns["size"]
+        columns["price_per_m2"] = np.divide(
+            columns["price"], sizes, out=np.full(len(rows), np.nan), where=sizes > 0
+        )
+
+        return np.column_stack([columns[name] for name in cls.FEATURES]).reshape(len(rows), len(cls.FEATURES))
+
+
+class SimilarityIndexLoader(CatalogLoader):
+    """
+    Keeps a SimilarityIndex current, see CatalogLoader
+    """
+
+    NAME = "similarity index"
+
+    @property
+    def refresh_seconds(self) -> float:
+        return _env.SIMILAR_PROPERTIES_REFRESH_SECONDS
+
+    @property
+    def full_reload_seconds(self) -> float:
+        return _env.SIMILAR_PROPERTIES_FULL_RELOAD_SECONDS
+
+    @property
+    def batch_size(self) -> int:
+        return _env.SIMILAR_PROPERTIES_BATCH_SIZE
+
+    def build(self, rows: List[dict]) -> SimilarityIndex:
+        return SimilarityIndex.build(rows)
+
+    async def select_after(self, property_repository: PropertyRepository, after_id: int, limit: int) -> List[dict]:
+        return await property_repository.select_features_after(after_id=after_id, limit=limit)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not _env.SIMILAR_PROPERTIES_INDEX:
+        yield
+        return
+
+    _logger.info("Loading similarity index")
+    app.similarity_index = SimilarityIndexLoader(pool=app.async_pool, redis=app.redis)
+
+    try:
+        await app.similarity_index.load()
+
+    except Exception as error:
+        # Similar properties are unavailable until a refresh manages to load it
+        _logger.error(f"Error on load similarity index: {str(error)}")
+
+    app.similarity_index.start()
+    yield
+
+    _logger.info("Stopping similarity index refresh")
+    await app.similarity_index.stop()
+
+
+async def get_similarity_index(request: Request) -> Optional[SimilarityIndex]:
+    loader = getattr(request.app, "similarity_index", None)
+    return loader.current if loader else None
@@ -1 +1,3 @@
 from .property_entity import PropertyInDB, ExportProperty
+from .export_job_entity import ExportJob, ExportJobStatus
+from .geo_entity import GeoArea, EARTH_RADIUS_METERS
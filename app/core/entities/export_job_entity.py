@@ -0,0 +1,30 @@
+from datetime import datetime
+from enum import Enum
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional
+
+
+class ExportJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class ExportJob(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+
+    job_id: str = Field(example="0b6f5b6e8f2a4f0e9b0f1c7d2d7d1a3e")
+    model_id: int = Field(example=123)
+    data_version: int = Field(default=0, example=3)
+    status: ExportJobStatus = Field(example=ExportJobStatus.QUEUED)
+    rows_exported: int = Field(default=0, example=123)
+    file_path: Optional[str] = Field(default=None, example="models/model #123.csv")
+    file_url: Optional[str] = Field(default=None, example="http://localhost:4566/test/models/model%20%23123.csv")
+    error: Optional[str] = Field(default=None, example="Nothing to export")
+    created_at: datetime = Field(example="2023-10-01T12:00:00")
+    updated_at: datetime = Field(example="2023-10-01T12:00:00")
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (ExportJobStatus.DONE, ExportJobStatus.FAILED)
@@ -0,0 +1,88 @@
+import math
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional
+
+EARTH_RADIUS_METERS = 6371000.0
+METERS_PER_DEGREE = 111320.0
+
+
+class GeoArea(BaseModel):
+    """
+    Area of a geo search: a bounding box, plus a radius when searching around a center.
+    Matches are ordered by their distance to the center.
+    """
+    model_config = ConfigDict(frozen=True)
+
+    min_lat: float = Field(example=-26.95)
+    min_lng: float = Field(example=-49.10)
+    max_lat: float = Field(example=-26.85)
+    max_lng: float = Field(example=-49.00)
+    center_lat: float = Field(example=-26.90)
+    center_lng: float = Field(example=-49.05)
+    radius: Optional[float] = Field(default=None, example=1500)
+
+    @classmethod
+    def from_query(cls, bbox: str = None, lat: float = None, lng: float = None, radius: float = None) -> Optional["GeoArea"]:
+        """
+        Area asked through the query string, None without one, raises ValueError when it is inconsistent
+        """
+        if bbox and (lat is not None or lng is not None or radius is not None):
+            raise ValueError("Use either bbox or lat/lng/radius")
+
+        if bbox:
+            return cls.from_bbox(bbox=bbox)
+
+        if lat is None and lng is None and radius is None:
+            return
+
+        if lat is None or lng is None or radius is None:
+            raise ValueError("lat, lng and radius go together")
+
+        return cls.from_radius(lat=lat, lng=lng, radius=radius)
+
+    @classmethod
+    def from_bbox(cls, bbox: str) -> "GeoArea":
+        """
+        Read a min_lng,min_lat,max_lng,max_lat box, raises ValueError when it is malformed
+        """
+        try:
+            min_lng, min_lat, max_lng, max_lat = (float(value) for value in bbox.split(","))
+
+        except ValueError:
+            raise ValueError("bbox must be min_lng,min_lat,max_lng,max_lat")
+
+        if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= max_lng <= 180):
+            raise ValueError("bbox is out of range")
+
+        return cls(
+            min_lat=min_lat,
+            min_lng=min_lng,
+            max_lat=max_lat,
+            max_lng=max_lng,
+            center_lat=(min_lat + max_lat) / 2,
+            center_lng=(min_lng + max_lng) / 2
+        )
+
+    @classmethod
+    def from_radius(cls, lat: float, lng: float, radius: float) -> "GeoArea":
+        """
+        Circle of radius meters around lat/lng, its bounding box is what the index narrows
+        """
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            raise ValueError("lat/lng is out of range")
+
+        if radius <= 0:
+            raise ValueError("radius must be positive")
+
+        lat_delta = radius / METERS_PER_DEGREE
+        lng_delta = radius / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+
+        return cls(
+            min_lat=max(lat - lat_delta, -90),
+            min_lng=max(lng - lng_delta, -180),
+            max_lat=min(lat + lat_delta, 90),
+            max_lng=min(lng + lng_delta, 180),
+            center_lat=lat,
+            center_lng=lng,
+            radius=radius
+        )
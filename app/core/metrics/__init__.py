@@ -0,0 +1,2 @@
+from .instrumentation import observed, timed, record_stage, record_cache, record_request
+from .instrumentation import start_timings, current_timings, reset_timings, render_metrics
@@ -0,0 +1,127 @@
+import functools
+import inspect
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Dict, Optional, Tuple
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_SECONDS = Histogram(
+    "property_api_stage_seconds",
+    "Time spent in each stage of serving a request",
+    ["stage", "operation"],
+    buckets=BUCKETS
+)
+CACHE_LOOKUPS = Counter(
+    "property_api_cache_lookups_total",
+    "Cache lookups by outcome",
+    ["cache", "result"]
+)
+REQUEST_SECONDS = Histogram(
+    "property_api_request_seconds",
+    "Time until the response starts, by route",
+    ["method", "route", "status"],
+    buckets=BUCKETS
+)
+
+# Seconds spent in each stage by the request being served, None outside of one
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_timings", default=None)
+
+
+def record_stage(stage: str, operation: str, seconds: float):
+    STAGE_SECONDS.labels(stage=stage, operation=operation).observe(seconds)
+    timings = _timings.get()
+
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage: str, operation: str):
+    started = time.perf_counter()
+
+    try:
+        yield
+
+    finally:
+        record_stage(stage=stage, operation=operation, seconds=time.perf_counter() - started)
+
+
+def observed(stage: str, operation: str = None):
+    """
+    Time every call of the decorated function as operation of stage, the function
+    name by default. Async generators are timed from the first item until closed.
+    """
+    def decorator(function):
+        name = operation or function.__name__
+
+        if inspect.isasyncgenfunction(function):
+            @functools.wraps(function)
+            async def generator_wrapper(*args, **kwargs):
+                generator = function(*args, **kwargs)
+
+                try:
+                    with timed(stage=stage, operation=name):
+                        async for item in generator:
+                            yield item
+
+                finally:
+                    await generator.aclose()
+
+            return generator_wrapper
+
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def coroutine_wrapper(*args, **kwargs):
+                with timed(stage=stage, operation=name):
+                    return await function(*args, **kwargs)
+
+            return coroutine_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with timed(stage=stage, operation=name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record_cache(cache: str, result: str):
+    """
+    Count a lookup of cache, result is local_hit, redis_hit, hit, miss or error
+    """
+    CACHE_LOOKUPS.labels(cache=cache, result=result).inc()
+
+
+def record_request(method: str, route: str, status: int, seconds: float):
+    REQUEST_SECONDS.labels(method=method, route=route, status=str(status)).observe(seconds)
+
+
+def start_timings() -> Token:
+    return _timings.set({})
+
+
+def current_timings() -> Dict[str, float]:
+    return _timings.get() or {}
+
+
+def reset_timings(token: Token):
+    _timings.reset(token)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Metrics in the Prometheus text format, merged across processes when
+    PROMETHEUS_MULTIPROC_DIR is set for a multi worker server
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -1 +1,4 @@
 from .property_services import PropertyServices
+from .pagination import encode_cursor, decode_cursor
+from .projection import parse_fields
+from .export_jobs import ExportJobs, get_export_jobs
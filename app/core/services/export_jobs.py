@@ -0,0 +1,262 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from uuid import uuid4
+from fastapi import FastAPI, Request
+from psycopg.connection_async import AsyncConnection
+from redis.asyncio import Redis
+from redis.exceptions import WatchError
+from app.api.dependencies import Bucket
+from app.core.cache import ResponseCache
+from app.core.configs import get_environment, get_logger
+from app.core.db.database_pool import build_conninfo
+from app.core.db.pg_connection import PGConnection
+from app.core.db.repositories import PropertyRepository
+from app.core.entities import ExportJob, ExportJobStatus
+from .property_services import PropertyServices
+
+_env = get_environment()
+_logger = get_logger(__name__)
+
+
+class ExportJobs:
+    """
+    Runs csv exports in background workers of this process and keeps
+    the job state in Redis, so any API process can report on it.
+    Only one job per model_id and data version runs at a time, later
+    submissions join it. The process owning a job refreshes it every
+    EXPORT_JOB_HEARTBEAT_SECONDS, a job left alone for EXPORT_JOB_STALE_SECONDS
+    belonged to a process that died and no longer takes submissions.
+    """
+
+    def __init__(self, redis: Redis) -> None:
+        self.__redis = redis
+        self.__queue: asyncio.Queue = asyncio.Queue()
+        self.__workers: List[asyncio.Task] = []
+        self.__finished: Dict[str, asyncio.Event] = {}
+        # Jobs queued or running in this process, the heartbeat keeps them fresh
+        self.__owned: Dict[str, ExportJob] = {}
+
+    def start(self):
+        for _ in range(_env.EXPORT_WORKERS):
+            self.__workers.append(asyncio.create_task(self.__work()))
+
+        self.__workers.append(asyncio.create_task(self.__heartbeat()))
+
+    async def stop(self):
+        for worker in self.__workers:
+            worker.cancel()
+
+        await asyncio.gather(*self.__workers, return_exceptions=True)
+        self.__workers.clear()
+
+    async def submit(self, model_id: int) -> ExportJob:
+        now = datetime.utcnow()
+        job = ExportJob(
+            job_id=uuid4().hex,
+            model_id=model_id,
+            data_version=int(await self.__redis.get(ResponseCache.VERSION_KEY) or 0),
+            status=ExportJobStatus.QUEUED,
+            created_at=now,
+            updated_at=now
+        )
+        active_key = self.__active_key(model_id=model_id, data_version=job.data_version)
+        # Saved before claiming, whoever loses the claim below can always read the winner
+        await self.__save(job)
+
+        if not await self.__redis.set(active_key, job.job_id, nx=True, ex=int(_env.EXPORT_JOB_STALE_SECONDS)):
+            active_job_id = await self.__redis.get(active_key)
+            active_job = await self.get(job_id=active_job_id)
+
+            if active_job and not self.__is_over(job=active_job):
+                await self.__redis.delete(self.__job_key(job_id=job.job_id))
+                _logger.info(f"Joining export job {active_job.job_id} - model_id: {model_id}")
+                return active_job
+
+            if not await self.__claim(active_key=active_key, expected=active_job_id, job_id=job.job_id):
+                active_job = await self.get(job_id=await self.__redis.get(active_key))
+
+                if active_job:
+                    await self.__redis.delete(self.__job_key(job_id=job.job_id))
+                    _logger.info(f"Joining export job {active_job.job_id} - model_id: {model_id}")
+                    return active_job
+
+        self.__owned[job.job_id] = job
+        self.__finished[job.job_id] = asyncio.Event()
+        self.__queue.put_nowait(job.job_id)
+        _logger.info(f"Export job {job.job_id} queued - model_id: {model_id}")
+
+        return job
+
+    async def get(self, job_id: str) -> Optional[ExportJob]:
+        if not job_id:
+            return
+
+        raw_job = await self.__redis.get(self.__job_key(job_id=job_id))
+
+        if not raw_job:
+            return
+
+        job = ExportJob.model_validate_json(raw_job)
+
+        if job.file_path:
+            job.file_url = Bucket.get_presigned_url(path=job.file_path)
+
+        return job
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[ExportJob]:
+        """
+        Wait until the job finishes or the timeout runs out, returning its latest state
+        """
+        finished = self.__finished.get(job_id)
+
+        try:
+            if finished:
+                await asyncio.wait_for(finished.wait(), timeout=timeout)
+
+            else:
+                # The job runs in another process, follow it through Redis
+                deadline = asyncio.get_running_loop().time() + timeout
+                while asyncio.get_running_loop().time() < deadline:
+                    job = await self.get(job_id=job_id)
+
+                    if not job or job.is_finished:
+                        break
+
+                    await asyncio.sleep(1)
+
+        except asyncio.TimeoutError:
+            ...
+
+        return await self.get(job_id=job_id)
+
+    async def __work(self):
+        while True:
+            job_id = await self.__queue.get()
+
+            try:
+                await self.__run(job_id=job_id)
+
+            except Exception as error:
+                _logger.error(f"Error on export job {job_id}: {str(error)}")
+
+            finally:
+                self.__queue.task_done()
+
+    async def __heartbeat(self):
+        while True:
+            await asyncio.sleep(_env.EXPORT_JOB_HEARTBEAT_SECONDS)
+
+            for job in list(self.__owned.values()):
+                try:
+                    await self.__save(job)
+                    await self.__redis.expire(
+                        self.__active_key(model_id=job.model_id, data_version=job.data_version),
+                        int(_env.EXPORT_JOB_STALE_SECONDS)
+                    )
+
+                except Exception as error:
+                    _logger.error(f"Error on export job {job.job_id} heartbeat: {str(error)}")
+
+    async def __claim(self, active_key: str, expected: Optional[str], job_id: str) -> bool:
+        """
+        Point active_key at job_id only while it still points at expected, so of
+        two submissions replacing the same finished job only one starts an export
+        """
+        async with self.__redis.pipeline(transaction=True) as pipeline:
+            try:
+                await pipeline.watch(active_key)
+
+                if await pipeline.get(active_key) != expected:
+                    return False
+
+                pipeline.multi()
+                pipeline.set(active_key, job_id, ex=int(_env.EXPORT_JOB_STALE_SECONDS))
+                await pipeline.execute()
+
+                return True
+
+            except WatchError:
+                return False
+
+    @staticmethod
+    def __is_over(job: ExportJob) -> bool:
+        # Nobody refreshed it, the process running it is gone
+        stale = datetime.utcnow() - job.updated_at > timedelta(seconds=_env.EXPORT_JOB_STALE_SECONDS)
+        return job.is_finished or stale
+
+    async def __run(self, job_id: str):
+        job = self.__owned.get(job_id) or await self.get(job_id=job_id)
+
+        if not job:
+            return
+
+        job.status = ExportJobStatus.RUNNING
+        await self.__save(job)
+
+        async def on_progress(rows_exported: int):
+            job.rows_exported = rows_exported
+            await self.__save(job)
+
+        try:
+            # A connection of its own, the pool serving requests is not held for the whole upload
+            async with await AsyncConnection.connect(build_conninfo(), autocommit=True) as conn:
+                property_repository = PropertyRepository(connection=PGConnection(conn=conn))
+                services = PropertyServices(property_repository=property_repository, redis=self.__redis)
+                job.file_path = await services.export_to_csv(model_id=job.model_id, on_progress=on_progress)
+
+            job.status = ExportJobStatus.DONE
+
+            if not job.file_path:
+                job.error = "Nothing to export"
+
+        except Exception as error:
+            _logger.error(f"Export job {job_id} failed: {str(error)}")
+            job.status = ExportJobStatus.FAILED
+            job.error = str(error)
+
+        finally:
+            job.file_url = None
+            await self.__save(job)
+
+            self.__owned.pop(job.job_id, None)
+
+            active_key = self.__active_key(model_id=job.model_id, data_version=job.data_version)
+            if await self.__redis.get(active_key) == job.job_id:
+                await self.__redis.delete(active_key)
+
+            finished = self.__finished.pop(job.job_id, None)
+            if finished:
+                finished.set()
+
+    async def __save(self, job: ExportJob):
+        job.updated_at = datetime.utcnow()
+        await self.__redis.setex(
+            name=self.__job_key(job_id=job.job_id),
+            value=job.model_dump_json(),
+            time=_env.EXPORT_JOB_TTL_SECONDS
+        )
+
+    @staticmethod
+    def __job_key(job_id: str) -> str:
+        return f"export:job:{job_id}"
+
+    @staticmethod
+    def __active_key(model_id: int, data_version: int) -> str:
+        return f"export:model:{model_id}:v{data_version}:active"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    _logger.info("Starting export workers")
+    app.export_jobs = ExportJobs(redis=app.redis)
+    app.export_jobs.start()
+    yield
+
+    _logger.info("Stopping export workers")
+    await app.export_jobs.stop()
+
+
+async def get_export_jobs(request: Request) -> ExportJobs:
+    return request.app.export_jobs
@@ -0,0 +1,19 @@
+import base64
+import json
+
+
+def encode_cursor(last_id: int) -> str:
+    """Build the opaque cursor returned to clients for keyset pagination"""
+    raw = json.dumps({"after_id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Read the last seen id back from a cursor, raises ValueError when it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return int(data["after_id"])
+
+    except Exception as error:
+        raise ValueError(f"Invalid cursor: {cursor}") from error
@@ -0,0 +1,16 @@
+from typing import List
+from app.core.db.repositories import PropertyRepository
+
+
+def parse_fields(fields: str) -> List[str]:
+    """Read the requested fields in select order, id always included, raises ValueError on unknown fields"""
+    if not fields:
+        return
+
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - PropertyRepository.FIELDS.keys()
+
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    return [field for field in PropertyRepository.FIELDS if field == "id" or field in requested]
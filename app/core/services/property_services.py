@@ -1,29 +1,103 @@
-from typing import List
+from typing import AsyncIterator, Awaitable, Callable, List
+from app.core.db import PropertySnapshot, SimilarityIndex
 from app.core.db.repositories import PropertyRepository
-from app.core.entities import PropertyInDB, ExportProperty
+from app.core.entities import ExportProperty, GeoArea
 from app.core.configs import get_environment, get_logger
 from app.api.dependencies import Bucket
-from app.core.db import RedisClient
-from app.api.shared_schemas import PredictProperty, Property, PredictedProperty
-import csv
+from app.core.cache import AddressCache, PropertyVersions, ResponseCache, SingleFlight, TTLCache, get_data_version
+from app.core.metrics import observed, record_cache
+from app.core.clients import get_address_client, get_grey_wolf_client
+from app.api.shared_schemas import PredictProperty, Property, PredictedProperty, BatchPrediction
+from redis.asyncio import Redis
+import asyncio
 import json
-import requests
-import tempfile
-import time
 
 _env = get_environment()
 _logger = get_logger(__name__)
+_count_cache = TTLCache(max_size=_env.COUNT_CACHE_MAX_SIZE, ttl=_env.COUNT_CACHE_TTL_SECONDS)
+_address_cache = AddressCache()
+_response_cache = ResponseCache()
+_prediction_flights = SingleFlight()
+_address_flights = SingleFlight()
 
 
 class PropertyServices:
-    def __init__(self, property_repository: PropertyRepository) -> None:
+    def __init__(self, property_repository: PropertyRepository, redis: Redis, snapshot: PropertySnapshot = None, similarity_index: SimilarityIndex = None) -> None:
         self.__property_repository = property_repository
+        self.__redis = redis
+        self.__snapshot = snapshot
+        self.__similarity_index = similarity_index
 
-    async def search_by_id(self, property_id: int) -> PropertyInDB:
-        property_in_db = await self.__property_repository.select_by_id(property_id=property_id)
+    @observed("service")
+    async def search_by_id(self, property_id: int, fields: List[str] = None) -> dict:
+        property_in_db = await self.__property_repository.select_by_id(property_id=property_id, fields=fields)
         return property_in_db
 
-    async def search_all(self, page_size: int, offset: int, rooms: int=0, bathrooms: int=0, parking_space: int=0, size: int=0, zip_code: str="") -> List[PropertyInDB]:
+    @property
+    def has_similarity_index(self) -> bool:
+        return self.__similarity_index is not None
+
+    @observed("service")
+    async def search_similar(self, property_id: int, k: int, fields: List[str] = None) -> List[dict]:
+        """
+        The k properties nearest to property_id in the similarity index, with
+        their distance in standardized feature space, nearest first
+        """
+        index = self.__similarity_index
+        point = index.point(property_id=property_id)
+
+        if point is None:
+            # Added after the last refresh, compared by its current features
+            features = await self.__property_repository.select_features_by_id(property_id=property_id)
+
+            if not features:
+                return
+
+            point = index.standardize(row=features)
+
+        neighbours = index.nearest(point=point, k=k, exclude=property_id)
+        properties = await self.__property_repository.select_by_ids(
+            property_ids=[neighbour_id for neighbour_id, _ in neighbours],
+            fields=fields
+        )
+        properties_by_id = {property["id"]: property for property in properties}
+
+        return [
+            {**properties_by_id[neighbour_id], "similarity_distance": round(distance, 6)}
+            for neighbour_id, distance in neighbours if neighbour_id in properties_by_id
+        ]
+
+    async def save_property_version(self, property_id: int, etag: str, variant: str = "") -> dict:
+        version = await PropertyVersions.save(property_id=property_id, etag=etag, variant=variant, redis=self.__redis)
+        return version
+
+    async def search_cached_response(self, params: dict) -> bytes:
+        body = await _response_cache.get(params=params, redis=self.__redis)
+        return body
+
+    async def cache_response(self, params: dict, body: bytes):
+        await _response_cache.set(params=params, body=body, redis=self.__redis)
+
+    async def invalidate_caches(self) -> int:
+        """
+        Bump the data version after property data changes and drop the local counts
+        """
+        version = await _response_cache.invalidate(redis=self.__redis)
+        _count_cache.clear()
+        _logger.info(f"Property data version bumped to {version}")
+
+        return version
+
+    @staticmethod
+    def cache_stats() -> dict:
+        return {
+            "responses": _response_cache.stats(),
+            "counts": _count_cache.stats(),
+            "addresses": _address_cache.stats(),
+        }
+
+    @observed("service")
+    async def search_all(self, page_size: int, offset: int, rooms: int=0, bathrooms: int=0, parking_space: int=0, size: int=0, zip_code: str="", after_id: int=None, fields: List[str] = None, is_active: bool = None, area: GeoArea = None) -> List[dict]:
         if zip_code:
             address = await self.find_address_by_zip_code(zip_code=zip_code)
 
@@ -33,6 +107,20 @@ class PropertyServices:
         else:
             address = {}
 
+        if self.__snapshot and not area:
+            return self.__snapshot.search(
+                page_size=page_size,
+                offset=offset,
+                rooms=rooms,
+                bathrooms=bathrooms,
+                parking_space=parking_space,
+                size=size,
+                neighborhood=address.get("neighborhood_name"),
+                after_id=after_id,
+                fields=fields,
+                is_active=is_active
+            )
+
         properties = await self.__property_repository.select_all(
             page_size=page_size,
             offset=offset,
@@ -40,76 +128,133 @@ class PropertyServices:
             bathrooms=bathrooms,
             parking_space=parking_space,
             size=size,
-            neighborhood=address.get("neighborhood_name")
+            neighborhood=address.get("neighborhood_name"),
+            after_id=after_id,
+            fields=fields,
+            is_active=is_active,
+            area=area
         )
         return properties
     
-    async def count_search_all(self) -> int:
-        quantity = await self.__property_repository.count_select_all()
+    @observed("service")
+    async def count_search_all(self, rooms: int=0, bathrooms: int=0, parking_space: int=0, size: int=0, zip_code: str="", estimated: bool=False, is_active: bool = None, area: GeoArea = None) -> int:
+        neighborhood = None
+
+        if zip_code:
+            address = await self.find_address_by_zip_code(zip_code=zip_code)
+
+            if not address:
+                return 0
+
+            neighborhood = address.get("neighborhood_name")
+
+        filters = {
+            "rooms": rooms or None,
+            "bathrooms": bathrooms or None,
+            "parking_space": parking_space or None,
+            "size": size or None,
+            "neighborhood": neighborhood or None,
+            "is_active": is_active,
+            "area": area,
+        }
+
+        if self.__snapshot and not area:
+            return self.__snapshot.count(**{name: value for name, value in filters.items() if name != "area"})
+
+        if estimated and all(value is None for value in filters.values()):
+            return await self.__property_repository.count_estimate()
+
+        # Keyed by the data version like the responses, so an invalidation reaches every process
+        key = (await get_data_version().get(redis=self.__redis), *filters.items())
+        quantity = _count_cache.get(key)
+        record_cache(cache="counts", result="miss" if quantity is None else "hit")
+
+        if quantity is None:
+            quantity = await self.__property_repository.count_select_all(**filters)
+            _count_cache.set(key, quantity)
+
         return quantity
 
-    async def export_to_csv(self, model_id: int) -> str:
-        temp_file = tempfile.NamedTemporaryFile(suffix=".csv", delete=False)
+    @observed("service")
+    async def export_to_csv(self, model_id: int, on_progress: Callable[[int], Awaitable[None]] = None) -> str:
+        """
+        Stream every property to the bucket and return the path of the csv file
+        """
+        rows = self.__property_repository.export_all()
 
-        quantity = await self.count_search_all()
         try:
-            with open(temp_file.name, mode="a", encoding="UTF-8") as file:
-                spamwriter = csv.writer(file, delimiter=';', quotechar='|', quoting=csv.QUOTE_MINIMAL)
-                page_size = 100
-                start = 0
-                properties = await self.search_all(page_size=page_size, offset=start)
-                export_property = ExportProperty(**properties[0].model_dump())
-                header = list(export_property.model_dump().keys())
-                spamwriter.writerow(header)
-
-                while start <= quantity:
-                    if properties:
-                        for property in properties:
-                            export_property = ExportProperty(**property.model_dump())
-                            row = list(export_property.model_dump().values())
-                            spamwriter.writerow(row)
-
-                        properties = await self.search_all(page_size=page_size, offset=start)
-                        start += page_size
-
-        except Exception as error:
-            _logger.error(f"Error on create csv: {str(error)}")
+            first_chunk = await anext(rows, None)
 
-        _logger.info("Saving file on bucket")
+            if first_chunk is None:
+                _logger.warning(f"Nothing to export - model_id: {model_id}")
+                return
 
-        if quantity > 0:
+            _logger.info("Streaming csv to bucket")
             path = f"models/model #{model_id}.csv"
 
-            Bucket.save_file(bucket_path=path, file_path=temp_file.name)
+            await Bucket.upload_stream(
+                bucket_path=path,
+                chunks=self.__csv_chunks(first_chunk=first_chunk, rows=rows, on_progress=on_progress)
+            )
 
-            public_url = Bucket.get_presigned_url(path=path)
+        finally:
+            await rows.aclose()
 
-            return public_url
+        return path
 
-    async def find_address_by_zip_code(self, zip_code: str) -> dict:
-        _logger.info(f"Searching address {zip_code}")
-        try:
-            for i in range(5):
-                try:
-                    url = f"{_env.ADDRESS_SERVICES_URL}/address/zip-code/{zip_code}"
+    async def __csv_chunks(self, first_chunk: bytes, rows: AsyncIterator[bytes], on_progress: Callable[[int], Awaitable[None]] = None) -> AsyncIterator[bytes]:
+        header = ";".join(ExportProperty.model_fields.keys()) + "\n"
+        yield header.encode("UTF-8")
+        yield first_chunk
 
-                    response = requests.get(url=url)
+        exported = first_chunk.count(b"\n")
+        reported = 0
 
-                    response.raise_for_status()
+        async for chunk in rows:
+            yield chunk
+            exported += chunk.count(b"\n")
 
-                    if response.json():
-                        break
+            if on_progress and exported - reported >= _env.EXPORT_PROGRESS_INTERVAL_ROWS:
+                await on_progress(exported)
+                reported = exported
 
-                    time.sleep(2)
+        if on_progress:
+            await on_progress(exported)
 
-                except Exception:
-                    ...
+    async def find_address_by_zip_code(self, zip_code: str) -> dict:
+        address = await _address_cache.get(zip_code=zip_code, redis=self.__redis)
+
+        if address is not AddressCache.MISSING:
+            return address
 
-            return response.json()
+        try:
+            address = await _address_flights.do(
+                key=zip_code,
+                function=lambda: self.__request_address(zip_code=zip_code)
+            )
 
         except Exception as error:
+            # Failures are not cached, only answers from the address service
+            _logger.warning(f"Error on search address {zip_code}: {str(error)}")
             return
 
+        await _address_cache.set(zip_code=zip_code, address=address, redis=self.__redis)
+
+        return address
+
+    async def __request_address(self, zip_code: str) -> dict:
+        _logger.debug(f"Searching address {zip_code}")
+        # The client already retries transport errors and 5xx, an empty answer is final
+        response = await get_address_client().get(f"/address/zip-code/{zip_code}")
+
+        if response.status_code == 404:
+            return
+
+        response.raise_for_status()
+
+        return response.json() or None
+
+    @observed("service")
     async def predict_price(self, predict_property: PredictProperty, model_id: int = None) -> PredictedProperty:
         address = await self.find_address_by_zip_code(zip_code=predict_property.zip_code)
 
@@ -117,45 +262,109 @@ class PropertyServices:
             _logger.warning(f"Address not found - Zip Code: {str(predict_property.zip_code)}")
             return
         
-        is_cached = self.check_if_is_cached(predict_property=predict_property, address=address)
+        is_cached = await self.check_if_is_cached(predict_property=predict_property, address=address, model_id=model_id)
         if is_cached:
             _logger.info(f"Cached property - Zip Code: {str(predict_property.zip_code)}")
             return is_cached
-        
-        property = Property(
-            rooms=predict_property.rooms,
-            bathrooms=predict_property.bathrooms,
-            parking_space=predict_property.parking_space,
-            size=predict_property.size,
-            neighborhood_name=address["neighborhood_name"],
-            flood_quota=address["flood_quota"]
-        )
 
         try:
-            url = f"{_env.GREY_WOLF_URL}/models/predict/price"
+            property = self.__build_property(predict_property=predict_property, address=address)
+            predicted_property = await self.__predict_once(property=property, model_id=model_id)
 
-            params = {"model_id": model_id}
+            return predicted_property
 
-            response = requests.post(url=url, json=property.model_dump(), params=params)
+        except Exception as error:
+            _logger.error(f"Error predict_price: {str(error)}")
+
+    @observed("service")
+    async def predict_prices(self, predict_properties: List[PredictProperty], model_id: int = None) -> List[BatchPrediction]:
+        """
+        Predict many properties at once, resolving each zip code and each
+        distinct property only once and answering in the input order
+        """
+        zip_codes = list(dict.fromkeys(item.zip_code for item in predict_properties))
+        addresses = dict(zip(zip_codes, await self.__gather_bounded(
+            [self.find_address_by_zip_code(zip_code=zip_code) for zip_code in zip_codes]
+        )))
+
+        properties = {}
+        for predict_property in predict_properties:
+            address = addresses[predict_property.zip_code]
+
+            if address:
+                property = self.__build_property(predict_property=predict_property, address=address)
+                properties.setdefault(self.__prediction_key(property=property, model_id=model_id), property)
+
+        keys = list(properties.keys())
+        predictions = {}
 
-            response.raise_for_status()
+        try:
+            cached = await self.__redis.mget(keys) if keys else []
+            predictions = {
+                key: PredictedProperty(**json.loads(result))
+                for key, result in zip(keys, cached) if result
+            }
 
-            predicted_property = PredictedProperty(**response.json())
+        except Exception as error:
+            _logger.error(f"Error on read batch cache: {str(error)}")
 
-            self.cache_property(predicted_property)
+        misses = [key for key in keys if key not in predictions]
+        _logger.info(f"Batch prediction - {len(keys)} distinct properties, {len(misses)} not cached")
 
-            return predicted_property
+        results = await self.__gather_bounded(
+            [self.__predict_once(property=properties[key], model_id=model_id, cache=False) for key in misses],
+            return_exceptions=True
+        )
+        errors = {}
+        fresh = []
 
-        except Exception as error:
-            _logger.error(f"Error predict_price: {str(error)} - Response: {str(response.json())}")
+        for key, result in zip(misses, results):
+            if isinstance(result, Exception):
+                errors[key] = f"Error on predict price: {str(result)}"
+
+            else:
+                predictions[key] = result
+                fresh.append(result)
+
+        # One pipelined write for the whole batch instead of one per prediction
+        await self.cache_properties(predicted_properties=fresh, model_id=model_id)
+
+        batch = []
+        for index, predict_property in enumerate(predict_properties):
+            address = addresses[predict_property.zip_code]
+
+            if not address:
+                batch.append(BatchPrediction(index=index, error="Address not found"))
+                continue
+
+            key = self.__prediction_key(
+                property=self.__build_property(predict_property=predict_property, address=address),
+                model_id=model_id
+            )
+            batch.append(BatchPrediction(
+                index=index,
+                predicted_property=predictions.get(key),
+                error=errors.get(key)
+            ))
+
+        return batch
+
+    async def cache_property(self, predicted_property: PredictedProperty, model_id: int = None) -> bool:
+        return await self.cache_properties(predicted_properties=[predicted_property], model_id=model_id)
+
+    @observed("cache", "predictions.set")
+    async def cache_properties(self, predicted_properties: List[PredictedProperty], model_id: int = None) -> bool:
+        if not predicted_properties:
+            return True
 
-    def cache_property(self, predicted_property: PredictedProperty) -> bool:
         try:
-            redis_conn = RedisClient()
+            pipeline = self.__redis.pipeline(transaction=False)
 
-            key = f"rooms:{predicted_property.property.rooms}-bathrooms:{predicted_property.property.bathrooms}-parking_space:{predicted_property.property.parking_space}-size:{predicted_property.property.size}-neighborhood:{predicted_property.property.neighborhood_name}"
+            for predicted_property in predicted_properties:
+                key = self.__prediction_key(property=predicted_property.property, model_id=model_id)
+                pipeline.setex(name=key, value=predicted_property.model_dump_json(), time=300)
 
-            redis_conn.conn.setex(name=key, value=predicted_property.model_dump_json(), time=300)
+            await pipeline.execute()
 
             return True
         
@@ -163,17 +372,128 @@ class PropertyServices:
             _logger.error(f"Error on cache_property: {str(error)}")
             return False
 
-    def check_if_is_cached(self, predict_property: PredictProperty, address: dict) -> PredictedProperty:
+    @observed("cache", "predictions.get")
+    async def check_if_is_cached(self, predict_property: PredictProperty, address: dict, model_id: int = None) -> PredictedProperty:
         try:
-            _logger.info("Checking cache")
-            redis_conn = RedisClient()
+            _logger.debug("Checking cache")
 
-            key = f"rooms:{predict_property.rooms}-bathrooms:{predict_property.bathrooms}-parking_space:{predict_property.parking_space}-size:{predict_property.size}-neighborhood:{address['neighborhood_name']}"
+            key = self.__prediction_key(
+                property=self.__build_property(predict_property=predict_property, address=address),
+                model_id=model_id
+            )
             
-            result = redis_conn.conn.get(key)
+            result = await self.__redis.get(key)
+            record_cache(cache="predictions", result="hit" if result else "miss")
 
             if result:
                 return PredictedProperty(**json.loads(result))
 
         except Exception as error:
+            record_cache(cache="predictions", result="error")
             _logger.error(f"Error on check_if_is_cached: {str(error)}")
+
+    async def __predict_once(self, property: Property, model_id: int = None, cache: bool = True) -> PredictedProperty:
+        """
+        Coalesce identical concurrent predictions into a single Grey Wolf call,
+        across workers too when the distributed lock is enabled. Without cache
+        the caller writes the prediction back itself.
+        """
+        key = self.__prediction_key(property=property, model_id=model_id)
+
+        async def predict() -> PredictedProperty:
+            lock = None
+
+            if _env.PREDICTION_DISTRIBUTED_LOCK:
+                lock = await self.__acquire_prediction_lock(key=key)
+
+                if not lock:
+                    predicted_property = await self.__wait_for_prediction(key=key)
+
+                    if predicted_property:
+                        return predicted_property
+
+            try:
+                predicted_property = await self.__request_prediction(property=property, model_id=model_id)
+
+                # The workers waiting on the lock read the prediction from the cache
+                if cache or lock:
+                    await self.cache_property(predicted_property, model_id=model_id)
+
+                return predicted_property
+
+            finally:
+                if lock:
+                    await self.__release_prediction_lock(lock=lock)
+
+        return await _prediction_flights.do(key=key, function=predict)
+
+    async def __acquire_prediction_lock(self, key: str):
+        try:
+            lock = self.__redis.lock(f"lock:{key}", timeout=_env.PREDICTION_LOCK_TTL_SECONDS)
+
+            if await lock.acquire(blocking=False):
+                return lock
+
+        except Exception as error:
+            _logger.error(f"Error on acquire prediction lock: {str(error)}")
+
+    async def __release_prediction_lock(self, lock):
+        try:
+            await lock.release()
+
+        except Exception as error:
+            _logger.warning(f"Error on release prediction lock: {str(error)}")
+
+    async def __wait_for_prediction(self, key: str) -> PredictedProperty:
+        """
+        Another worker holds the lock, wait for it to cache the prediction
+        """
+        deadline = asyncio.get_running_loop().time() + _env.PREDICTION_LOCK_WAIT_SECONDS
+
+        while asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(0.05)
+
+            try:
+                result = await self.__redis.get(key)
+
+            except Exception as error:
+                _logger.error(f"Error on wait for prediction: {str(error)}")
+                return
+
+            if result:
+                return PredictedProperty(**json.loads(result))
+
+    async def __request_prediction(self, property: Property, model_id: int = None) -> PredictedProperty:
+        # httpx would send None as an empty model_id, which Grey Wolf rejects
+        params = {"model_id": model_id} if model_id is not None else {}
+
+        response = await get_grey_wolf_client().post("/models/predict/price", json=property.model_dump(), params=params)
+
+        response.raise_for_status()
+
+        return PredictedProperty(**response.json())
+
+    @staticmethod
+    async def __gather_bounded(coroutines: list, return_exceptions: bool = False) -> list:
+        semaphore = asyncio.Semaphore(_env.BATCH_PREDICT_CONCURRENCY)
+
+        async def bounded(coroutine):
+            async with semaphore:
+                return await coroutine
+
+        return await asyncio.gather(*[bounded(coroutine) for coroutine in coroutines], return_exceptions=return_exceptions)
+
+    @staticmethod
+    def __build_property(predict_property: PredictProperty, address: dict) -> Property:
+        return Property(
+            rooms=predict_property.rooms,
+            bathrooms=predict_property.bathrooms,
+            parking_space=predict_property.parking_space,
+            size=predict_property.size,
+            neighborhood_name=address["neighborhood_name"],
+            flood_quota=address["flood_quota"]
+        )
+
+    @staticmethod
+    def __prediction_key(property: Property, model_id: int = None) -> str:
+        return f"model:{model_id}-rooms:{property.rooms}-bathrooms:{property.bathrooms}-parking_space:{property.parking_space}-size:{property.size}-neighborhood:{property.neighborhood_name}"
@@ -0,0 +1,75 @@
+"""
+Synthetic catalog for the benchmarks: the migrations applied to a scratch
+schema, filled with properties spread over streets around Blumenau.
+"""
+import asyncio
+import psycopg
+from app.core.db.migrations import Migrator
+
+NEIGHBORHOODS = 100
+STREETS = 2000
+
+SEED = """
+INSERT INTO public.neighborhoods ("name", population, houses, area)
+SELECT 'neighborhood ' || g, 1000 * g, 300 * g, 1.5 * g FROM generate_series(1, %(neighborhoods)s) g;
+
+INSERT INTO public.streets ("name", zip_code, flood_quota, latitude, longitude)
+SELECT
+    'street ' || g, lpad((89000000 + g)::text, 8, '0'), 10 + g %% 7,
+    (-26.95 + (g %% 50) / 500.0)::text, (-49.10 + (g / 50) / 400.0)::text
+FROM generate_series(1, %(streets)s) g;
+
+INSERT INTO public.modalities ("name") VALUES ('sale'), ('rent');
+INSERT INTO public.companies ("name") SELECT 'company ' || g FROM generate_series(1, 10) g;
+
+INSERT INTO public.properties (
+    title, price, description, rooms, bathrooms, "size", parking_space, image_url, "type",
+    property_url, "number", is_active, neighborhood_id, street_id, modality_id, company_id
+)
+SELECT
+    'property ' || g, 150000 + (g * 7919) %% 900000, repeat('description ', 20),
+    1 + g %% 8, 1 + g %% 5, 30 + (g * 31) %% 400, g %% 4,
+    'https://images/' || g, 'house', 'https://properties/' || g, g::text, g %% 10 <> 0,
+    1 + (g - 1) %% %(streets)s %% %(neighborhoods)s, 1 + (g - 1) %% %(streets)s, 1 + g %% 2, 1 + g %% 10
+FROM generate_series(1, %(rows)s) g;
+
+REFRESH MATERIALIZED VIEW public.property_search;
+ANALYZE;
+"""
+
+
+def zip_code(street: int) -> str:
+    return str(89000000 + street).zfill(8)
+
+
+def address(zip_code: str) -> dict:
+    """
+    What the address service answers for a seeded zip code, the neighborhood of its street
+    """
+    street = int(zip_code) - 89000000
+    return {
+        "zip_code": zip_code,
+        "neighborhood_name": f"neighborhood {1 + (street - 1) % NEIGHBORHOODS}",
+        "flood_quota": 10 + street % 7,
+    }
+
+
+def seed(conninfo: str, schema: str, rows: int):
+    """
+    Recreate schema with the current migrations and rows properties in it
+    """
+    with psycopg.connect(conninfo, autocommit=True) as conn:
+        conn.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE;")
+        asyncio.run(Migrator(conninfo=conninfo, schema=schema).upgrade())
+
+        # Bound on the client, the server does not take parameters in a multi statement query
+        with conn.transaction(), psycopg.ClientCursor(conn) as cursor:
+            cursor.execute(
+                SEED.replace("public", schema),
+                {"neighborhoods": NEIGHBORHOODS, "streets": STREETS, "rows": rows}
+            )
+
+
+def drop(conninfo: str, schema: str):
+    with psycopg.connect(conninfo, autocommit=True) as conn:
+        conn.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE;")
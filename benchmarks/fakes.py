@@ -0,0 +1,340 @@
+"""
+Local stand-ins for the services the API talks to, all running inside the
+benchmark process: a Redis speaking RESP over TCP, the address and Grey Wolf
+services, and an S3 endpoint that accepts the multipart uploads of the export.
+Every HTTP stand-in sleeps for an injectable latency before answering.
+"""
+import asyncio
+import hashlib
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+import uvicorn
+from fastapi import FastAPI, Request, Response
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class ServerThread:
+    """
+    Runs an asyncio server in a thread of its own with its own event loop,
+    so the stand-ins keep answering while the load generator is busy
+    """
+
+    def __init__(self, name: str, serve, port: int = None) -> None:
+        self.name = name
+        self.port = port or free_port()
+        self.__serve = serve
+        self.__thread = threading.Thread(target=self.__run, name=name, daemon=True)
+        self.__started = threading.Event()
+        self.__loop: Optional[asyncio.AbstractEventLoop] = None
+        self.__stop: Optional[asyncio.Event] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "ServerThread":
+        self.__thread.start()
+
+        if not self.__started.wait(timeout=10):
+            raise RuntimeError(f"{self.name} did not start")
+
+        return self
+
+    def stop(self):
+        if self.__loop and self.__stop:
+            self.__loop.call_soon_threadsafe(self.__stop.set)
+
+        self.__thread.join(timeout=10)
+
+    def __run(self):
+        asyncio.run(self.__main())
+
+    async def __main(self):
+        self.__loop = asyncio.get_running_loop()
+        self.__stop = asyncio.Event()
+        await self.__serve(port=self.port, started=self.__started, stop=self.__stop)
+
+
+def http_server(app: FastAPI, name: str) -> ServerThread:
+    async def serve(port: int, started: threading.Event, stop: asyncio.Event):
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+        task = asyncio.create_task(server.serve())
+
+        while not server.started:
+            await asyncio.sleep(0.01)
+
+        started.set()
+        await stop.wait()
+        server.should_exit = True
+        await task
+
+    return ServerThread(name=name, serve=serve)
+
+
+class FakeRedis:
+    """
+    Just enough of Redis for the API: strings with expiry, counters,
+    pipelines and WATCH/MULTI/EXEC transactions, over the RESP protocol
+    so redis-py connects to it unchanged
+    """
+
+    def __init__(self) -> None:
+        self.__data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        # Bumped on every write, WATCH compares them at EXEC
+        self.__versions: Dict[bytes, int] = {}
+        self.commands = 0
+
+    def server(self) -> ServerThread:
+        async def serve(port: int, started: threading.Event, stop: asyncio.Event):
+            server = await asyncio.start_server(self.__handle, host="127.0.0.1", port=port)
+            started.set()
+
+            async with server:
+                await stop.wait()
+
+        return ServerThread(name="fake-redis", serve=serve)
+
+    async def __handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        session = {"watched": {}, "queued": None}
+
+        try:
+            while True:
+                command = await self.__read_command(reader=reader)
+
+                if command is None:
+                    break
+
+                writer.write(self.__transact(command=command, session=session))
+                await writer.drain()
+
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def __read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+        header = await reader.readline()
+
+        if not header:
+            return
+
+        if not header.startswith(b"*"):
+            return header.strip().split()
+
+        arguments = []
+        for _ in range(int(header[1:])):
+            length = int((await reader.readline())[1:])
+            arguments.append((await reader.readexactly(length + 2))[:-2])
+
+        return arguments
+
+    def __transact(self, command: List[bytes], session: dict) -> bytes:
+        name, arguments = command[0].upper().decode(), command[1:]
+
+        if name == "WATCH":
+            session["watched"].update({key: self.__versions.get(key, 0) for key in arguments})
+            return b"+OK\r\n"
+
+        if name == "UNWATCH":
+            session["watched"].clear()
+            return b"+OK\r\n"
+
+        if name == "MULTI":
+            session["queued"] = []
+            return b"+OK\r\n"
+
+        if name == "DISCARD":
+            session["queued"] = None
+            session["watched"].clear()
+            return b"+OK\r\n"
+
+        if name == "EXEC":
+            queued, session["queued"] = session["queued"] or [], None
+            changed = any(self.__versions.get(key, 0) != version for key, version in session["watched"].items())
+            session["watched"].clear()
+
+            if changed:
+                return b"*-1\r\n"
+
+            return b"*%d\r\n" % len(queued) + b"".join(self.__execute(command=queued_command) for queued_command in queued)
+
+        if session["queued"] is not None:
+            session["queued"].append(command)
+            return b"+QUEUED\r\n"
+
+        return self.__execute(command=command)
+
+    def __execute(self, command: List[bytes]) -> bytes:
+        self.commands += 1
+        name, arguments = command[0].upper().decode(), command[1:]
+
+        if name in ("SET", "SETEX", "INCR", "INCRBY", "DEL", "EXPIRE"):
+            for key in arguments[:1] if name != "DEL" else arguments:
+                self.__versions[key] = self.__versions.get(key, 0) + 1
+
+        if name == "PING":
+            return b"+PONG\r\n"
+
+        if name in ("CLIENT", "SELECT", "FLUSHALL"):
+            if name == "FLUSHALL":
+                self.__data.clear()
+
+            return b"+OK\r\n"
+
+        if name == "GET":
+            return self.__bulk(self.__get(arguments[0]))
+
+        if name == "MGET":
+            return b"*%d\r\n" % len(arguments) + b"".join(self.__bulk(self.__get(key)) for key in arguments)
+
+        if name == "SET":
+            return self.__set(key=arguments[0], value=arguments[1], options=[option.upper() for option in arguments[2:]])
+
+        if name == "SETEX":
+            self.__data[arguments[0]] = (arguments[2], time.monotonic() + int(arguments[1]))
+            return b"+OK\r\n"
+
+        if name in ("INCR", "INCRBY"):
+            value = int(self.__get(arguments[0]) or 0) + (int(arguments[1]) if len(arguments) > 1 else 1)
+            _, expires_at = self.__data.get(arguments[0], (None, None))
+            self.__data[arguments[0]] = (str(value).encode(), expires_at)
+            return b":%d\r\n" % value
+
+        if name == "DEL":
+            removed = sum(self.__data.pop(key, None) is not None for key in arguments)
+            return b":%d\r\n" % removed
+
+        if name == "EXPIRE":
+            value = self.__get(arguments[0])
+
+            if value is None:
+                return b":0\r\n"
+
+            self.__data[arguments[0]] = (value, time.monotonic() + int(arguments[1]))
+            return b":1\r\n"
+
+        return b"-ERR unknown command '%s'\r\n" % command[0]
+
+    def __get(self, key: bytes) -> Optional[bytes]:
+        value, expires_at = self.__data.get(key, (None, None))
+
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.__data[key]
+            return
+
+        return value
+
+    def __set(self, key: bytes, value: bytes, options: List[bytes]) -> bytes:
+        expires_at = None
+
+        for option, argument in zip(options, options[1:] + [b""]):
+            if option == b"EX":
+                expires_at = time.monotonic() + int(argument)
+
+            elif option == b"PX":
+                expires_at = time.monotonic() + int(argument) / 1000
+
+        if b"NX" in options and self.__get(key) is not None:
+            return b"$-1\r\n"
+
+        self.__data[key] = (value, expires_at)
+        return b"+OK\r\n"
+
+    @staticmethod
+    def __bulk(value: Optional[bytes]) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def upstreams_app(address_latency: float, grey_wolf_latency: float, find_address: Callable[[str], dict]) -> FastAPI:
+    """
+    Address service answering with find_address, and a Grey Wolf pricing by size
+    """
+    app = FastAPI()
+    app.state.calls = {"address": 0, "grey_wolf": 0}
+
+    @app.get("/address/zip-code/{zip_code}")
+    async def search_address(zip_code: str):
+        app.state.calls["address"] += 1
+        await asyncio.sleep(address_latency)
+        return find_address(zip_code)
+
+    @app.post("/models/predict/price")
+    async def predict_price(request: Request, model_id: int = None):
+        app.state.calls["grey_wolf"] += 1
+        await asyncio.sleep(grey_wolf_latency)
+        property = await request.json()
+        return {"property": property, "predicted_price": property["size"] * 4200.0, "mse": 1.5}
+
+    return app
+
+
+def bucket_app(latency: float) -> FastAPI:
+    """
+    S3 endpoint for path style requests: multipart uploads are accepted and
+    only their size is kept, presigned urls never reach it
+    """
+    app = FastAPI()
+    uploads: Dict[str, int] = {}
+    app.state.objects = {}
+
+    def xml(body: str) -> Response:
+        return Response(content=f'<?xml version="1.0" encoding="UTF-8"?>{body}', media_type="application/xml")
+
+    @app.get("/")
+    async def list_buckets():
+        return xml("<ListAllMyBucketsResult><Buckets></Buckets></ListAllMyBucketsResult>")
+
+    @app.put("/{bucket}")
+    async def create_bucket(bucket: str):
+        return Response()
+
+    @app.post("/{bucket}/{key:path}")
+    async def multipart_upload(bucket: str, key: str, request: Request):
+        await asyncio.sleep(latency)
+
+        if "uploads" in request.query_params:
+            upload_id = uuid.uuid4().hex
+            uploads[upload_id] = 0
+            return xml(
+                f"<InitiateMultipartUploadResult><Bucket>{bucket}</Bucket><Key>{key}</Key>"
+                f"<UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>"
+            )
+
+        app.state.objects[key] = uploads.pop(request.query_params["uploadId"], 0)
+        return xml(
+            f"<CompleteMultipartUploadResult><Bucket>{bucket}</Bucket><Key>{key}</Key>"
+            f'<ETag>"{uuid.uuid4().hex}"</ETag></CompleteMultipartUploadResult>'
+        )
+
+    @app.put("/{bucket}/{key:path}")
+    async def upload(bucket: str, key: str, request: Request):
+        await asyncio.sleep(latency)
+        body = await request.body()
+
+        if "uploadId" in request.query_params:
+            uploads[request.query_params["uploadId"]] += len(body)
+
+        else:
+            app.state.objects[key] = len(body)
+
+        return Response(headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+
+    @app.delete("/{bucket}/{key:path}")
+    async def abort_upload(bucket: str, key: str, request: Request):
+        uploads.pop(request.query_params.get("uploadId"), None)
+        return Response(status_code=204)
+
+    return app
@@ -0,0 +1,409 @@
+"""
+Load test of the whole API, booted from create_app() in a uvicorn process of
+its own, against local stand-ins for every dependency. Writes throughput and
+latency percentiles per endpoint to a JSON report, and compares it with a
+previous one when asked.
+
+    BENCHMARK_DATABASE_URL="host=localhost user=user dbname=test" python -m benchmarks.load --rows 50000 --output report.json
+    BENCHMARK_DATABASE_URL="..." python -m benchmarks.load --output new.json --compare report.json
+
+Redis, S3 and the address and Grey Wolf services are faked in this process
+(see benchmarks.fakes). Postgres is not: the queries rely on COPY,
+materialized views and advisory locks, so the catalog is seeded into a
+scratch schema of the database in BENCHMARK_DATABASE_URL and dropped after.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+import httpx
+import psycopg
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# The app settings are read on import, the seeding needs the migrations only
+for name in ("REDIS_HOST", "REDIS_PORT", "GREY_WOLF_URL", "ADDRESS_SERVICES_URL"):
+    os.environ.setdefault(name, "0")
+
+from benchmarks import catalog
+from benchmarks.fakes import FakeRedis, bucket_app, free_port, http_server, upstreams_app
+
+Request = Tuple[str, str, Optional[dict]]
+
+
+class Scenario(NamedTuple):
+    name: str
+    build: Callable[[random.Random], Request]
+    requests: int
+    concurrency: int
+
+
+def build_scenarios(rows: int, requests: int, concurrency: int, export_requests: int) -> List[Scenario]:
+    deep = max(rows - 1000, 1)
+
+    def by_id(rng: random.Random) -> Request:
+        return "GET", f"/properties/{rng.randint(1, rows)}", None
+
+    def list_filters(rng: random.Random) -> Request:
+        params = {"page_size": 20, "rooms": rng.randint(1, 8)}
+
+        if rng.random() < 0.5:
+            params["bathrooms"] = rng.randint(1, 5)
+
+        if rng.random() < 0.3:
+            params["zip_code"] = catalog.zip_code(rng.randint(1, catalog.STREETS))
+
+        if rng.random() < 0.3:
+            params["size"] = rng.randint(40, 400)
+
+        return "GET", "/properties?" + "&".join(f"{name}={value}" for name, value in params.items()), None
+
+    def deep_offset(rng: random.Random) -> Request:
+        return "GET", f"/properties?page_size=20&offset={rng.randint(deep, rows)}", None
+
+    def deep_keyset(rng: random.Random) -> Request:
+        return "GET", f"/properties?page_size=20&after_id={rng.randint(deep, rows)}", None
+
+    def similar(rng: random.Random) -> Request:
+        return "GET", f"/properties/{rng.randint(1, rows)}/similar?k=10", None
+
+    def predict_property(rng: random.Random) -> dict:
+        return {
+            "rooms": rng.randint(1, 5),
+            "bathrooms": rng.randint(1, 3),
+            "parking_space": rng.randint(0, 3),
+            "size": rng.randint(40, 300),
+            "zip_code": catalog.zip_code(rng.randint(1, catalog.STREETS)),
+        }
+
+    def predict(rng: random.Random) -> Request:
+        return "POST", "/properties/price/predict?model_id=1", predict_property(rng)
+
+    def predict_default_model(rng: random.Random) -> Request:
+        # Without model_id Grey Wolf picks its current model
+        return "POST", "/properties/price/predict", predict_property(rng)
+
+    def export(rng: random.Random) -> Request:
+        # A new model every time, so no request joins a running export
+        return "GET", f"/properties/export/csv?model_id={rng.randint(1, 10 ** 9)}", None
+
+    return [
+        Scenario(name="by_id", build=by_id, requests=requests, concurrency=concurrency),
+        Scenario(name="list_filters", build=list_filters, requests=requests, concurrency=concurrency),
+        Scenario(name="deep_offset", build=deep_offset, requests=requests, concurrency=concurrency),
+        Scenario(name="deep_keyset", build=deep_keyset, requests=requests, concurrency=concurrency),
+        Scenario(name="similar", build=similar, requests=requests, concurrency=concurrency),
+        Scenario(name="predict", build=predict, requests=requests, concurrency=concurrency),
+        Scenario(name="predict_default_model", build=predict_default_model, requests=requests, concurrency=concurrency),
+        Scenario(name="export", build=export, requests=export_requests, concurrency=1),
+    ]
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """
+    Nearest rank percentile of an ordered list
+    """
+    if not ordered:
+        return 0.0
+
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, seed: int, warmup: int) -> dict:
+    rng = random.Random(seed)
+    pending = [scenario.build(rng) for _ in range(scenario.requests)]
+    latencies = []
+    statuses: Dict[str, int] = {}
+    errors = 0
+
+    async def send(request: Request, record: bool):
+        nonlocal errors
+        method, url, body = request
+        started = time.perf_counter()
+
+        try:
+            response = await client.request(method, url, json=body)
+            status = str(response.status_code)
+
+        except httpx.HTTPError:
+            status = "error"
+
+        if record:
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+            errors += status == "error" or status.startswith("5")
+
+    for _ in range(min(warmup, scenario.requests)):
+        await send(scenario.build(rng), record=False)
+
+    async def worker():
+        while pending:
+            await send(pending.pop(), record=True)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(scenario.concurrency)])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": scenario.requests,
+        "concurrency": scenario.concurrency,
+        "errors": errors,
+        "statuses": statuses,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(scenario.requests / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 0.50), 3),
+            "p95": round(percentile(latencies, 0.95), 3),
+            "p99": round(percentile(latencies, 0.99), 3),
+            "max": round(latencies[-1], 3) if latencies else 0.0,
+        },
+    }
+
+
+def api_environment(conninfo: str, schema: str, redis_port: int, upstreams_url: str, bucket_url: str, pool_size: int, overrides: Dict[str, str]) -> Dict[str, str]:
+    database = psycopg.conninfo.conninfo_to_dict(conninfo)
+    # Only what the url sets, build_conninfo cannot render an empty value
+    environment = {
+        f"DATABASE_{setting}": str(database[key])
+        for key, setting in (("host", "HOST"), ("port", "PORT"), ("user", "USER"), ("password", "PASSWORD"), ("dbname", "NAME"))
+        if database.get(key)
+    }
+    environment.update({
+        "ENVIRONMENT": schema,
+        "DATABASE_MIN_CONNECTIONS": str(pool_size),
+        "DATABASE_MAX_CONNECTIONS": str(pool_size),
+        "REDIS_HOST": "127.0.0.1",
+        "REDIS_PORT": str(redis_port),
+        "ADDRESS_SERVICES_URL": upstreams_url,
+        "GREY_WOLF_URL": upstreams_url,
+        "BUCKET_BASE_URL": bucket_url + "/",
+        "BUCKET_NAME": "benchmark",
+        "EXPORT_JOB_WAIT_SECONDS": "600",
+        # Off by default, the similar scenario needs it
+        "SIMILAR_PROPERTIES_INDEX": "true",
+    })
+    environment.update(overrides)
+
+    return environment
+
+
+async def wait_until_ready(url: str, process: subprocess.Popen, timeout: float):
+    deadline = time.monotonic() + timeout
+
+    async with httpx.AsyncClient(base_url=url) as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"API exited with {process.returncode}")
+
+            try:
+                if (await client.get("/openapi.json")).status_code == 200:
+                    return
+
+            except httpx.HTTPError:
+                pass
+
+            await asyncio.sleep(0.2)
+
+    raise RuntimeError("API did not start in time")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+    except (OSError, subprocess.CalledProcessError):
+        return
+
+
+async def benchmark(args: argparse.Namespace, conninfo: str) -> dict:
+    redis = FakeRedis()
+    redis_server = redis.server().start()
+    upstreams = upstreams_app(
+        address_latency=args.address_latency_ms / 1000,
+        grey_wolf_latency=args.grey_wolf_latency_ms / 1000,
+        find_address=catalog.address
+    )
+    upstreams_server = http_server(app=upstreams, name="upstreams").start()
+    bucket = bucket_app(latency=args.bucket_latency_ms / 1000)
+    bucket_server = http_server(app=bucket, name="bucket").start()
+
+    overrides = dict(override.split("=", 1) for override in args.api_env)
+    port = free_port()
+    workdir = tempfile.TemporaryDirectory(prefix="property-api-benchmark-")
+    log_path = Path(workdir.name) / "api.log"
+
+    with open(log_path, "wb") as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.application:create_app", "--factory",
+             "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", "--no-access-log"],
+            # The API writes its debug.log to the working directory
+            cwd=workdir.name,
+            env={
+                **os.environ,
+                **api_environment(
+                    conninfo=conninfo,
+                    schema=args.schema,
+                    redis_port=redis_server.port,
+                    upstreams_url=upstreams_server.url,
+                    bucket_url=bucket_server.url,
+                    pool_size=args.pool_size,
+                    overrides=overrides
+                ),
+                "PYTHONPATH": str(ROOT),
+            },
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+
+    scenarios = build_scenarios(
+        rows=args.rows,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        export_requests=args.export_requests
+    )
+    results = {}
+
+    try:
+        await wait_until_ready(url=f"http://127.0.0.1:{port}", process=process, timeout=args.startup_timeout)
+
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=600) as client:
+            for index, scenario in enumerate(scenarios):
+                if args.scenarios and scenario.name not in args.scenarios:
+                    continue
+
+                commands, calls = redis.commands, dict(upstreams.state.calls)
+                print(f"Running {scenario.name} - {scenario.requests} requests, concurrency {scenario.concurrency}", flush=True)
+
+                result = await run_scenario(client=client, scenario=scenario, seed=args.seed + index, warmup=args.warmup)
+                result["dependencies"] = {
+                    "redis_commands": redis.commands - commands,
+                    **{f"{name}_calls": upstreams.state.calls[name] - calls[name] for name in calls},
+                }
+                results[scenario.name] = result
+
+                print(
+                    f"  {result['throughput_rps']} req/s, p50 {result['latency_ms']['p50']} ms, "
+                    f"p95 {result['latency_ms']['p95']} ms, p99 {result['latency_ms']['p99']} ms, "
+                    f"statuses {result['statuses']}",
+                    flush=True
+                )
+
+    except Exception:
+        print(log_path.read_text(errors="replace")[-5000:], file=sys.stderr)
+        raise
+
+    finally:
+        process.terminate()
+
+        try:
+            process.wait(timeout=30)
+
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+        for server in (redis_server, upstreams_server, bucket_server):
+            server.stop()
+
+        workdir.cleanup()
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "rows": args.rows,
+            "pool_size": args.pool_size,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "latency_ms": {
+                "address": args.address_latency_ms,
+                "grey_wolf": args.grey_wolf_latency_ms,
+                "bucket": args.bucket_latency_ms,
+            },
+            "api_env": overrides,
+        },
+        "scenarios": results,
+    }
+
+
+def compare(previous: dict, current: dict):
+    def change(before: float, after: float) -> str:
+        percent = f" ({(after - before) / before * 100:+.1f}%)" if before else ""
+        return f"{before:g} -> {after:g}{percent}"
+
+    print(f"\nCompared with {previous['meta'].get('git_commit')} ({previous['meta'].get('created_at')})")
+
+    for name, result in current["scenarios"].items():
+        before = previous["scenarios"].get(name)
+
+        if not before:
+            print(f"{name}: not in the previous report")
+            continue
+
+        print(
+            f"{name}: req/s {change(before['throughput_rps'], result['throughput_rps'])}, "
+            + ", ".join(
+                f"{quantile} {change(before['latency_ms'][quantile], result['latency_ms'][quantile])} ms"
+                for quantile in ("p50", "p95", "p99")
+            )
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=50000, help="properties in the synthetic catalog")
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests before each scenario")
+    parser.add_argument("--export-requests", type=int, default=3)
+    parser.add_argument("--scenarios", nargs="*", help="run only these scenarios")
+    parser.add_argument("--pool-size", type=int, default=10, help="Postgres connections of the API")
+    parser.add_argument("--address-latency-ms", type=float, default=20.0)
+    parser.add_argument("--grey-wolf-latency-ms", type=float, default=50.0)
+    parser.add_argument("--bucket-latency-ms", type=float, default=5.0)
+    parser.add_argument("--api-env", action="append", default=[], metavar="NAME=VALUE", help="extra API setting, repeatable")
+    parser.add_argument("--schema", default="benchmark", help="scratch schema, dropped and recreated")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--output", default="benchmark-report.json")
+    parser.add_argument("--compare", help="previous report to compare with")
+    args = parser.parse_args()
+
+    conninfo = os.environ.get("BENCHMARK_DATABASE_URL")
+
+    if not conninfo:
+        parser.error("BENCHMARK_DATABASE_URL is not set")
+
+    print(f"Seeding {args.rows} properties into {args.schema}", flush=True)
+    catalog.seed(conninfo=conninfo, schema=args.schema, rows=args.rows)
+
+    try:
+        report = asyncio.run(benchmark(args=args, conninfo=conninfo))
+
+    finally:
+        catalog.drop(conninfo=conninfo, schema=args.schema)
+
+    Path(args.output).write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+    print(f"Report written to {args.output}")
+
+    if args.compare:
+        compare(previous=json.loads(Path(args.compare).read_text()), current=report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Per row cost of serializing a page of properties, before and after the fast response path.
+
+    python -m benchmarks.serialization --rows 100 --repeat 200
+"""
+import argparse
+import os
+import timeit
+from decimal import Decimal
+
+# The app settings are read on import, none of them matter here
+for name in ("REDIS_HOST", "REDIS_PORT", "GREY_WOLF_URL", "ADDRESS_SERVICES_URL"):
+    os.environ.setdefault(name, "0")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.api.dependencies import FastJSONResponse
+from app.core.entities import PropertyInDB
+
+
+def build_rows(quantity: int) -> list:
+    """
+    Rows shaped like the dict_row output of PropertyRepository.select_all
+    """
+    return [
+        {
+            "id": index,
+            "title": f"casa {index}",
+            "price": Decimal("350000.00") + index,
+            "description": "Casa ampla com quintal, churrasqueira e vista para o rio. " * 8,
+            "rooms": 3,
+            "bathrooms": 2,
+            "size": 120.5,
+            "parking_space": 2,
+            "image_url": f"https://images.example.com/{index}.jpg",
+            "type": "casa",
+            "property_url": f"https://properties.example.com/{index}",
+            "number": str(index),
+            "is_active": True,
+            "neighborhood_name": "Velha",
+            "population": 20000,
+            "houses": 6000,
+            "area": 7.5,
+            "street_name": "Rua XV de Novembro",
+            "zip_code": "89066-040",
+            "flood_quota": 12.3,
+            "latitude": "-26.9194",
+            "longitude": "-49.0661",
+            "modality_name": "venda",
+            "company_name": "Imobiliaria",
+        }
+        for index in range(quantity)
+    ]
+
+
+def validated_path(rows: list) -> bytes:
+    properties = [PropertyInDB(**row) for row in rows]
+    return JSONResponse(jsonable_encoder({"count": len(rows), "data": properties, "next_cursor": None})).body
+
+
+def fast_path(rows: list) -> bytes:
+    return FastJSONResponse({"count": len(rows), "data": rows, "next_cursor": None}).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rows = build_rows(quantity=args.rows)
+
+    for name, path in (("validated + jsonable_encoder", validated_path), ("trusted rows + orjson", fast_path)):
+        seconds = min(timeit.repeat(lambda: path(rows), number=args.repeat, repeat=3)) / args.repeat
+        print(f"{name:<30} {seconds * 1e6 / args.rows:8.2f} us/row  {len(path(rows)):>8} bytes/page")
+
+
+if __name__ == "__main__":
+    main()
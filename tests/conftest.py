@@ -0,0 +1,66 @@
+"""
+Fixtures shared by the tests: the settings the app needs to be imported, a
+Redis stand-in and, when TEST_DATABASE_URL is set, a seeded catalog.
+"""
+import os
+import pytest
+
+for name in ("REDIS_HOST", "REDIS_PORT", "GREY_WOLF_URL", "ADDRESS_SERVICES_URL"):
+    os.environ.setdefault(name, "0")
+
+from redis.asyncio import Redis
+from app.core.configs import get_environment
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+CATALOG_SCHEMA = "catalog_test"
+CATALOG_ROWS = 3000
+
+
+@pytest.fixture(scope="session")
+def redis_server():
+    from benchmarks.fakes import FakeRedis
+
+    server = FakeRedis().server().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def connect_redis(redis_server, monkeypatch):
+    """
+    Clients are bound to the event loop of the test, so each test connects its own.
+    The data version is read from Redis on every call, as if it was just invalidated.
+    """
+    monkeypatch.setattr(get_environment(), "RESPONSE_CACHE_VERSION_CHECK_SECONDS", 0)
+
+    async def connect() -> Redis:
+        redis = Redis(host="127.0.0.1", port=redis_server.port, decode_responses=True)
+        await redis.flushall()
+        return redis
+
+    return connect
+
+
+@pytest.fixture(scope="session")
+def catalog():
+    """
+    Schema with CATALOG_ROWS synthetic properties, see benchmarks.catalog
+    """
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+
+    from benchmarks import catalog
+
+    catalog.seed(conninfo=TEST_DATABASE_URL, schema=CATALOG_SCHEMA, rows=CATALOG_ROWS)
+    yield CATALOG_SCHEMA
+    catalog.drop(conninfo=TEST_DATABASE_URL, schema=CATALOG_SCHEMA)
+
+
+@pytest.fixture(params=[False, True], ids=["tables", "property_search"])
+def catalog_environment(request, catalog, monkeypatch):
+    """
+    Point the queries at the catalog, read from the tables or from property_search
+    """
+    monkeypatch.setattr(get_environment(), "ENVIRONMENT", catalog)
+    monkeypatch.setattr(get_environment(), "PROPERTY_SEARCH_VIEW", request.param)
+    return request.param
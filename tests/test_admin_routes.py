@@ -0,0 +1,48 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.composers import property_composer
+from app.api.routes import admin_router
+from app.core.configs import get_environment
+
+
+class InvalidatingServices:
+    invalidations = 0
+
+    async def invalidate_caches(self) -> int:
+        self.invalidations += 1
+        return self.invalidations
+
+
+@pytest.fixture
+def client():
+    services = InvalidatingServices()
+    app = FastAPI()
+    app.include_router(admin_router)
+    app.dependency_overrides[property_composer] = lambda: services
+
+    with TestClient(app) as client:
+        yield client, services
+
+
+@pytest.mark.parametrize("token, headers", [
+    ("", {}),
+    ("", {"X-Admin-Token": ""}),
+    ("secret", {}),
+    ("secret", {"X-Admin-Token": "wrong"}),
+], ids=["unset", "unset-empty-header", "missing", "wrong"])
+def test_admin_routes_need_the_token(client, monkeypatch, token, headers):
+    monkeypatch.setattr(get_environment(), "ADMIN_TOKEN", token)
+    client, services = client
+
+    assert client.get("/admin/cache/stats", headers=headers).status_code == 403
+    assert client.post("/admin/cache/invalidate", headers=headers).status_code == 403
+    assert services.invalidations == 0
+
+
+def test_admin_routes_answer_with_the_token(client, monkeypatch):
+    monkeypatch.setattr(get_environment(), "ADMIN_TOKEN", "secret")
+    client, services = client
+
+    assert client.get("/admin/cache/stats", headers={"X-Admin-Token": "secret"}).status_code == 200
+    assert client.post("/admin/cache/invalidate", headers={"X-Admin-Token": "secret"}).json() == {"data_version": 1}
@@ -0,0 +1,114 @@
+import asyncio
+from app.core.cache import AddressCache, DataVersion, ResponseCache, TTLCache
+from app.core.services import PropertyServices
+
+
+class CountingRepository:
+    """
+    Stands in for PropertyRepository, counting the queries that reach it
+    """
+
+    def __init__(self, quantity: int) -> None:
+        self.quantity = quantity
+        self.queries = 0
+
+    async def count_select_all(self, **filters) -> int:
+        self.queries += 1
+        return self.quantity
+
+
+def test_counts_are_cached_per_data_version(connect_redis):
+    async def run():
+        redis = await connect_redis()
+        repository = CountingRepository(quantity=42)
+        services = PropertyServices(property_repository=repository, redis=redis)
+
+        assert await services.count_search_all(rooms=3) == 42
+        assert await services.count_search_all(rooms=3) == 42
+        assert repository.queries == 1
+
+        # Invalidated by another process, the local counts of this one are not cleared
+        await redis.incr(DataVersion.KEY)
+        repository.quantity = 43
+
+        assert await services.count_search_all(rooms=3) == 43
+        assert repository.queries == 2
+
+    asyncio.run(run())
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(max_size=10, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=-1)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert len(cache) == 1
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_is_bounded_by_bytes():
+    cache = TTLCache(max_size=10, ttl=60, max_bytes=10)
+    cache.set("a", b"x" * 6)
+    cache.set("b", b"x" * 6)
+
+    assert cache.get("a") is None
+    assert cache.memory_bytes == 6
+
+    cache.delete("b")
+    assert cache.memory_bytes == 0
+
+
+def test_responses_are_shared_through_redis_until_invalidated(connect_redis):
+    async def run():
+        redis = await connect_redis()
+        writer, reader = ResponseCache(), ResponseCache()
+
+        await writer.set(params={"rooms": 3, "size": 0, "zip_code": ""}, body=b'{"count":1}', redis=redis)
+
+        # Unset filters do not change the entry, another process finds it in Redis
+        assert await reader.get(params={"rooms": 3}, redis=redis) == b'{"count":1}'
+        assert reader.redis_hits == 1
+        assert await reader.get(params={"rooms": 3}, redis=redis) == b'{"count":1}'
+        assert reader.redis_hits == 1
+        assert await reader.get(params={"rooms": 4}, redis=redis) is None
+
+        await writer.invalidate(redis=redis)
+
+        assert await writer.get(params={"rooms": 3}, redis=redis) is None
+        # The local copy of the other process is dropped with the old version
+        assert await reader.get(params={"rooms": 3}, redis=redis) is None
+
+    asyncio.run(run())
+
+
+def test_addresses_are_cached_unknown_zip_codes_too(connect_redis):
+    address = {"zip_code": "89010000", "neighborhood_name": "Centro", "flood_quota": 12.0}
+
+    async def run():
+        redis = await connect_redis()
+        writer, reader = AddressCache(), AddressCache()
+
+        assert await reader.get(zip_code="89010000", redis=redis) is AddressCache.MISSING
+
+        await writer.set(zip_code="89010000", address=address, redis=redis)
+        await writer.set(zip_code="00000000", address=None, redis=redis)
+
+        assert await reader.get(zip_code="89010000", redis=redis) == address
+        # A known unknown zip code is None, not a miss
+        assert await reader.get(zip_code="00000000", redis=redis) is None
+        assert reader.redis_hits == 2
+
+    asyncio.run(run())
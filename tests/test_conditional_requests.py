@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+from fastapi import Request
+from fastapi.exceptions import HTTPException
+from app.api.dependencies.conditional_requests import (
+    check_property_version,
+    etag_matches,
+    not_modified_since,
+    representation_variant,
+)
+from app.core.cache import PropertyVersions, ResponseCache
+
+
+def request_with(**headers) -> Request:
+    return Request({
+        "type": "http",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+@pytest.mark.parametrize("if_none_match, matches", [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"xyz", "abc"', True),
+    ("*", True),
+    ('"xyz"', False),
+    ("", False),
+])
+def test_etag_matches_weakly(if_none_match, matches):
+    assert etag_matches(if_none_match=if_none_match, etag='"abc"') is matches
+
+
+def test_not_modified_since():
+    last_modified = "Wed, 21 Oct 2026 07:28:00 GMT"
+
+    assert not_modified_since(if_modified_since=last_modified, last_modified=last_modified)
+    assert not_modified_since(if_modified_since="Thu, 22 Oct 2026 07:28:00 GMT", last_modified=last_modified)
+    assert not not_modified_since(if_modified_since="Tue, 20 Oct 2026 07:28:00 GMT", last_modified=last_modified)
+    assert not not_modified_since(if_modified_since="yesterday", last_modified=last_modified)
+
+
+def test_projections_are_variants_of_their_own():
+    assert representation_variant(fields=None) == ""
+    assert representation_variant(fields="price, title,price") == representation_variant(fields="id,title,price")
+
+
+async def check(property_id: int, request: Request, redis, fields: str = None) -> int:
+    """
+    Status check_property_version answers with, 200 when it lets the request through
+    """
+    try:
+        await check_property_version(property_id=property_id, request=request, fields=fields, redis=redis)
+
+    except HTTPException as error:
+        return error.status_code
+
+    return 200
+
+
+def test_conditional_requests_are_answered_from_the_saved_version(connect_redis):
+    async def run():
+        redis = await connect_redis()
+        version = await PropertyVersions.save(property_id=1, etag='"v1"', redis=redis)
+        await PropertyVersions.save(property_id=1, etag='"v1-title"', variant=representation_variant(fields="title"), redis=redis)
+
+        assert await check(1, request_with(if_none_match='"v1"'), redis) == 304
+        assert await check(1, request_with(if_none_match='"v0"'), redis) == 200
+        assert await check(1, request_with(if_modified_since=version["last_modified"]), redis) == 304
+        # If-None-Match wins over If-Modified-Since
+        assert await check(1, request_with(if_none_match='"v0"', if_modified_since=version["last_modified"]), redis) == 200
+        assert await check(1, request_with(if_none_match='"v1-title"'), redis, fields="title") == 304
+        assert await check(1, request_with(if_none_match='"v1"'), redis, fields="title") == 200
+        assert await check(2, request_with(if_none_match='"v1"'), redis) == 200
+
+    asyncio.run(run())
+
+
+def test_invalidation_drops_the_saved_versions(connect_redis):
+    async def run():
+        redis = await connect_redis()
+        await PropertyVersions.save(property_id=1, etag='"v1"', redis=redis)
+        assert await check(1, request_with(if_none_match='"v1"'), redis) == 304
+
+        await ResponseCache().invalidate(redis=redis)
+
+        assert await check(1, request_with(if_none_match='"v1"'), redis) == 200
+
+    asyncio.run(run())
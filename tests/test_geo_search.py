@@ -0,0 +1,85 @@
+import asyncio
+import math
+import pytest
+from psycopg import AsyncConnection
+from psycopg.rows import dict_row
+from app.core.db.pg_connection import PGConnection
+from app.core.db.repositories import PropertyRepository
+from app.core.entities import GeoArea
+from app.core.entities.geo_entity import EARTH_RADIUS_METERS
+from tests.conftest import TEST_DATABASE_URL
+
+NO_FILTERS = {"rooms": 0, "bathrooms": 0, "parking_space": 0, "size": 0, "neighborhood": None}
+
+
+def haversine(lat: float, lng: float, center_lat: float, center_lng: float) -> float:
+    return EARTH_RADIUS_METERS * 2 * math.asin(math.sqrt(
+        math.sin(math.radians(lat - center_lat) / 2) ** 2
+        + math.cos(math.radians(center_lat)) * math.cos(math.radians(lat)) * math.sin(math.radians(lng - center_lng) / 2) ** 2
+    ))
+
+
+@pytest.mark.parametrize("query, message", [
+    ({"bbox": "-49.1,-26.9,-49.0"}, "bbox must be"),
+    ({"bbox": "a,b,c,d"}, "bbox must be"),
+    ({"bbox": "-49.0,-26.9,-49.1,-26.8"}, "out of range"),
+    ({"bbox": "-49.1,-26.9,-49.0,-26.8", "radius": 100}, "either bbox"),
+    ({"lat": -26.9, "lng": -49.0}, "go together"),
+    ({"lat": -91, "lng": -49.0, "radius": 100}, "out of range"),
+    ({"lat": -26.9, "lng": -49.0, "radius": 0}, "positive"),
+])
+def test_inconsistent_areas_are_rejected(query, message):
+    with pytest.raises(ValueError, match=message):
+        GeoArea.from_query(**query)
+
+
+def test_radius_box_holds_the_circle():
+    area = GeoArea.from_query(lat=-26.9, lng=-49.05, radius=1000)
+
+    assert GeoArea.from_query() is None
+    assert haversine(area.max_lat, area.center_lng, area.center_lat, area.center_lng) == pytest.approx(1000, rel=0.01)
+    assert haversine(area.center_lat, area.max_lng, area.center_lat, area.center_lng) == pytest.approx(1000, rel=0.01)
+
+
+async def catalog_points(conn: AsyncConnection, schema: str) -> dict:
+    """
+    Coordinates of every property in the catalog, by id
+    """
+    async with conn.cursor(row_factory=dict_row) as cursor:
+        await cursor.execute(
+            f"SELECT p.id, s.lat, s.lng FROM {schema}.properties p "
+            f"INNER JOIN {schema}.streets s ON p.street_id = s.id;"
+        )
+        return {row["id"]: (row["lat"], row["lng"]) for row in await cursor.fetchall()}
+
+
+@pytest.mark.parametrize("area", [
+    GeoArea.from_bbox(bbox="-49.09,-26.94,-49.07,-26.91"),
+    GeoArea.from_radius(lat=-26.92, lng=-49.08, radius=800),
+], ids=["bbox", "radius"])
+def test_geo_search_matches_brute_force(catalog, catalog_environment, area):
+    async def search():
+        async with await AsyncConnection.connect(TEST_DATABASE_URL, autocommit=True) as conn:
+            repository = PropertyRepository(connection=PGConnection(conn=conn))
+            rows = await repository.select_all(page_size=10000, offset=0, fields=["id"], area=area, **NO_FILTERS)
+            quantity = await repository.count_select_all(area=area)
+
+            return rows, quantity, await catalog_points(conn=conn, schema=catalog)
+
+    rows, quantity, points = asyncio.run(search())
+
+    distances = {
+        id: haversine(lat, lng, area.center_lat, area.center_lng)
+        for id, (lat, lng) in points.items()
+        if area.min_lat <= lat <= area.max_lat and area.min_lng <= lng <= area.max_lng
+    }
+    expected = sorted(
+        (id for id, distance in distances.items() if not area.radius or distance <= area.radius),
+        key=lambda id: (distances[id], id)
+    )
+
+    assert expected
+    assert len(expected) < len(points)
+    assert quantity == len(expected)
+    assert [row["id"] for row in rows] == expected
+    assert [row["distance"] for row in rows] == pytest.approx([distances[id] for id in expected])
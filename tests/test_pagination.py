@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from psycopg import AsyncConnection
+from app.core.db.pg_connection import PGConnection
+from app.core.db.repositories import PropertyRepository
+from app.core.services import decode_cursor, encode_cursor
+from tests.conftest import TEST_DATABASE_URL
+
+
+def test_cursor_round_trip():
+    for last_id in (0, 1, 20, 987654321):
+        cursor = encode_cursor(last_id)
+
+        assert "=" not in cursor
+        assert decode_cursor(cursor) == last_id
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", "e30", encode_cursor(1)[:-2] + "!!"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"rooms": 3},
+    {"neighborhood": "neighborhood 7", "is_active": True},
+    {"size": 120, "bathrooms": 2},
+], ids=["all", "rooms", "neighborhood", "size"])
+def test_keyset_pages_match_offset_pages(catalog_environment, filters):
+    filters = {"rooms": 0, "bathrooms": 0, "parking_space": 0, "size": 0, "neighborhood": None, **filters}
+
+    async def pages():
+        async with await AsyncConnection.connect(TEST_DATABASE_URL, autocommit=True) as conn:
+            repository = PropertyRepository(connection=PGConnection(conn=conn))
+            by_offset, by_cursor = [], []
+            after_id = None
+
+            while True:
+                page = await repository.select_all(page_size=50, offset=len(by_offset), fields=["id"], **filters)
+                by_offset.extend(row["id"] for row in page)
+
+                if len(page) < 50:
+                    break
+
+            while True:
+                page = await repository.select_all(page_size=50, offset=0, after_id=after_id, fields=["id"], **filters)
+                by_cursor.extend(row["id"] for row in page)
+
+                if len(page) < 50:
+                    break
+
+                after_id = decode_cursor(encode_cursor(page[-1]["id"]))
+
+            return by_offset, by_cursor
+
+    by_offset, by_cursor = asyncio.run(pages())
+
+    assert by_offset
+    assert by_cursor == by_offset == sorted(set(by_offset))
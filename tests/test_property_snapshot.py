@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from psycopg import AsyncConnection
+from app.core.db import PropertySnapshot
+from app.core.db.pg_connection import PGConnection
+from app.core.db.repositories import PropertyRepository
+from tests.conftest import CATALOG_ROWS, TEST_DATABASE_URL
+
+NO_FILTERS = {"rooms": 0, "bathrooms": 0, "parking_space": 0, "size": 0, "neighborhood": None}
+
+SEARCHES = [
+    {},
+    {"rooms": 3},
+    {"rooms": 3, "bathrooms": 2, "parking_space": 1},
+    {"size": 120},
+    {"neighborhood": "neighborhood 7", "is_active": True},
+    {"neighborhood": "no such neighborhood"},
+    {"rooms": 2, "is_active": False},
+]
+
+PAGES = [
+    {"page_size": 20, "offset": 0},
+    {"page_size": 20, "offset": 40},
+    {"page_size": 20, "offset": 0, "after_id": 1500},
+    {"page_size": 20, "offset": 0, "after_id": CATALOG_ROWS},
+]
+
+
+@pytest.fixture
+def snapshot_and_repository(catalog_environment):
+    """
+    Snapshot loaded from the catalog, and the rows and counts the repository answers for every search and page
+    """
+    async def query():
+        async with await AsyncConnection.connect(TEST_DATABASE_URL, autocommit=True) as conn:
+            repository = PropertyRepository(connection=PGConnection(conn=conn))
+            head = await repository.select_after(after_id=0, limit=CATALOG_ROWS // 2)
+            tail = await repository.select_after(after_id=head[-1]["id"], limit=CATALOG_ROWS)
+            answers = []
+
+            for filters in SEARCHES:
+                filters = {**NO_FILTERS, **filters}
+
+                for page in PAGES:
+                    answers.append((filters, page, await repository.select_all(**page, **filters)))
+
+                answers.append((filters, None, await repository.count_select_all(**filters)))
+
+            return head, tail, answers
+
+    head, tail, answers = asyncio.run(query())
+    return PropertySnapshot.build(head).extend(tail), answers
+
+
+def test_snapshot_answers_like_the_repository(snapshot_and_repository):
+    snapshot, answers = snapshot_and_repository
+
+    assert len(snapshot.rows) == CATALOG_ROWS
+
+    for filters, page, expected in answers:
+        if page is None:
+            assert snapshot.count(**filters) == expected, filters
+
+        else:
+            assert snapshot.search(**page, **filters) == expected, (filters, page)
+
+
+def test_snapshot_projects_fields_like_the_repository(snapshot_and_repository):
+    snapshot, answers = snapshot_and_repository
+    filters, page, expected = next(
+        (filters, page, expected) for filters, page, expected in answers
+        if filters["rooms"] == 3 and page and page.get("after_id") == 1500
+    )
+
+    assert snapshot.search(**page, **filters, fields=["id", "title", "price"]) == [
+        {"id": row["id"], "title": row["title"], "price": row["price"]} for row in expected
+    ]
@@ -0,0 +1,210 @@
+"""
+Check that the generated search queries are served by indexes.
+
+Runs the migrations into a scratch schema of the database in TEST_DATABASE_URL,
+fills it with synthetic properties and EXPLAINs every select_all and
+count_select_all variant with sequential scans disabled: a Seq Scan left in
+the plan means no index can serve the query. That alone proves little for a
+page, which can always be met by walking the primary key in id order and
+filtering row by row, so the filtered columns themselves must show up in an
+Index Cond or Recheck Cond of every count and of deep pages of the selective
+filters. Skipped without TEST_DATABASE_URL.
+"""
+import asyncio
+import json
+import os
+import pytest
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+if not TEST_DATABASE_URL:
+    pytest.skip("TEST_DATABASE_URL is not set", allow_module_level=True)
+
+for name in ("REDIS_HOST", "REDIS_PORT", "GREY_WOLF_URL", "ADDRESS_SERVICES_URL"):
+    os.environ.setdefault(name, "0")
+
+import psycopg
+from app.core.configs import get_environment
+from app.core.db.base_connection import DBConnection
+from app.core.db.migrations import Migrator
+from app.core.db.repositories import PropertyRepository
+from app.core.entities import GeoArea
+
+SCHEMA = "query_plans_test"
+SEARCHED_TABLES = {"properties", "neighborhoods", "streets", "property_search"}
+
+SEED = """
+INSERT INTO public.neighborhoods ("name", population, houses, area)
+SELECT 'neighborhood ' || g, 1000 * g, 300 * g, 1.5 * g FROM generate_series(1, 100) g;
+
+INSERT INTO public.streets ("name", zip_code, flood_quota, latitude, longitude)
+SELECT 'street ' || g, lpad((89000000 + g)::text, 8, '0'), 10 + g % 7, (-26.95 + (g % 40) / 400.0)::text, (-49.10 + (g / 40) / 250.0)::text
+FROM generate_series(1, 1000) g;
+
+INSERT INTO public.modalities ("name") VALUES ('sale'), ('rent');
+INSERT INTO public.companies ("name") SELECT 'company ' || g FROM generate_series(1, 10) g;
+
+INSERT INTO public.properties (
+    title, price, description, rooms, bathrooms, "size", parking_space, image_url, "type",
+    property_url, "number", is_active, neighborhood_id, street_id, modality_id, company_id
+)
+SELECT
+    'property ' || g, 100000 + g, repeat('description ', 20), 1 + g % 8, 1 + g % 5, 30 + g % 400, g % 4,
+    'https://images/' || g, 'house', 'https://properties/' || g, g::text, g % 10 <> 0,
+    1 + g % 100, 1 + g % 1000, 1 + g % 2, 1 + g % 10
+FROM generate_series(1, 50000) g;
+
+REFRESH MATERIALIZED VIEW public.property_search;
+ANALYZE;
+"""
+
+FILTERS = [
+    {},
+    {"rooms": 3},
+    {"bathrooms": 2},
+    {"parking_space": 1},
+    {"size": 120},
+    {"neighborhood": "neighborhood 7"},
+    {"rooms": 3, "bathrooms": 2, "parking_space": 1},
+    {"neighborhood": "neighborhood 7", "rooms": 3},
+    {"rooms": 3, "is_active": True},
+    {"size": 120, "is_active": True},
+    {"area": GeoArea.from_bbox(bbox="-49.06,-26.92,-49.05,-26.91")},
+    {"area": GeoArea.from_radius(lat=-26.91, lng=-49.05, radius=500), "rooms": 3},
+]
+
+# Few enough matches that past the first pages their index beats walking the
+# primary key, for rooms, bathrooms or parking_space alone the walk is the better plan
+SELECTIVE_FILTERS = [
+    {"size": 120},
+    {"neighborhood": "neighborhood 7"},
+    {"rooms": 3, "bathrooms": 2, "parking_space": 1},
+    {"neighborhood": "neighborhood 7", "rooms": 3},
+    {"size": 120, "is_active": True},
+]
+
+FILTER_COLUMNS = {
+    "rooms": "rooms",
+    "bathrooms": "bathrooms",
+    "parking_space": "parking_space",
+    "size": "size",
+    "neighborhood": "name",
+    "area": "point(lng, lat) <@",
+}
+
+
+class CapturingConnection(DBConnection):
+    """
+    Records the statements the repository would run instead of running them
+    """
+
+    def __init__(self) -> None:
+        self.statements = []
+
+    async def execute(self, sql_statement: str, values: dict = None, many: bool = False):
+        self.statements.append((sql_statement, values))
+        return [] if many else None
+
+    async def copy_to(self, sql_statement: str):
+        self.statements.append((sql_statement, None))
+
+        for chunk in ():
+            yield chunk
+
+    async def commit(self):
+        ...
+
+    async def rollback(self):
+        ...
+
+
+@pytest.fixture(scope="module")
+def database():
+    with psycopg.connect(TEST_DATABASE_URL, autocommit=True) as conn:
+        conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;")
+
+        asyncio.run(Migrator(conninfo=TEST_DATABASE_URL, schema=SCHEMA).upgrade())
+        conn.execute(SEED.replace("public", SCHEMA))
+        conn.execute("SET enable_seqscan = off;")
+
+        yield conn
+
+        conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;")
+
+
+@pytest.fixture(params=[False, True], ids=["tables", "property_search"])
+def read_model(request, monkeypatch):
+    monkeypatch.setattr(get_environment(), "PROPERTY_SEARCH_VIEW", request.param)
+    return request.param
+
+
+def generate(method: str, filters: dict, **kwargs) -> tuple:
+    connection = CapturingConnection()
+    repository = PropertyRepository(connection=connection)
+    arguments = {"rooms": None, "bathrooms": None, "parking_space": None, "size": None, "neighborhood": None}
+    arguments.update(filters)
+
+    asyncio.run(getattr(repository, method)(**arguments, **kwargs))
+
+    sql_statement, values = connection.statements[-1]
+    return sql_statement.replace("public", SCHEMA), values
+
+
+def explain(conn: psycopg.Connection, sql_statement: str, values: dict) -> dict:
+    raw_plan = conn.execute("EXPLAIN (FORMAT JSON) " + sql_statement, values).fetchone()[0]
+    plan = raw_plan if isinstance(raw_plan, list) else json.loads(raw_plan)
+    return plan[0]["Plan"]
+
+
+def scans(plan: dict):
+    if plan.get("Relation Name") or plan.get("Index Name"):
+        yield plan
+
+    for child in plan.get("Plans", []):
+        yield from scans(child)
+
+
+def assert_no_sequential_scan(plan: dict):
+    sequential = [
+        node["Relation Name"] for node in scans(plan)
+        if node["Node Type"] == "Seq Scan" and node["Relation Name"] in SEARCHED_TABLES
+    ]
+
+    assert not sequential, f"Sequential scan on {', '.join(sequential)}:\n{json.dumps(plan, indent=2)}"
+
+
+def assert_filters_use_indexes(plan: dict, filters: dict, read_model: bool):
+    conditions = " ".join(
+        node.get("Index Cond", "") + node.get("Recheck Cond", "") for node in scans(plan)
+    )
+
+    for name in filters:
+        if name in FILTER_COLUMNS:
+            column = "neighborhood_name" if read_model and name == "neighborhood" else FILTER_COLUMNS[name]
+            assert column in conditions, f"{name} is not filtered through an index:\n{json.dumps(plan, indent=2)}"
+
+
+@pytest.mark.parametrize("filters", FILTERS, ids=lambda filters: ",".join(filters) or "no_filters")
+@pytest.mark.parametrize("pagination", [{"offset": 20}, {"offset": 0, "after_id": 25000}], ids=["offset", "keyset"])
+def test_select_all_uses_indexes(database, read_model, filters, pagination):
+    sql_statement, values = generate("select_all", filters, page_size=10, **pagination)
+
+    assert_no_sequential_scan(explain(database, sql_statement, values))
+
+
+@pytest.mark.parametrize("filters", SELECTIVE_FILTERS, ids=lambda filters: ",".join(filters))
+def test_select_all_deep_pages_filter_through_indexes(database, read_model, filters):
+    sql_statement, values = generate("select_all", filters, page_size=10, offset=2000)
+    plan = explain(database, sql_statement, values)
+
+    assert_no_sequential_scan(plan)
+    assert_filters_use_indexes(plan, filters, read_model)
+
+
+@pytest.mark.parametrize("filters", FILTERS[1:], ids=lambda filters: ",".join(filters))
+def test_count_select_all_filters_through_indexes(database, read_model, filters):
+    sql_statement, values = generate("count_select_all", filters)
+    plan = explain(database, sql_statement, values)
+
+    assert_no_sequential_scan(plan)
+    assert_filters_use_indexes(plan, filters, read_model)
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from app.core.configs import get_environment
+from app.core.db import SimilarityIndex
+from app.core.db.kd_tree import KDTree
+
+
+def brute_force(points: np.ndarray, point: np.ndarray, k: int):
+    distances = np.sqrt(((points - point) ** 2).sum(axis=1))
+    positions = np.argsort(distances, kind="stable")[:k]
+    return distances[positions], positions
+
+
+@pytest.mark.parametrize("rows, dimensions", [(1, 2), (31, 3), (500, 2), (3000, 7)])
+@pytest.mark.parametrize("k", [1, 5, 40])
+def test_kd_tree_finds_the_same_neighbours_as_brute_force(rows, dimensions, k):
+    rng = np.random.default_rng(rows * k)
+    points = rng.normal(size=(rows, dimensions))
+    tree = KDTree(points=points)
+
+    for point in rng.normal(size=(20, dimensions)):
+        distances, positions = tree.query(point=point, k=k)
+        expected_distances, expected_positions = brute_force(points=points, point=point, k=k)
+
+        # Random points have no ties, so the order is the same too
+        assert positions.tolist() == expected_positions.tolist()
+        assert distances == pytest.approx(expected_distances)
+
+
+def test_kd_tree_handles_duplicated_points():
+    points = np.repeat(np.arange(10, dtype=np.float64).reshape(-1, 1), 50, axis=0)
+    tree = KDTree(points=np.column_stack((points, points)))
+
+    distances, positions = tree.query(point=np.array([3.2, 3.2]), k=60)
+
+    assert len(set(positions.tolist())) == 60
+    assert distances[:50] == pytest.approx([np.hypot(0.2, 0.2)] * 50)
+    assert distances[50:] == pytest.approx([np.hypot(0.8, 0.8)] * 10)
+
+
+def test_empty_kd_tree_finds_nothing():
+    distances, positions = KDTree(points=np.empty((0, 3))).query(point=np.zeros(3), k=5)
+
+    assert len(distances) == len(positions) == 0
+
+
+def rows(ids, rng) -> list:
+    return [
+        {
+            "id": int(property_id),
+            "price": float(rng.integers(100000, 900000)),
+            "size": float(rng.integers(30, 400)),
+            "rooms": int(rng.integers(1, 6)),
+            "bathrooms": int(rng.integers(1, 4)),
+            "parking_space": int(rng.integers(0, 3)),
+            "lat": None if property_id % 7 == 0 else -26.9 + rng.normal() / 100,
+            "lng": None if property_id % 7 == 0 else -49.05 + rng.normal() / 100,
+        }
+        for property_id in ids
+    ]
+
+
+def test_index_with_a_tail_finds_the_same_neighbours_as_brute_force(monkeypatch):
+    monkeypatch.setattr(get_environment(), "SIMILAR_PROPERTIES_REBUILD_RATIO", 0.5)
+    rng = np.random.default_rng(7)
+    index = SimilarityIndex.build(rows(range(1, 1001), rng)).extend(rows(range(1001, 1201), rng))
+
+    assert index.stats()["tree_rows"] == 1000
+    assert index.stats()["rows"] == 1200
+
+    # One from the tree and one from the tail
+    for property_id in (500, 1100):
+        point = index.point(property_id)
+        distances, positions = brute_force(points=index.points, point=point, k=11)
+        expected = [
+            (int(index.ids[position]), distance)
+            for distance, position in zip(distances.tolist(), positions.tolist())
+            if index.ids[position] != property_id
+        ]
+
+        neighbours = index.nearest(point=point, k=10, exclude=property_id)
+
+        assert [neighbour for neighbour, _ in neighbours] == [neighbour for neighbour, _ in expected]
+        assert [distance for _, distance in neighbours] == pytest.approx([distance for _, distance in expected])
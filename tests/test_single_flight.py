@@ -0,0 +1,107 @@
+import asyncio
+import pytest
+from app.api.shared_schemas import PredictProperty
+from app.core.cache import SingleFlight
+from app.core.clients import lifespan as clients_lifespan
+from app.core.configs import get_environment
+from app.core.services import PropertyServices
+from benchmarks.fakes import http_server, upstreams_app
+
+
+def test_concurrent_callers_share_one_call():
+    calls = []
+
+    async def run():
+        flights = SingleFlight()
+
+        async def function():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return len(calls)
+
+        results = await asyncio.gather(*[flights.do(key="a", function=function) for _ in range(10)])
+        return flights, results
+
+    flights, results = asyncio.run(run())
+
+    assert results == [1] * 10
+    assert flights.joined == 9
+    assert len(flights) == 0
+
+
+def test_errors_reach_every_caller_and_are_not_kept():
+    async def run():
+        flights = SingleFlight()
+        calls = 0
+
+        async def function():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream failed")
+
+        results = await asyncio.gather(*[flights.do(key="a", function=function) for _ in range(3)], return_exceptions=True)
+        # Nothing is remembered once the call is over, the next caller runs it again
+        retry = await asyncio.gather(flights.do(key="a", function=function), return_exceptions=True)
+
+        return results + retry, calls
+
+    results, calls = asyncio.run(run())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert calls == 2
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    async def run():
+        flights = SingleFlight()
+
+        async def function():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        first = asyncio.create_task(flights.do(key="a", function=function))
+        second = asyncio.create_task(flights.do(key="a", function=function))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        return await second, await asyncio.gather(first, return_exceptions=True)
+
+    result, (cancelled,) = asyncio.run(run())
+
+    assert result == "done"
+    assert isinstance(cancelled, asyncio.CancelledError)
+
+
+@pytest.fixture
+def upstreams(monkeypatch):
+    app = upstreams_app(
+        address_latency=0,
+        grey_wolf_latency=0.05,
+        find_address=lambda zip_code: {"zip_code": zip_code, "neighborhood_name": "Centro", "flood_quota": 12.0}
+    )
+    server = http_server(app=app, name="upstreams").start()
+    monkeypatch.setattr(get_environment(), "ADDRESS_SERVICES_URL", server.url)
+    monkeypatch.setattr(get_environment(), "GREY_WOLF_URL", server.url)
+    yield app.state.calls
+    server.stop()
+
+
+def test_identical_predictions_call_grey_wolf_once(upstreams, connect_redis):
+    predict_property = PredictProperty(rooms=3, bathrooms=2, parking_space=1, size=120, zip_code="89010000")
+    other_property = PredictProperty(rooms=4, bathrooms=2, parking_space=1, size=120, zip_code="89010000")
+
+    async def run():
+        async with clients_lifespan(None):
+            services = PropertyServices(property_repository=None, redis=await connect_redis())
+            single = await asyncio.gather(*[services.predict_price(predict_property=predict_property) for _ in range(8)])
+            batch = await services.predict_prices(predict_properties=[other_property] * 5)
+
+            return single, batch
+
+    single, batch = asyncio.run(run())
+
+    assert {predicted.predicted_price for predicted in single} == {120 * 4200.0}
+    assert [item.predicted_property.predicted_price for item in batch] == [120 * 4200.0] * 5
+    assert upstreams["grey_wolf"] == 2
+    assert upstreams["address"] == 1
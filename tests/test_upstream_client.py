@@ -0,0 +1,144 @@
+import asyncio
+import time
+import httpx
+import pytest
+from fastapi import FastAPI, Response
+from app.core.clients import CircuitBreaker, CircuitOpenError, UpstreamClient
+from app.core.configs import get_environment
+from benchmarks.fakes import free_port, http_server
+
+
+@pytest.fixture(scope="module")
+def flaky_server():
+    """
+    Answers 503 until it has been called more than state.failures times
+    """
+    app = FastAPI()
+    app.state.failures = 0
+    app.state.calls = 0
+
+    @app.get("/flaky")
+    async def flaky():
+        app.state.calls += 1
+
+        if app.state.calls <= app.state.failures:
+            return Response(status_code=503)
+
+        return {"ok": True}
+
+    server = http_server(app=app, name="flaky").start()
+    yield server, app.state
+    server.stop()
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(get_environment(), "HTTP_BACKOFF_BASE_SECONDS", 0)
+
+
+def request(client: UpstreamClient, **kwargs) -> httpx.Response:
+    async def send():
+        try:
+            return await client.get("/flaky", **kwargs)
+
+        finally:
+            await client.close()
+
+    return asyncio.run(send())
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(name="test", failure_threshold=3, reset_timeout=60)
+
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.failures == 0
+
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_breaker_lets_one_trial_through_after_the_reset_timeout():
+    breaker = CircuitBreaker(name="test", failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    # A failed trial opens it again for a whole reset window
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+@pytest.mark.parametrize("attempts", [0, -1])
+def test_fewer_than_one_attempt_is_rejected(attempts):
+    with pytest.raises(ValueError):
+        UpstreamClient(name="test", base_url="http://127.0.0.1", timeout=1, attempts=attempts)
+
+    client = UpstreamClient(name="test", base_url="http://127.0.0.1", timeout=1, attempts=1)
+
+    with pytest.raises(ValueError):
+        request(client, attempts=attempts)
+
+
+def test_server_errors_are_retried(flaky_server, no_backoff):
+    server, state = flaky_server
+    state.calls, state.failures = 0, 2
+
+    response = request(UpstreamClient(name="test", base_url=server.url, timeout=5, attempts=3))
+
+    assert response.status_code == 200
+    assert state.calls == 3
+
+
+def test_last_server_error_is_returned_once_attempts_run_out(flaky_server, no_backoff):
+    server, state = flaky_server
+    state.calls, state.failures = 0, 5
+
+    response = request(UpstreamClient(name="test", base_url=server.url, timeout=5, attempts=2))
+
+    assert response.status_code == 503
+    assert state.calls == 2
+
+
+def test_last_transport_error_is_raised_once_attempts_run_out(no_backoff):
+    client = UpstreamClient(name="test", base_url=f"http://127.0.0.1:{free_port()}", timeout=1, attempts=3)
+
+    with pytest.raises(httpx.ConnectError):
+        request(client)
+
+    assert client.breaker.failures == 3
+
+
+def test_open_circuit_fails_fast_without_calling(flaky_server, no_backoff, monkeypatch):
+    monkeypatch.setattr(get_environment(), "CIRCUIT_BREAKER_FAILURE_THRESHOLD", 2)
+    server, state = flaky_server
+    state.calls, state.failures = 0, 10
+    client = UpstreamClient(name="test", base_url=server.url, timeout=5, attempts=2)
+
+    assert request(client).status_code == 503
+
+    with pytest.raises(CircuitOpenError):
+        request(client)
+
+    assert state.calls == 2